@@ -9,16 +9,21 @@ Classes:
     ClipboardOperations: 处理剪贴板操作的类
 """
 
+from collections import namedtuple
 from tkinter import filedialog
 from pathlib import Path
-import os
-import re
 from ai_code_context_helper.file_utils import (
     read_file_content,
     is_text_file,
     normalize_path,
-    is_ignored_by_gitignore,
+    truncate_lines,
 )
+from ai_code_context_helper.tree_model import render_tree_text
+from ai_code_context_helper.outline import get_outline, supports_outline
+from ai_code_context_helper.file_hashes import find_duplicates
+
+# 复制时用到的界面选项，在Tk线程中读取后交给后台线程
+_CopyOptions = namedtuple("_CopyOptions", "truncation outline root_dir")
 
 
 class ClipboardOperations:
@@ -46,56 +51,7 @@ class ClipboardOperations:
 
     def _get_tree_text(self):
         """获取目录树的文本表示，只包含选中的且可见的项目"""
-        text = ""
-
-        root_items = self.parent.tree.get_children()
-        if not root_items:
-            return text
-
-        root_item = root_items[0]
-        if root_item in self.parent.checked_items:
-            root_text = self.parent.tree.item(root_item, "text")
-            text = root_text + "\n"
-            text = self._build_tree_text(root_item, "", text)
-
-        return text
-
-    def _build_tree_text(self, parent_id, prefix, text):
-        """递归构建目录树的文本表示"""
-        is_open = self.parent.tree.item(parent_id, "open")
-
-        children = self.parent.tree.get_children(parent_id)
-        if not children or not is_open:
-            return text
-
-        checked_children = [c for c in children if c in self.parent.checked_items]
-        if not checked_children:
-            return text
-
-        for i, child in enumerate(children):
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
-                continue
-
-            if child not in self.parent.checked_items:
-                continue
-
-            is_last = (i == len(children) - 1) or all(
-                c not in self.parent.checked_items for c in children[i + 1 :]
-            )
-
-            if is_last:
-                line_prefix = prefix + "└── "
-                next_prefix = prefix + "    "
-            else:
-                line_prefix = prefix + "├── "
-                next_prefix = prefix + "│   "
-
-            item_text = self.parent.tree.item(child, "text")
-            text += line_prefix + item_text + "\n"
-            text = self._build_tree_text(child, next_prefix, text)
-
-        return text
+        return render_tree_text(self.parent.tree_model)
 
     def copy_path(self):
         """复制选中文件或目录的路径到剪贴板"""
@@ -119,64 +75,94 @@ class ClipboardOperations:
             self.parent.status_var.set(self.parent.texts["status_no_paths"])
 
     def copy_code(self):
-        """复制选中文件的代码内容到剪贴板"""
+        """复制选中文件的代码内容到剪贴板（在后台线程中读取文件）"""
+        options = self._snapshot_options()
 
         def code_processor(path_obj):
             try:
-                code = read_file_content(path_obj)
+                code = self.read_code(path_obj, options)
                 return self.format_code(code)
             except:
                 return None
 
-        results, count = self.process_selected_files(code_processor)
-
-        if results:
+        def combine(results):
             combined = "\n\n".join(results)
-            self.parent.root.clipboard_clear()
-            self.parent.root.clipboard_append(combined)
-        
-            # 计算总行数
-            total_lines = combined.count("\n") + 1
-        
-            # 使用带行数的状态消息
-            self.parent.status_var.set(
-                self.parent.texts.get("status_code_copied_with_lines", "已复制 {0} 个文件的代码 | 共 {1} 行").format(
-                    count, total_lines
-                )
-            )
-        else:
-            self.parent.status_var.set(self.parent.texts["status_no_text_files"])
+            return self.parent.texts.get(
+                "status_code_copied_with_lines", "已复制 {0} 个文件的代码 | 共 {1} 行"
+            ).format(len(results), combined.count("\n") + 1), combined
+
+        self._copy_in_background(code_processor, None, combine)
 
     def copy_both(self):
-        """同时复制选中文件的路径和代码内容到剪贴板"""
+        """同时复制选中文件的路径和代码内容到剪贴板（在后台线程中读取文件）"""
+        options = self._snapshot_options()
+
+        def duplicate_processor(path_obj, original):
+            formatted_path = self.format_path(self.get_relative_path(path_obj, options))
+            note = self.parent.texts.get(
+                "duplicate_of", "（内容与 {0} 相同）"
+            ).format(self.get_relative_path(original, options))
+            return f"{formatted_path}\n\n{note}\n\n\n\n"
 
         def both_processor(path_obj):
             try:
-                code = read_file_content(path_obj)
-                formatted_path = self.format_path(self.get_relative_path(path_obj))
+                code = self.read_code(path_obj, options)
+                formatted_path = self.format_path(
+                    self.get_relative_path(path_obj, options)
+                )
                 formatted_code = self.format_code(code)
                 return f"{formatted_path}\n\n{formatted_code}\n\n\n\n"
             except:
                 return None
 
-        results, count = self.process_selected_files(both_processor)
-
-        if results:
+        def combine(results):
             combined = "".join(results)
+            return self.parent.texts.get(
+                "status_path_code_copied_with_lines",
+                "已复制 {0} 个文件的路径和代码 | 共 {1} 行",
+            ).format(len(results), combined.count("\n") + 1), combined
+
+        self._copy_in_background(both_processor, duplicate_processor, combine)
+
+    def _copy_in_background(self, content_processor, duplicate_processor, combine):
+        """
+        作为 "copy" 任务复制选中文件的内容
+
+        未读取过的目录先在后台预读，文件列表在Tk线程中从模型收集，读取和格式化
+        文件内容又在后台线程中进行，最后在Tk线程中写入剪贴板。
+
+        Args:
+            content_processor: 接收path_obj并返回处理后内容的函数（在后台线程中调用）
+            duplicate_processor: 接收(path_obj, 原文件path_obj)并返回引用内容的函数，可以为None
+            combine: 接收结果列表并返回 (状态栏信息, 剪贴板文本) 的函数
+        """
+        nodes = self._selected_nodes()
+        if not nodes:
+            self.parent.status_var.set(self.parent.texts["status_no_text_files"])
+            return
+        job = self.parent.jobs.start("copy", self.parent.texts.get("job_copy", "复制"))
+
+        def copy(results):
+            if not results:
+                self.parent.jobs.finish(job)
+                self.parent.status_var.set(self.parent.texts["status_no_text_files"])
+                return
+            status, combined = combine(results)
             self.parent.root.clipboard_clear()
             self.parent.root.clipboard_append(combined)
-        
-            # 计算总行数
-            total_lines = combined.count("\n") + 1
-        
-            # 使用带行数的状态消息
-            self.parent.status_var.set(
-                self.parent.texts.get("status_path_code_copied_with_lines", "已复制 {0} 个文件的路径和代码 | 共 {1} 行").format(
-                    count, total_lines
-                )
+            job.done(status)
+
+        def read(files):
+            results, _ = self._process_files(
+                files, content_processor, job, duplicate_processor
             )
-        else:
-            self.parent.status_var.set(self.parent.texts["status_no_text_files"])
+            return results
+
+        def collect():
+            files = self._collect_files(nodes)
+            self.parent.jobs.run_in_background(job, lambda job: read(files), copy)
+
+        self.parent.tree_ops.prefetch_unread(nodes, job, collect)
 
     def copy_filename(self):
         """复制选中文件或目录的文件名到剪贴板"""
@@ -186,20 +172,13 @@ class ClipboardOperations:
             return
 
         filenames = []
+        model = self.parent.tree_model
         for item in selected_items:
-            if item not in self.parent.checked_items:
+            node = model.node(item)
+            if node is None or not model.is_checked(node):
                 continue
 
-            # 查找item对应的路径
-            path = None
-            for p, tree_id in self.parent.tree_items.items():
-                if tree_id == item:
-                    path = p
-                    break
-
-            if path:
-                path_obj = Path(path)
-                filenames.append(path_obj.name)
+            filenames.append(Path(model.path(node)).name)
 
         if filenames:
             combined = "\n".join(filenames)
@@ -218,158 +197,110 @@ class ClipboardOperations:
         else:
             self.parent.status_var.set(self.parent.texts["status_no_selection"])
 
-    def _collect_files_recursively(
-    self, dir_path, checked_only=True, parent_checked=True
-):
-        """递归收集目录中的所有文件"""
-        all_files = []
-
-        try:
-            entries = list(dir_path.iterdir())
-            
-            # 应用与目录树相同的过滤规则
-            # 1. 过滤隐藏文件
-            if not self.parent.show_hidden.get():
-                entries = [
-                    e
-                    for e in entries
-                    if not e.name.startswith(".")
-                    and not (
-                        os.name == "nt"
-                        and e.is_file()
-                        and bool(e.stat().st_file_attributes & 2)
-                    )
-                ]
-            
-            # 2. 应用.gitignore过滤
-            if self.parent.use_gitignore.get():
-                # 查找项目根目录
-                project_root = self.parent.dir_path.get().strip()
-                project_root = normalize_path(project_root)
-                
-                # 筛选条目
-                filtered_entries = []
-                for e in entries:
-                    if not is_ignored_by_gitignore(str(e), project_root):
-                        filtered_entries.append(e)
-                entries = filtered_entries
-            
-            # 3. 应用文件过滤器
-            filter_pattern = self.parent.file_filter.get().strip()
-            if filter_pattern:
-                try:
-                    pattern = re.compile(filter_pattern)
-                    entries = [e for e in entries if pattern.search(e.name)]
-                except re.error:
-                    pass
-
-            # 4. 应用文件/文件夹显示选项
-            filtered_entries = []
-            for entry in entries:
-                if entry.is_dir() and self.parent.show_folders.get():
-                    filtered_entries.append(entry)
-                elif entry.is_file() and self.parent.show_files.get():
-                    filtered_entries.append(entry)
-            entries = filtered_entries
-            
-            # 处理过滤后的文件
-            for item in entries:
-                item_path_str = str(item)
-                item_in_tree = item_path_str in self.parent.tree_items
-
-                if item_in_tree:
-                    item_id = self.parent.tree_items[item_path_str]
-                    item_checked = item_id in self.parent.checked_items
-                else:
-                    item_checked = parent_checked
-
-                if checked_only and not item_checked:
-                    continue
-
-                if item.is_file():
-                    all_files.append(item)
-                elif item.is_dir():
-                    all_files.extend(
-                        self._collect_files_recursively(
-                            item, checked_only, item_checked
-                        )
-                    )
-        except Exception as e:
-            print(f"收集文件时出错: {str(e)}")
-            pass
-
-        return all_files
-
-    def process_selected_files(self, content_processor=None):
+    def process_selected_files(
+        self, content_processor=None, job=None, duplicate_processor=None
+    ):
         """通用文件处理函数，支持自定义内容处理器
 
+        先按选择顺序收集所有文件（去除重复路径），再逐个处理。
+
         Args:
             content_processor: 接收path_obj并返回处理后内容的函数
                                如果为None，则仅收集路径
+            job: 用于报告进度和检查取消的任务（jobs.Job），可以为None
+            duplicate_processor: 见 _process_files
 
         Returns:
             处理结果的列表和处理文件数量
         """
-        selected_items = self.parent.tree.selection()
-        if not selected_items:
-            return [], 0
+        files = self._collect_files(self._selected_nodes())
+        return self._process_files(files, content_processor, job, duplicate_processor)
+
+    def _selected_nodes(self):
+        """返回选中且勾选的文件和目录节点，按选择顺序排列"""
+        model = self.parent.tree_model
+        nodes = []
+        for item in self.parent.tree.selection():
+            node = model.node(item)
+            if node is None or not model.is_checked(node):
+                continue
+            if node.is_file or node.is_dir:
+                nodes.append(node)
+        return nodes
 
-        results = []
+    def _collect_files(self, nodes):
+        """按顺序收集节点对应的所有文件（去除重复路径），只读取模型和未加载的目录"""
+        files = []
         processed_paths = set()
+        model = self.parent.tree_model
+        for node in nodes:
+            if node.is_file:
+                candidates = [Path(model.path(node))]
+            else:
+                # 直接使用目录树模型中的扫描结果，未加载的目录才读取磁盘
+                candidates = [
+                    Path(model.path(file_node))
+                    for file_node in self.parent.tree_ops.iter_files_under(node)
+                ]
+            for path_obj in candidates:
+                if str(path_obj) not in processed_paths:
+                    processed_paths.add(str(path_obj))
+                    files.append(path_obj)
+        return files
 
-        for item in selected_items:
-            if item not in self.parent.checked_items:
-                continue
+    def _process_files(
+        self, files, content_processor=None, job=None, duplicate_processor=None
+    ):
+        """
+        逐个处理文件，不访问Tk控件，可以在后台线程中调用
 
-            path = None
-            for p, tree_id in self.parent.tree_items.items():
-                if tree_id == item:
-                    path = p
-                    break
+        提供 duplicate_processor 时，内容与之前某个文件完全相同的文件
+        改用它生成引用，而不再输出完整内容；引用的是组内第一个成功输出
+        完整内容的文件，原始文件处理失败时由下一个副本输出完整内容。
 
-            if not path:
-                continue
+        Args:
+            files (list): 文件路径（Path）列表
+            content_processor: 接收path_obj并返回处理后内容的函数
+                               如果为None，则仅收集路径
+            job: 用于报告进度和检查取消的任务（jobs.Job），可以为None
+            duplicate_processor: 接收(path_obj, 内容相同的第一个文件的path_obj)
+                                 并返回引用内容的函数，可以为None
 
-            path_obj = Path(path)
+        Returns:
+            处理结果的列表和处理文件数量
+        """
+        duplicates = {}
+        if content_processor and duplicate_processor:
+            duplicates = find_duplicates(files)
+        rendered = {}  # 重复组的第一个文件 -> 实际输出完整内容的文件
 
-            if path_obj.is_file():
-                if str(path_obj) not in processed_paths:
-                    processed_paths.add(str(path_obj))
+        results = []
+        progress_text = self.parent.texts.get("progress_files", "已处理 {0} 个文件")
+        for count, path_obj in enumerate(files, 1):
+            if job is not None:
+                job.progress(progress_text, count)
+
+            if not content_processor:
+                # 仅添加路径
+                results.append(self.format_path(self.get_relative_path(path_obj)))
+                continue
 
-                    if content_processor:
-                        try:
-                            if is_text_file(str(path_obj)):
-                                result = content_processor(path_obj)
-                                if result:
-                                    results.append(result)
-                        except Exception as e:
-                            self.parent.status_var.set(f"处理文件出错: {str(e)}")
-                    else:
-                        # 仅添加路径
-                        results.append(
-                            self.format_path(self.get_relative_path(path_obj))
-                        )
-
-            elif path_obj.is_dir():
-                all_files = self._collect_files_recursively(path_obj, True, True)
-                for file in all_files:
-                    if str(file) not in processed_paths:
-                        processed_paths.add(str(file))
-
-                        if content_processor:
-                            try:
-                                if is_text_file(str(file)):
-                                    result = content_processor(file)
-                                    if result:
-                                        results.append(result)
-                            except Exception:
-                                # 跳过无法处理的文件
-                                continue
-                        else:
-                            # 仅添加路径
-                            results.append(
-                                self.format_path(self.get_relative_path(file))
-                            )
+            try:
+                if not is_text_file(str(path_obj)):
+                    continue
+                group = duplicates.get(str(path_obj), str(path_obj))
+                original = rendered.get(group)
+                if original is not None:
+                    result = duplicate_processor(path_obj, Path(original))
+                else:
+                    result = content_processor(path_obj)
+                    if result:
+                        rendered[group] = str(path_obj)
+                if result:
+                    results.append(result)
+            except Exception as e:
+                # 跳过无法处理的文件
+                print(f"处理文件出错 ({path_obj}): {str(e)}")
 
         return results, len(results)
 
@@ -397,10 +328,38 @@ class ClipboardOperations:
                     self.parent.texts["status_save_failed"].format(str(e))
                 )
 
-    def get_relative_path(self, path):
-        """获取相对于根目录的路径"""
+    def _snapshot_options(self):
+        """在Tk线程中读取复制时用到的界面选项，供后台线程中的处理函数使用"""
+        root_dir = None
         if self.parent.use_relative_path.get():
             root_dir = Path(normalize_path(self.parent.dir_path.get().strip()))
+        return _CopyOptions(
+            self.parent.settings.get_truncation_policy(),
+            self.parent.outline_mode.get(),
+            root_dir,
+        )
+
+    def read_code(self, path_obj, options=None):
+        """
+        读取文件内容，大纲模式下返回代码大纲（不支持大纲的语言返回完整内容）
+
+        大纲从完整内容生成，截断上限只作用于大纲本身。
+        """
+        if options is None:
+            options = self._snapshot_options()
+        if options.outline and supports_outline(path_obj):
+            outline = get_outline(read_file_content(path_obj), path_obj)
+            if options.truncation is not None:
+                outline = truncate_lines(outline, options.truncation)
+            return outline
+        return read_file_content(path_obj, options.truncation)
+
+    def get_relative_path(self, path, options=None):
+        """获取相对于根目录的路径"""
+        if options is None:
+            options = self._snapshot_options()
+        if options.root_dir is not None:
+            root_dir = options.root_dir
             path_obj = Path(normalize_path(str(path)))
             try:
                 rel_path = path_obj.relative_to(root_dir)
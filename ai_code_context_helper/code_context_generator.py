@@ -20,15 +20,22 @@ import platform
 
 from ai_code_context_helper.file_utils import (
     normalize_path,
+    set_gitignore_backend,
 )
+from ai_code_context_helper.walk_guard import set_walk_options
 from ai_code_context_helper.settings_manager import SettingsManager
-from ai_code_context_helper.languages import LANGUAGES
+from ai_code_context_helper.languages import LANGUAGE_NAMES, load_language
 from ai_code_context_helper import __version__
 
 from ai_code_context_helper.gui_components import GUIComponents
 from ai_code_context_helper.tree_operations import TreeOperations
 from ai_code_context_helper.clipboard_operations import ClipboardOperations
 from ai_code_context_helper.dialogs import DialogManager
+from ai_code_context_helper.tree_model import TreeModel
+from ai_code_context_helper.jobs import JobManager
+from ai_code_context_helper.path_index import PathIndex
+from ai_code_context_helper.content_index import ContentIndex
+from ai_code_context_helper.import_graph import ImportGraph
 from ai_code_context_helper.config import (
     UI_FONT_FAMILY,
     UI_BUTTON_FONT_SIZE,
@@ -40,6 +47,7 @@ from ai_code_context_helper.config import (
     DEFAULT_WINDOW_MIN_SIZE,
     RESOURCES_DIR,
     ICON_FILENAME,
+    FILTER_DEBOUNCE_MS,
 )
 from ai_code_context_helper.tooltip import create_tooltip
 
@@ -53,9 +61,15 @@ class CodeContextGenerator:
         # 先隐藏窗口，避免在配置过程中显示
         self.root.withdraw()
 
-        self.languages = LANGUAGES
+        self.languages = LANGUAGE_NAMES
         # 初始化设置管理器
-        self.settings = SettingsManager(LANGUAGES)
+        self.settings = SettingsManager()
+        set_gitignore_backend(self.settings.gitignore_backend)
+        set_walk_options(
+            self.settings.follow_symlinks,
+            self.settings.same_filesystem,
+            self.settings.prune_directories,
+        )
         # 跟踪高级选项的显示状态
         self.show_advanced_options = self.settings.show_advanced_options_value
 
@@ -89,8 +103,16 @@ class CodeContextGenerator:
         self.CODE_SUFFIX = self.settings.CODE_SUFFIX
         self.dir_history = self.settings.dir_history
 
-        self.tree_items = {}
-        self.checked_items = set()
+        self.tree_model = TreeModel()
+        # 长时间操作的取消和进度管理
+        self.jobs = JobManager(self)
+        self._filter_job = None  # 等待执行的过滤器更新（after ID）
+        # 全项目文件名索引，用于快速打开
+        self.path_index = PathIndex()
+        # 全项目文件内容索引，用于按符号名或字符串查找文件
+        self.content_index = ContentIndex()
+        # Python 文件的导入关系，用于添加依赖
+        self.import_graph = ImportGraph()
 
         self.context_menu = tk.Menu(root, tearoff=0)
 
@@ -131,6 +153,16 @@ class CodeContextGenerator:
             "<Control-t>",
             lambda event: self._handle_shortcut(event, self.open_terminal),
         )
+        self.root.bind(
+            "<Control-p>",
+            lambda event: self._handle_shortcut(event, self.show_quick_open),
+        )
+        self.root.bind(
+            "<Control-Shift-F>",
+            lambda event: self._handle_shortcut(event, self.show_content_search),
+        )
+        # Esc 取消正在进行的长时间操作
+        self.root.bind("<Escape>", lambda event: self.jobs.cancel_all())
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
@@ -226,6 +258,13 @@ class CodeContextGenerator:
         callback_function()
         return "break"  # 阻止事件继续传播
 
+    def _get_dir_path(self, item_id):
+        """返回树节点对应的目录路径，不是目录时返回None"""
+        node = self.tree_model.node(item_id)
+        if node is None or not node.is_dir:
+            return None
+        return self.tree_model.path(node)
+
     def open_folder(self):
         """在资源管理器中打开选中的文件夹"""
         # 获取选中的项目
@@ -238,31 +277,31 @@ class CodeContextGenerator:
 
         item_id = selected_items[0]
         # 查找对应的路径
-        for path, tree_id in self.tree_items.items():
-            if tree_id == item_id and Path(path).is_dir():
-                try:
-                    import subprocess
-                    import os
-
-                    # 在Windows上使用explorer打开文件夹
-                    if os.name == "nt":
-                        subprocess.Popen(f'explorer "{path}"')
-                    # 在macOS上使用open命令
-                    elif os.name == "posix" and os.uname().sysname == "Darwin":
-                        subprocess.Popen(["open", path])
-                    # 在Linux上尝试使用xdg-open
-                    elif os.name == "posix":
-                        subprocess.Popen(["xdg-open", path])
-
-                    self.status_var.set(
-                        self.texts.get(
-                            "status_folder_opened", "已打开文件夹: {0}"
-                        ).format(path)
-                    )
-                    return
-                except Exception as e:
-                    self.status_var.set(f"打开文件夹失败: {str(e)}")
-                    return
+        path = self._get_dir_path(item_id)
+        if path:
+            try:
+                import subprocess
+                import os
+
+                # 在Windows上使用explorer打开文件夹
+                if os.name == "nt":
+                    subprocess.Popen(f'explorer "{path}"')
+                # 在macOS上使用open命令
+                elif os.name == "posix" and os.uname().sysname == "Darwin":
+                    subprocess.Popen(["open", path])
+                # 在Linux上尝试使用xdg-open
+                elif os.name == "posix":
+                    subprocess.Popen(["xdg-open", path])
+
+                self.status_var.set(
+                    self.texts.get(
+                        "status_folder_opened", "已打开文件夹: {0}"
+                    ).format(path)
+                )
+                return
+            except Exception as e:
+                self.status_var.set(f"打开文件夹失败: {str(e)}")
+                return
 
         self.status_var.set(self.texts.get("status_select_folder", "请选择一个文件夹"))
 
@@ -278,53 +317,53 @@ class CodeContextGenerator:
 
         item_id = selected_items[0]
         # 查找对应的路径
-        for path, tree_id in self.tree_items.items():
-            if tree_id == item_id and Path(path).is_dir():
-                try:
-                    import subprocess
-                    import os
-
-                    # 在Windows上使用cmd打开命令行
-                    if os.name == "nt":
-                        subprocess.Popen(f'start cmd /K "cd /d "{path}""', shell=True)
-                    # 在macOS上使用Terminal应用
-                    elif os.name == "posix" and os.uname().sysname == "Darwin":
-                        subprocess.Popen(["open", "-a", "Terminal", path])
-                    # 在Linux上尝试使用默认终端
-                    elif os.name == "posix":
-                        try:
-                            # 尝试使用xdg-terminal-exec (较新的发行版)
-                            subprocess.Popen(
-                                ["xdg-terminal-exec", "--working-directory", path]
-                            )
-                        except FileNotFoundError:
-                            # 回退到一些常见的终端模拟器
-                            for terminal in [
-                                "gnome-terminal",
-                                "konsole",
-                                "xfce4-terminal",
-                                "xterm",
-                            ]:
-                                try:
-                                    if terminal == "gnome-terminal":
-                                        subprocess.Popen(
-                                            [terminal, "--working-directory", path]
-                                        )
-                                    else:
-                                        subprocess.Popen([terminal, "--workdir", path])
-                                    break
-                                except FileNotFoundError:
-                                    continue
-
-                    self.status_var.set(
-                        self.texts.get(
-                            "status_terminal_opened", "已在 {0} 打开命令行"
-                        ).format(path)
-                    )
-                    return
-                except Exception as e:
-                    self.status_var.set(f"打开命令行失败: {str(e)}")
-                    return
+        path = self._get_dir_path(item_id)
+        if path:
+            try:
+                import subprocess
+                import os
+
+                # 在Windows上使用cmd打开命令行
+                if os.name == "nt":
+                    subprocess.Popen(f'start cmd /K "cd /d "{path}""', shell=True)
+                # 在macOS上使用Terminal应用
+                elif os.name == "posix" and os.uname().sysname == "Darwin":
+                    subprocess.Popen(["open", "-a", "Terminal", path])
+                # 在Linux上尝试使用默认终端
+                elif os.name == "posix":
+                    try:
+                        # 尝试使用xdg-terminal-exec (较新的发行版)
+                        subprocess.Popen(
+                            ["xdg-terminal-exec", "--working-directory", path]
+                        )
+                    except FileNotFoundError:
+                        # 回退到一些常见的终端模拟器
+                        for terminal in [
+                            "gnome-terminal",
+                            "konsole",
+                            "xfce4-terminal",
+                            "xterm",
+                        ]:
+                            try:
+                                if terminal == "gnome-terminal":
+                                    subprocess.Popen(
+                                        [terminal, "--working-directory", path]
+                                    )
+                                else:
+                                    subprocess.Popen([terminal, "--workdir", path])
+                                break
+                            except FileNotFoundError:
+                                continue
+
+                self.status_var.set(
+                    self.texts.get(
+                        "status_terminal_opened", "已在 {0} 打开命令行"
+                    ).format(path)
+                )
+                return
+            except Exception as e:
+                self.status_var.set(f"打开命令行失败: {str(e)}")
+                return
 
         self.status_var.set(self.texts.get("status_select_folder", "请选择一个文件夹"))
 
@@ -371,25 +410,19 @@ class CodeContextGenerator:
     def _check_load_children(self, item_id):
         """检查并确保节点的子内容被加载"""
         # 如果节点处于展开状态，确保其子内容已加载
-        if self.tree.item(item_id, "open"):
-            path = None
-            for p, tree_id in self.tree_items.items():
-                if tree_id == item_id:
-                    path = p
-                    break
-
-            if path and Path(path).is_dir():
+        if self.tree.exists(item_id) and self.tree.item(item_id, "open"):
+            node = self.tree_model.node(item_id)
+            if node is not None and node.is_dir:
                 # 使用tree_ops的方法加载内容
-                self.tree_ops._load_children_content(item_id, path)
+                self.tree_ops._ensure_children_loaded(node)
 
     def on_close(self):
         """窗口关闭时的处理函数，保存设置并销毁窗口"""
         print("应用程序关闭，保存最终状态")
         # 保存当前展开状态
         self._save_expanded_state()
-        # 强制保存设置
-        self.settings.settings_changed = True
-        self.settings.save_settings()
+        # 退出前立即写入设置
+        self.settings.flush()
         self.root.destroy()
 
     def toggle_topmost(self):
@@ -423,18 +456,19 @@ class CodeContextGenerator:
             # 标准化路径
             directory = normalize_path(directory)
             # 将展开状态重置为只有根目录
-            self.settings.expanded_states[directory] = ["."]
-            self.settings.settings_changed = True
+            self.settings.set_expanded_state(directory, ["."])
             # 生成树时不保留状态
-            self.tree_ops.generate_tree(preserve_state=False)
-            self.status_var.set(self.texts["status_tree_reset"])
+            self.tree_ops.generate_tree(
+                preserve_state=False,
+                on_done=lambda: self.status_var.set(self.texts["status_tree_reset"]),
+            )
 
     def update_tree(self):
         """更新目录树，保留当前展开状态"""
         print("===== 更新目录树 =====")
         directory = self.dir_path.get().strip()
         if directory and Path(directory).is_dir():
-            # 更新目录树时强制刷新 .gitignore 缓存
+            # 更新目录树时开始新的 .gitignore 扫描轮次（重新检查规则文件是否修改）
             from ai_code_context_helper.file_utils import clear_gitignore_cache
 
             clear_gitignore_cache()
@@ -468,77 +502,60 @@ class CodeContextGenerator:
                 first_visible_fraction = 0
                 first_visible_info = []
 
-            # 先保存当前的勾选状态
-            current_checked_states = {}
-
-            # 为每个路径记录其勾选状态
-            for path, item_id in self.tree_items.items():
-                is_checked = item_id in self.checked_items
-                current_checked_states[path] = is_checked
-
             # 保存当前展开状态
             self._save_expanded_state()
 
-            # 生成树时保留状态
-            self.tree_ops.generate_tree(preserve_state=True)
+            # 生成树时保留状态（模型按名称合并节点，勾选和展开状态随之保留），
+            # 目录在后台读取，完成后再恢复滚动位置
+            self.tree_ops.generate_tree(
+                preserve_state=True,
+                on_done=lambda: self._restore_scroll_position(
+                    first_visible_fraction, first_visible_info
+                ),
+            )
 
-            # 恢复勾选状态
-            new_checked_items = set()
-            for path, item_id in self.tree_items.items():
-                # 如果路径在之前的记录中，并且是勾选的
-                if path in current_checked_states and current_checked_states[path]:
-                    new_checked_items.add(item_id)
-                # 如果路径在之前的记录中，并且是取消勾选的
-                elif (
-                    path in current_checked_states and not current_checked_states[path]
-                ):
-                    self.tree.item(item_id, values=("",))
-                    self.tree.item(item_id, tags=("gray",))
-
-            # 更新勾选项集合
-            self.checked_items = new_checked_items
-
-            # 尝试恢复滚动位置
-            self.root.update_idletasks()  # 确保UI已更新
+    def _restore_scroll_position(self, first_visible_fraction, first_visible_info):
+        """更新目录树完成后恢复之前的滚动位置"""
+        self.root.update_idletasks()  # 确保UI已更新
 
-            try:
-                # 策略1: 尝试基于文本和父项找到相似的可见项
-                if first_visible_info:
-                    found_match = False
-                    for item_text, parent_text in first_visible_info:
-                        matching_items = []
-                        for item_id in self.tree.get_children():
-                            if (
-                                self.tree.exists(item_id)
-                                and self.tree.item(item_id, "text") == item_text
-                            ):
-                                p_id = self.tree.parent(item_id)
-                                if p_id and self.tree.item(p_id, "text") == parent_text:
-                                    matching_items.append(item_id)
-                                    found_match = True
-                                    break
-
-                        if matching_items:
-                            # 使项目可见并根据原始位置调整
-                            self.tree.see(matching_items[0])
-                            # 微调回原来的相对位置
-                            self.tree.yview_moveto(
-                                max(0, first_visible_fraction - 0.01)
-                            )
-                            found_match = True
-                            break
-
-                    # 如果找不到匹配项，尝试直接使用存储的分数位置
-                    if not found_match:
-                        self.tree.yview_moveto(first_visible_fraction)
-                else:
-                    # 没有保存项信息，使用存储的分数位置
+        try:
+            # 策略1: 尝试基于文本和父项找到相似的可见项
+            if first_visible_info:
+                found_match = False
+                for item_text, parent_text in first_visible_info:
+                    matching_items = []
+                    for item_id in self.tree.get_children():
+                        if (
+                            self.tree.exists(item_id)
+                            and self.tree.item(item_id, "text") == item_text
+                        ):
+                            p_id = self.tree.parent(item_id)
+                            if p_id and self.tree.item(p_id, "text") == parent_text:
+                                matching_items.append(item_id)
+                                found_match = True
+                                break
+
+                    if matching_items:
+                        # 使项目可见并根据原始位置调整
+                        self.tree.see(matching_items[0])
+                        # 微调回原来的相对位置
+                        self.tree.yview_moveto(
+                            max(0, first_visible_fraction - 0.01)
+                        )
+                        found_match = True
+                        break
+
+                # 如果找不到匹配项，尝试直接使用存储的分数位置
+                if not found_match:
                     self.tree.yview_moveto(first_visible_fraction)
-            except Exception as e:
-                print(f"恢复滚动位置时出错: {str(e)}")
-                # 出错时不做额外处理，使用默认滚动位置
+            else:
+                # 没有保存项信息，使用存储的分数位置
+                self.tree.yview_moveto(first_visible_fraction)
+        except Exception as e:
+            print(f"恢复滚动位置时出错: {str(e)}")
+            # 出错时不做额外处理，使用默认滚动位置
 
-            self.status_var.set(self.texts["status_tree_updated"])
+        self.status_var.set(self.texts["status_tree_updated"])
 
     def _save_expanded_state(self):
         """立即保存展开状态"""
@@ -546,38 +563,18 @@ class CodeContextGenerator:
         if not current_dir or not Path(current_dir).is_dir():
             return
 
+        # 切换目录后新目录树仍在后台读取时，模型还属于之前的项目
+        if self.tree_model.root is None or self.tree_model.root_path != str(
+            Path(current_dir)
+        ):
+            return
         current_dir = normalize_path(current_dir)
-        expanded_items = []
-
-        def collect_expanded_items(parent=""):
-            for item_id in self.tree.get_children(parent):
-                is_open = self.tree.item(item_id, "open")
-                item_path = None
-                for path, tree_id in self.tree_items.items():
-                    if tree_id == item_id:
-                        item_path = path
-                        break
 
-                if item_path and is_open and Path(item_path).is_dir():
-                    try:
-                        rel_path = str(Path(item_path).relative_to(Path(current_dir)))
-                        if rel_path == ".":
-                            expanded_items.append(".")
-                        else:
-                            expanded_items.append(rel_path)
-                        collect_expanded_items(item_id)
-                    except (ValueError, TypeError):
-                        pass
-
-        collect_expanded_items()
+        # 勾选状态在改变时已增量记录到项目状态中，这里只需保存展开路径
+        expanded_items = self.tree_model.expanded_paths()
+        self.settings.set_expanded_state(current_dir, expanded_items)
 
-        if "." not in expanded_items:
-            expanded_items.append(".")
-
-        self.settings.expanded_states[current_dir] = expanded_items
-        self.settings.settings_changed = True
-
-        # 立即保存关键状态
+        # 交给后台线程保存
         self.settings.save_settings()
 
     def change_language(self, *args):
@@ -587,7 +584,8 @@ class CodeContextGenerator:
 
         if selected_language and selected_language != self.current_language:
             self.current_language = selected_language
-            self.texts = LANGUAGES[self.current_language]
+            # 首次切换到该语言时才加载语言包
+            self.texts = load_language(self.current_language)
             self.settings.current_language = self.current_language
             self.settings.texts = self.texts
             self.settings.settings_changed = True
@@ -596,6 +594,11 @@ class CodeContextGenerator:
             print("语言已更改，正在更新系统托盘菜单...")
             self._create_system_tray()
 
+    def on_output_option_changed(self):
+        """复制和导出的输出选项改变时只需保存设置，无需更新目录树"""
+        self.settings.outline_mode_value = self.outline_mode.get()
+        self.settings.settings_changed = True
+
     def on_setting_option_changed(self, *args):
         """当设置选项改变时的处理函数"""
         self.settings.show_hidden_value = self.show_hidden.get()
@@ -606,17 +609,37 @@ class CodeContextGenerator:
         self.settings.file_filter_value = self.file_filter.get()
         self.settings.enable_easy_multiselect_value = self.enable_easy_multiselect.get()
         self.settings.use_gitignore_value = self.use_gitignore.get()
+        self.settings.use_git_index_value = self.use_git_index.get()
         self.settings.settings_changed = True
 
         directory = self.dir_path.get().strip()
-        if directory and Path(directory).is_dir():
-            # 如果是gitignore相关设置变更，强制刷新缓存
-            if args and self.settings.settings_changed:
-                from ai_code_context_helper.file_utils import clear_gitignore_cache
+        if not directory or not Path(directory).is_dir():
+            return
 
-                clear_gitignore_cache()
+        if self.tree_ops.scan_options_changed():
+            # .gitignore 和Git索引选项决定扫描结果，需要刷新缓存并重新读取目录
+            from ai_code_context_helper.file_utils import clear_gitignore_cache
 
+            clear_gitignore_cache()
             self.tree_ops.generate_tree(preserve_state=True)
+            return
+
+        # 其他显示选项只需按模型重新过滤。过滤器输入框（由变量跟踪触发，带参数）
+        # 在停止输入一段时间后才更新，避免每次按键都重建视图
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+            self._filter_job = None
+        if args:
+            self._filter_job = self.root.after(
+                FILTER_DEBOUNCE_MS, self._apply_view_filter
+            )
+        else:
+            self._apply_view_filter()
+
+    def _apply_view_filter(self):
+        """按当前显示选项重新过滤目录树"""
+        self._filter_job = None
+        self.tree_ops.apply_view_filter()
 
     def on_dir_changed(self, *args):
         """当目录路径改变时的处理函数"""
@@ -641,8 +664,7 @@ class CodeContextGenerator:
 
             # 清空目录树
             self.tree.delete(*self.tree.get_children())
-            self.tree_items = {}
-            self.checked_items = set()
+            self.tree_model.clear()
 
             # 重置当前加载的目录
             self._current_loaded_directory = None
@@ -697,8 +719,7 @@ class CodeContextGenerator:
             print(f"所选目录不存在: {selected_directory}")
             # 不清空目录地址栏，只清空目录树和显示错误信息
             self.tree.delete(*self.tree.get_children())
-            self.tree_items = {}
-            self.checked_items = set()
+            self.tree_model.clear()
             self._current_loaded_directory = None
             self.status_var.set(self.texts["error_invalid_dir"])
 
@@ -717,8 +738,8 @@ class CodeContextGenerator:
         # 触发目录变更处理
         self.on_dir_changed()
 
-        # 确保目录树已生成
-        if len(self.tree.get_children()) == 0:
+        # 确保目录树已生成（正在后台生成时无需重复启动）
+        if len(self.tree.get_children()) == 0 and self.jobs.running("scan") is None:
             print("Combobox选择后目录树为空，强制生成")
             self.tree_ops.generate_tree(preserve_state=True)
 
@@ -742,10 +763,9 @@ class CodeContextGenerator:
             removed_paths = self.dir_history[self.settings.max_history_items :]
             self.dir_history = self.dir_history[: self.settings.max_history_items]
 
-            # 清理不再需要的展开状态
+            # 清理不再需要的项目状态
             for path in removed_paths:
-                if path in self.settings.expanded_states:
-                    del self.settings.expanded_states[path]
+                self.settings.remove_project_state(path)
 
         self.dir_entry["values"] = self.dir_history
         self.settings.dir_history = self.dir_history
@@ -756,9 +776,8 @@ class CodeContextGenerator:
         if directory in self.dir_history:
             self.dir_history.remove(directory)
 
-            # 同时删除对应的展开状态
-            if directory in self.settings.expanded_states:
-                del self.settings.expanded_states[directory]
+            # 同时删除对应的项目状态
+            self.settings.remove_project_state(directory)
 
             self.dir_entry["values"] = self.dir_history
             self.settings.dir_history = self.dir_history
@@ -771,8 +790,7 @@ class CodeContextGenerator:
                 print(f"删除当前显示的目录: {directory}")
                 # 清空目录树
                 self.tree.delete(*self.tree.get_children())
-                self.tree_items = {}
-                self.checked_items = set()
+                self.tree_model.clear()
 
                 # 保持目录地址栏内容不变，只重置内部追踪变量
                 self._current_loaded_directory = None
@@ -782,8 +800,8 @@ class CodeContextGenerator:
         self.dir_history = []
         self.dir_entry["values"] = []
 
-        # 同时清空展开状态
-        self.settings.expanded_states = {}
+        # 同时清空项目状态
+        self.settings.clear_project_states()
 
         self.settings.dir_history = self.dir_history
         self.settings.settings_changed = True
@@ -791,8 +809,7 @@ class CodeContextGenerator:
 
         # 清空当前目录视图
         self.tree.delete(*self.tree.get_children())
-        self.tree_items = {}
-        self.checked_items = set()
+        self.tree_model.clear()
 
         # 清空目录地址栏
         self.dir_path.set("")
@@ -892,6 +909,15 @@ class CodeContextGenerator:
     def show_format_settings(self):
         return self.dialog_mgr.show_format_settings()
 
+    def show_quick_open(self):
+        return self.dialog_mgr.show_quick_open()
+
+    def show_content_search(self):
+        return self.dialog_mgr.show_content_search()
+
+    def show_add_dependencies(self):
+        return self.dialog_mgr.show_add_dependencies()
+
     def show_qrcode(self):
         return self.dialog_mgr.show_qrcode()
 
@@ -1040,9 +1066,8 @@ class CodeContextGenerator:
         print("从托盘退出应用程序")
         # 保存当前展开状态
         self._save_expanded_state()
-        # 强制保存设置
-        self.settings.settings_changed = True
-        self.settings.save_settings()
+        # 退出前立即写入设置
+        self.settings.flush()
 
         # 停止全局热键监听
         if hasattr(self, "hotkey_listener") and self.hotkey_listener:
@@ -33,15 +33,116 @@ FORMAT_WINDOW_MIN_SIZE = (500, 350)
 MAX_TEXT_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 CHINESE_ENCODINGS = ["utf-8", "gb18030", "gbk", "gb2312", "big5"]
 PREVIEW_CHARS_LENGTH = 1000  # 检查乱码的字符数
+TEXT_DETECT_BYTES = 1024 * 1024  # 判断是否为文本文件时最多读取的字节数
+
+# 复制和导出时单个文件的截断上限（0表示不限制）
+TRUNCATE_MAX_KB = 1024  # 超过此大小的文件只读取开头和结尾
+TRUNCATE_MAX_LINES = 20000  # 超过此行数的文件只保留开头和结尾
+TRUNCATE_HEAD_LINES = 300  # 截断时保留的开头行数
+TRUNCATE_TAIL_LINES = 100  # 截断时保留的结尾行数
+TRUNCATE_READ_BYTES = 256 * 1024  # 截断时开头和结尾各最多读取的字节数
 
 # 历史记录设置
 MAX_HISTORY_ITEMS = 50
 
+# 设置持久化
+SETTINGS_SAVE_DELAY = 0.5  # 秒，合并该时间窗口内的多次修改后再写入
+HISTORY_CHECK_TIMEOUT = 2.0  # 秒，检查历史目录是否存在的最长等待时间
+HISTORY_CHECK_INTERVAL = 60.0  # 秒，历史目录检查结果的有效期
+
+# 项目状态存储（展开、勾选状态和扫描缓存，每个项目一个文件）
+PROJECT_STATE_DIR = "project_states"  # 位于设置文件所在目录下
+MAX_PROJECT_STATES = 20  # 超出后按最近最少使用的顺序淘汰
+
+# 全部展开（在Tk事件循环中分片执行）
+EXPAND_ALL_MAX_NODES = 50000  # 一次全部展开最多加载的节点数
+EXPAND_ALL_SLICE_MS = 40  # 每个分片的最长执行时间（毫秒），超出后让出事件循环
+
+# 长时间操作的进度显示
+JOB_PROGRESS_INTERVAL = 0.1  # 秒，状态栏进度信息的最短刷新间隔
+JOB_POLL_MS = 50  # 后台线程执行的任务检查是否完成的间隔（毫秒）
+
+# 显示选项
+FILTER_DEBOUNCE_MS = 250  # 过滤器输入停止后等待的时间（毫秒），之后才重新过滤目录树
+
+# 快速打开（全项目文件名搜索）
+QUICK_OPEN_WINDOW_SIZE = "600x420"
+QUICK_OPEN_MAX_RESULTS = 100  # 最多显示的搜索结果数
+PATH_INDEX_POLL_MS = 300  # 后台建立文件索引时检查进度的间隔（毫秒）
+
+# 内容搜索（按符号名或字符串查找文件）
+CONTENT_SEARCH_WINDOW_SIZE = "600x460"
+CONTENT_SEARCH_MAX_RESULTS = 500  # 最多显示的搜索结果数（勾选全部时不受限制）
+CONTENT_INDEX_MAX_TOKEN_LENGTH = 64  # 更长的词（如编码数据）不加入索引
+CONTENT_INDEX_SNIFF_BYTES = 8192  # 在文件开头的这些字节中查找NUL字节判断二进制文件
+
+# 添加依赖（Python 导入关系）
+IMPORT_GRAPH_POOL_THRESHOLD = 64  # 需要解析的文件达到该数量时使用进程池并行解析
+IMPORT_GRAPH_POLL_MS = 50  # 后台刷新导入关系时检查进度的间隔（毫秒）
+DEPENDENCY_DEPTH_DEFAULT = 1  # 默认展开的导入层数，0表示不限制
+
+# 大纲模式
+OUTLINE_CACHE_SIZE = 10000  # 按内容哈希缓存的大纲数量上限
+
+# 复制和导出时合并内容相同的文件
+DEDUP_MIN_SIZE = 64  # 字节，更小的文件直接输出，不替换为引用
+FILE_HASH_WORKERS = 4  # 计算文件哈希的线程数
+FILE_HASH_CHUNK_SIZE = 1024 * 1024  # 计算哈希时每次读取的字节数
+
+# 分片导出（两个上限都为0时导出为单个文件）
+EXPORT_SHARD_MAX_KB = 0  # 每个分片的最大大小
+EXPORT_SHARD_MAX_TOKENS = 0  # 每个分片的最大估计 token 数
+EXPORT_READ_WORKERS = 4  # 导出时并行读取文件的线程数
+EXPORT_WRITE_WORKERS = 2  # 并行写入分片的线程数
+CHARS_PER_TOKEN = 4  # 估计 token 数时每个 token 对应的 ASCII 字符数
+
+# 并行遍历目录（全项目索引、导出和收集未加载目录中的文件）
+WALK_MAX_WORKERS = 16  # 最多使用的线程数，实际为处理器核数的两倍且不超过此值
+
+# 按 Git 索引列出文件
+GIT_COMMAND_TIMEOUT = 30  # 秒，调用 git 命令的超时时间
+
+# 判断 .gitignore 规则的方式
+GITIGNORE_BACKEND_PYTHON = "python"  # 内置的规则解析
+GITIGNORE_BACKEND_GIT = "git"  # git check-ignore（与 git 完全一致，需要安装 git）
+
+# 遍历目录时跟随目录符号链接的策略（无论哪种策略，都不会进入与上级目录相同的目录）
+SYMLINK_FOLLOW_ALWAYS = "always"  # 总是跟随
+SYMLINK_FOLLOW_INSIDE_PROJECT = "inside_project"  # 只跟随指向项目内的链接
+SYMLINK_FOLLOW_NEVER = "never"  # 不跟随，不列出目录符号链接
+
+# 默认排除的大型目录（依赖、虚拟环境、构建输出和缓存），只按名称判断，不依赖 .gitignore。
+# 目录树中显示为收起的占位节点，手动展开时才读取
+PRUNE_DIRECTORIES = (
+    "node_modules",
+    "bower_components",
+    ".venv",
+    "venv",
+    "__pycache__",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".tox",
+    ".nox",
+    "target",
+    ".gradle",
+    ".next",
+    ".nuxt",
+    ".terraform",
+    ".git",
+    ".hg",
+    ".svn",
+)
+
 # 资源路径配置
 RESOURCES_DIR = "resources"
 ICON_FILENAME = "icon.ico"
 QRCODE_FILENAME = "weixin.png"
 SETTINGS_FILENAME = "default_settings.json"
+LANGUAGES_DIR = "languages"  # 语言包目录（位于资源目录下）
+
+# 语言设置
+DEFAULT_LANGUAGE = "en_US"  # 默认语言，其他语言包缺失的文本从这里回退
 
 # 树形视图设置
 TREE_COLUMN_WIDTH = 400
@@ -0,0 +1,304 @@
+"""
+文件内容索引模块
+
+为项目中所有文本文件的内容建立词（token）倒排索引，用于按符号名或字符串
+查找包含它们的文件。词是由字母、数字和下划线组成的ASCII片段，不区分大小写。
+
+索引在后台线程中建立，并保存在项目状态目录中。之后每次刷新只比较文件的
+修改时间和大小，只有发生变化的文件才会重新读取，已删除的文件从索引中移除。
+
+Classes:
+    ContentIndex: 文件内容的倒排索引
+
+Functions:
+    build_content_index(index, root_dir, use_gitignore, job, cache_file, listing): 建立或刷新索引（在后台线程中调用）
+"""
+
+import json
+import os
+import re
+import threading
+from bisect import bisect_right
+
+from ai_code_context_helper.config import (
+    MAX_TEXT_FILE_SIZE,
+    CONTENT_INDEX_MAX_TOKEN_LENGTH,
+    CONTENT_INDEX_SNIFF_BYTES,
+)
+from ai_code_context_helper.path_index import walk_project
+from ai_code_context_helper.project_state import _atomic_write
+
+# 索引文件的格式版本，格式变化时旧的索引文件被忽略
+_CACHE_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(rb"\w{2,}")
+_QUERY_PATTERN = re.compile(r"\w+", re.ASCII)
+
+
+def _read_tokens(file_path, size):
+    """
+    读取文件并返回其中的词集合
+
+    超过大小上限的文件和二进制文件（开头包含NUL字节）返回空集合，
+    使其仍然记录在索引中，内容不变时不再重复读取。
+    """
+    if size > MAX_TEXT_FILE_SIZE:
+        return set()
+    with open(file_path, "rb") as f:
+        data = f.read()
+    if b"\0" in data[:CONTENT_INDEX_SNIFF_BYTES]:
+        return set()
+    return {
+        token.decode("ascii")
+        for token in set(_TOKEN_PATTERN.findall(data.lower()))
+        if len(token) <= CONTENT_INDEX_MAX_TOKEN_LENGTH
+    }
+
+
+class ContentIndex:
+    """
+    文件内容的倒排索引
+
+    路径使用 "/" 分隔。后台建立和查询可以在不同线程中进行，
+    所有公开方法都持有同一把锁。
+
+    Attributes:
+        root_dir (str): 索引对应的项目根目录，尚未建立时为None
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.root_dir = None
+        self._build_job = None  # 正在建立索引的任务
+        self._reset()
+
+    def _reset(self):
+        self._files = {}  # 相对路径 -> (修改时间, 大小, 词元组)
+        self._postings = {}  # 词 -> 相对路径集合
+        self._vocab = None  # 所有词的列表，用于子串匹配
+        self._vocab_blob = ""  # 所有词用换行符拼接的字符串
+        self._vocab_starts = []  # 词在拼接字符串中的起始位置
+
+    def begin_build(self, root_dir, job):
+        """
+        开始为项目根目录建立或刷新索引
+
+        根目录与当前索引相同时保留已有内容，只刷新变化的文件。
+
+        Args:
+            root_dir (str): 项目根目录
+            job (Job): 负责建立索引的任务
+        """
+        with self._lock:
+            if self.root_dir != root_dir:
+                self._reset()
+                self.root_dir = root_dir
+            self._build_job = job
+
+    @property
+    def building(self):
+        """是否正在后台建立索引"""
+        return self._build_job is not None
+
+    def finish_build(self, job):
+        """标记任务建立索引结束（任务已被新的任务取代时不影响新任务）"""
+        with self._lock:
+            if self._build_job is job:
+                self._build_job = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._files)
+
+    def file_meta(self, path):
+        """返回索引中文件的 (修改时间, 大小)，不在索引中时返回None"""
+        with self._lock:
+            entry = self._files.get(path)
+            return None if entry is None else entry[:2]
+
+    def paths(self):
+        """返回索引中所有文件的相对路径集合"""
+        with self._lock:
+            return set(self._files)
+
+    def _remove(self, path):
+        entry = self._files.pop(path, None)
+        if entry is None:
+            return
+        for token in entry[2]:
+            paths = self._postings.get(token)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._postings[token]
+        self._vocab = None
+
+    def _add(self, path, mtime, size, tokens):
+        self._files[path] = (mtime, size, tuple(tokens))
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(path)
+        self._vocab = None
+
+    def update_file(self, path, mtime, size, tokens):
+        """用文件的最新内容替换索引中的记录"""
+        with self._lock:
+            self._remove(path)
+            self._add(path, mtime, size, tokens)
+
+    def remove_files(self, paths):
+        """从索引中删除文件"""
+        with self._lock:
+            for path in paths:
+                self._remove(path)
+
+    def load(self, file_path):
+        """
+        从索引文件加载内容（索引为空时调用）
+
+        Returns:
+            bool: 是否成功加载
+        """
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"加载内容索引失败: {str(e)}")
+            return False
+        with self._lock:
+            if (
+                data.get("version") != _CACHE_VERSION
+                or data.get("root_dir") != self.root_dir
+            ):
+                return False
+            for path, (mtime, size, tokens) in data.get("files", {}).items():
+                self._add(path, mtime, size, tokens)
+        return True
+
+    def save(self, file_path):
+        """将索引写入文件"""
+        with self._lock:
+            data = {
+                "version": _CACHE_VERSION,
+                "root_dir": self.root_dir,
+                "files": {
+                    path: [mtime, size, list(tokens)]
+                    for path, (mtime, size, tokens) in self._files.items()
+                },
+            }
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        _atomic_write(file_path, json.dumps(data, ensure_ascii=False))
+
+    def _ensure_vocab(self):
+        """按需重建所有词拼接成的字符串（索引变化后第一次搜索时）"""
+        if self._vocab is not None:
+            return
+        self._vocab = list(self._postings)
+        self._vocab_starts = []
+        offset = 0
+        for token in self._vocab:
+            self._vocab_starts.append(offset)
+            offset += len(token) + 1
+        self._vocab_blob = "\n".join(self._vocab)
+
+    def _tokens_containing(self, term):
+        """在拼接的字符串中查找包含 term 的所有词，每个词只返回一次"""
+        blob = self._vocab_blob
+        starts = self._vocab_starts
+        position = blob.find(term)
+        while position >= 0:
+            token_id = bisect_right(starts, position) - 1
+            yield self._vocab[token_id]
+            if token_id + 1 >= len(starts):
+                break
+            position = blob.find(term, starts[token_id + 1])
+
+    def search(self, query):
+        """
+        查找内容包含所有查询词的文件
+
+        每个查询词匹配包含它的所有词（例如 "user" 匹配 "get_user"），
+        完整匹配的查询词越多的文件排在越前面。
+
+        Args:
+            query (str): 查询文本，非字母数字字符视为分隔符
+
+        Returns:
+            list: 按匹配程度排列的相对路径
+        """
+        terms = _QUERY_PATTERN.findall(query.lower())
+        if not terms:
+            return []
+
+        with self._lock:
+            self._ensure_vocab()
+            result = None
+            exact_counts = {}
+            for term in sorted(set(terms), key=len, reverse=True):
+                matched = set()
+                for token in self._tokens_containing(term):
+                    matched |= self._postings[token]
+                result = matched if result is None else result & matched
+                if not result:
+                    return []
+                for path in self._postings.get(term, ()):
+                    exact_counts[path] = exact_counts.get(path, 0) + 1
+
+        return sorted(result, key=lambda path: (-exact_counts.get(path, 0), path))
+
+
+def build_content_index(index, root_dir, use_gitignore, job, cache_file=None, listing=None):
+    """
+    建立或刷新内容索引（在后台线程中调用）
+
+    索引为空时先从索引文件加载上次的结果，然后遍历项目，只读取修改时间
+    或大小发生变化的文件。完整遍历后删除已不存在的文件。有变化时写回
+    索引文件，任务中途被取消时也保存已读取的部分。
+
+    Args:
+        index (ContentIndex): 要建立的索引
+        root_dir (str): 项目根目录
+        use_gitignore (bool): 是否应用 .gitignore 规则
+        job (Job): 任务，只读取其 cancelled 标记
+        cache_file (str): 索引文件路径，为None时不持久化
+        listing (GitListing): 项目的 Git 文件列表，为None时读取磁盘
+    """
+    try:
+        if cache_file and not len(index):
+            index.load(cache_file)
+
+        changed = False
+        seen = set()
+        for rel_dir, files, _ in walk_project(
+            root_dir, use_gitignore, job, listing
+        ):
+            if index.root_dir != root_dir:
+                return
+            prefix = rel_dir + "/" if rel_dir else ""
+            for name in files:
+                path = prefix + name
+                seen.add(path)
+                file_path = os.path.join(root_dir, path)
+                try:
+                    stat = os.stat(file_path)
+                    if index.file_meta(path) == (stat.st_mtime, stat.st_size):
+                        continue
+                    tokens = _read_tokens(file_path, stat.st_size)
+                except OSError:
+                    continue
+                index.update_file(path, stat.st_mtime, stat.st_size, tokens)
+                changed = True
+
+        if not job.cancelled:
+            removed = index.paths() - seen
+            if removed:
+                index.remove_files(removed)
+                changed = True
+
+        if changed and cache_file and index.root_dir == root_dir:
+            index.save(cache_file)
+    except Exception as e:
+        print(f"建立内容索引时出错: {str(e)}")
+    finally:
+        index.finish_build(job)
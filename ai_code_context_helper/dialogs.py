@@ -6,7 +6,7 @@
 """
 
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, simpledialog
 from PIL import Image, ImageTk
 from pathlib import Path
 import webbrowser
@@ -23,6 +23,13 @@ from ai_code_context_helper.config import (
     QRCODE_TEXT,
     UI_FONT_FAMILY,
     CHANGELOG_URL,
+    QUICK_OPEN_WINDOW_SIZE,
+    QUICK_OPEN_MAX_RESULTS,
+    PATH_INDEX_POLL_MS,
+    CONTENT_SEARCH_WINDOW_SIZE,
+    CONTENT_SEARCH_MAX_RESULTS,
+    FILTER_DEBOUNCE_MS,
+    DEPENDENCY_DEPTH_DEFAULT,
 )
 
 
@@ -40,6 +47,9 @@ class DialogManager:
         show_context_menu(event): 显示右键上下文菜单
         show_dir_history_menu(event): 显示目录历史记录的右键菜单
         show_format_settings(): 显示文本格式设置对话框
+        show_quick_open(): 显示全项目文件名搜索窗口
+        show_content_search(): 显示按文件内容搜索并批量勾选的窗口
+        show_add_dependencies(): 询问导入层数并为选中的 .py 文件添加依赖
         show_qrcode(): 显示公众号二维码图片
         open_changelog(): 打开更新日志页面
     """
@@ -52,6 +62,7 @@ class DialogManager:
             parent (CodeContextGenerator): 父对象，提供对主应用程序的访问
         """
         self.parent = parent
+        self._dependency_depth = DEPENDENCY_DEPTH_DEFAULT  # 上次选择的导入层数
 
     def show_context_menu(self, event):
         """
@@ -74,11 +85,8 @@ class DialogManager:
 
         self.parent.context_menu.delete(0, tk.END)
 
-        is_directory = False
-        for path, tree_id in self.parent.tree_items.items():
-            if tree_id == item and Path(path).is_dir():
-                is_directory = True
-                break
+        node = self.parent.tree_model.node(item)
+        is_directory = node is not None and node.is_dir
 
         if is_directory:
             # 检查是否只选择了一个目录
@@ -117,6 +125,20 @@ class DialogManager:
             label=self.parent.texts["copy_filename"] + " (Ctrl+B)",
             command=self.parent.clipboard_ops.copy_filename,
         )
+        self.parent.context_menu.add_command(
+            label=self.parent.texts.get("add_dependencies", "添加依赖..."),
+            command=self.show_add_dependencies,
+        )
+        self.parent.context_menu.add_separator()
+        self.parent.context_menu.add_command(
+            label=self.parent.texts.get("quick_open", "快速打开文件") + " (Ctrl+P)",
+            command=self.show_quick_open,
+        )
+        self.parent.context_menu.add_command(
+            label=self.parent.texts.get("content_search", "搜索文件内容")
+            + " (Ctrl+Shift+F)",
+            command=self.show_content_search,
+        )
 
         self.parent.context_menu.post(event.x_root, event.y_root)
 
@@ -253,6 +275,342 @@ class DialogManager:
         cancel_btn.pack(side=tk.RIGHT, padx=5)
         create_tooltip(cancel_btn, self.parent.texts["tooltip_cancel_btn"])
 
+    def show_quick_open(self):
+        """
+        显示全项目文件名搜索窗口
+
+        输入时在文件索引中模糊搜索所有文件（包括未展开的目录），
+        回车在目录树中定位选中的结果，Ctrl+回车勾选选中的结果。
+        """
+        texts = self.parent.texts
+        index = self.parent.path_index
+        if self.parent.tree_model.root is None:
+            self.parent.status_var.set(texts["error_invalid_dir"])
+            return
+
+        window = tk.Toplevel(self.parent.root)
+        window.title(texts.get("quick_open", "快速打开文件"))
+        window.geometry(QUICK_OPEN_WINDOW_SIZE)
+        window.transient(self.parent.root)
+        self.parent.gui.center_window(window)
+
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        query_var = tk.StringVar()
+        entry = ttk.Entry(frame, textvariable=query_var)
+        entry.pack(fill=tk.X)
+        create_tooltip(
+            entry,
+            texts.get(
+                "tooltip_quick_open",
+                "输入文件名的一部分，多个词用空格分隔\n回车: 在目录树中定位  Ctrl+回车: 勾选",
+            ),
+        )
+
+        list_frame = ttk.Frame(frame)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        results_list = tk.Listbox(
+            list_frame,
+            selectmode=tk.EXTENDED,
+            activestyle="dotbox",
+            font=(UI_FONT_FAMILY, 10),
+            yscrollcommand=scrollbar.set,
+        )
+        scrollbar.configure(command=results_list.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        results_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        info_var = tk.StringVar()
+        ttk.Label(frame, textvariable=info_var).pack(fill=tk.X)
+
+        results = []
+
+        def update_results(*args):
+            """按输入内容重新搜索"""
+            results[:] = index.search(query_var.get(), QUICK_OPEN_MAX_RESULTS)
+            results_list.delete(0, tk.END)
+            for path in results:
+                results_list.insert(tk.END, path)
+            if results:
+                results_list.selection_set(0)
+                results_list.activate(0)
+            if index.building:
+                info_var.set(
+                    texts.get("quick_open_indexing", "正在建立索引，已索引 {0} 个文件...").format(
+                        len(index)
+                    )
+                )
+            else:
+                info_var.set(
+                    texts.get("quick_open_count", "{0} 个结果 | 共 {1} 个文件").format(
+                        len(results), len(index)
+                    )
+                )
+
+        def refresh_while_building():
+            """索引仍在建立时定期刷新结果"""
+            if not window.winfo_exists():
+                return
+            if index.building:
+                update_results()
+                window.after(PATH_INDEX_POLL_MS, refresh_while_building)
+            else:
+                update_results()
+
+        def selected_paths():
+            return [results[i] for i in results_list.curselection() if i < len(results)]
+
+        def reveal(event=None):
+            """在目录树中定位第一个选中的结果"""
+            paths = selected_paths()
+            if not paths:
+                return "break"
+            if self.parent.tree_ops.reveal_path(paths[0]):
+                self.parent.status_var.set(
+                    texts.get("status_revealed", "已定位: {0}").format(paths[0])
+                )
+                window.destroy()
+            else:
+                info_var.set(
+                    texts.get(
+                        "status_reveal_hidden", "{0} 不存在或被当前的显示选项隐藏"
+                    ).format(paths[0])
+                )
+            return "break"
+
+        def check(event=None):
+            """勾选所有选中的结果"""
+            paths = selected_paths()
+            if not paths:
+                return "break"
+            count = self.parent.tree_ops.check_paths(paths)
+            self.parent._save_expanded_state()
+            info_var.set(
+                texts.get("status_paths_checked", "已勾选 {0} 个文件").format(count)
+            )
+            return "break"
+
+        def move_selection(offset):
+            if not results:
+                return "break"
+            current = results_list.curselection()
+            position = current[0] if current else -1
+            position = max(0, min(len(results) - 1, position + offset))
+            results_list.selection_clear(0, tk.END)
+            results_list.selection_set(position)
+            results_list.activate(position)
+            results_list.see(position)
+            return "break"
+
+        query_var.trace_add("write", update_results)
+        entry.bind("<Down>", lambda event: move_selection(1))
+        entry.bind("<Up>", lambda event: move_selection(-1))
+        for widget in (entry, results_list):
+            widget.bind("<Return>", reveal)
+            widget.bind("<Control-Return>", check)
+        results_list.bind("<Double-1>", reveal)
+        window.bind("<Escape>", lambda event: window.destroy())
+
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(
+            btn_frame, text=texts.get("quick_open_reveal", "定位"), command=reveal
+        ).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(
+            btn_frame, text=texts.get("quick_open_check", "勾选"), command=check
+        ).pack(side=tk.RIGHT, padx=5)
+
+        update_results()
+        if index.building:
+            window.after(PATH_INDEX_POLL_MS, refresh_while_building)
+        entry.focus_set()
+
+    def show_content_search(self):
+        """
+        显示按文件内容搜索的窗口
+
+        打开时在后台刷新内容索引（只读取修改过的文件），输入停止后按词搜索
+        包含所有查询词的文件。结果可以在目录树中定位，也可以批量勾选。
+        """
+        texts = self.parent.texts
+        index = self.parent.content_index
+        if self.parent.tree_model.root is None:
+            self.parent.status_var.set(texts["error_invalid_dir"])
+            return
+        self.parent.tree_ops.start_content_index()
+
+        window = tk.Toplevel(self.parent.root)
+        window.title(texts.get("content_search", "搜索文件内容"))
+        window.geometry(CONTENT_SEARCH_WINDOW_SIZE)
+        window.transient(self.parent.root)
+        self.parent.gui.center_window(window)
+
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        query_var = tk.StringVar()
+        entry = ttk.Entry(frame, textvariable=query_var)
+        entry.pack(fill=tk.X)
+        create_tooltip(
+            entry,
+            texts.get(
+                "tooltip_content_search",
+                "输入符号名或字符串，多个词需要同时出现在文件中，不区分大小写\n"
+                "回车: 在目录树中定位  Ctrl+回车: 勾选全部结果",
+            ),
+        )
+
+        list_frame = ttk.Frame(frame)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        results_list = tk.Listbox(
+            list_frame,
+            selectmode=tk.EXTENDED,
+            activestyle="dotbox",
+            font=(UI_FONT_FAMILY, 10),
+            yscrollcommand=scrollbar.set,
+        )
+        scrollbar.configure(command=results_list.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        results_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        info_var = tk.StringVar()
+        ttk.Label(frame, textvariable=info_var).pack(fill=tk.X)
+
+        results = []
+        pending = [None]  # 等待执行的搜索（after ID）
+
+        def update_results():
+            """按输入内容重新搜索"""
+            pending[0] = None
+            results[:] = index.search(query_var.get())
+            results_list.delete(0, tk.END)
+            for path in results[:CONTENT_SEARCH_MAX_RESULTS]:
+                results_list.insert(tk.END, path)
+            if index.building:
+                info_var.set(
+                    texts.get(
+                        "content_search_indexing", "正在刷新内容索引，已索引 {0} 个文件..."
+                    ).format(len(index))
+                )
+            else:
+                info_var.set(
+                    texts.get(
+                        "content_search_count", "{0} 个文件匹配（显示前 {1} 个）| 共 {2} 个文件"
+                    ).format(
+                        len(results),
+                        min(len(results), CONTENT_SEARCH_MAX_RESULTS),
+                        len(index),
+                    )
+                )
+
+        def schedule_search(*args):
+            """输入停止一段时间后再搜索"""
+            if pending[0] is not None:
+                window.after_cancel(pending[0])
+            pending[0] = window.after(FILTER_DEBOUNCE_MS, update_results)
+
+        def refresh_while_building():
+            """索引仍在刷新时定期更新结果"""
+            if not window.winfo_exists():
+                return
+            building = index.building
+            update_results()
+            if building:
+                # 刷新结束后再更新一次，显示完整的结果
+                window.after(PATH_INDEX_POLL_MS, refresh_while_building)
+
+        def search_now(event=None):
+            if pending[0] is not None:
+                window.after_cancel(pending[0])
+            update_results()
+            return "break"
+
+        def reveal(event=None):
+            """在目录树中定位第一个选中的结果"""
+            selection = results_list.curselection()
+            if not selection:
+                return "break"
+            path = results[selection[0]]
+            if self.parent.tree_ops.reveal_path(path):
+                self.parent.status_var.set(
+                    texts.get("status_revealed", "已定位: {0}").format(path)
+                )
+            else:
+                info_var.set(
+                    texts.get(
+                        "status_reveal_hidden", "{0} 不存在或被当前的显示选项隐藏"
+                    ).format(path)
+                )
+            return "break"
+
+        def check(paths):
+            if not paths:
+                return "break"
+            count = self.parent.tree_ops.check_paths(paths)
+            self.parent._save_expanded_state()
+            info_var.set(
+                texts.get("status_paths_checked", "已勾选 {0} 个文件").format(count)
+            )
+            return "break"
+
+        def check_selected():
+            return check([results[i] for i in results_list.curselection()])
+
+        def check_all(event=None):
+            return check(list(results))
+
+        query_var.trace_add("write", schedule_search)
+        entry.bind("<Return>", search_now)
+        entry.bind("<Control-Return>", check_all)
+        results_list.bind("<Return>", reveal)
+        results_list.bind("<Double-1>", reveal)
+        results_list.bind("<Control-Return>", lambda event: check_selected())
+        window.bind("<Escape>", lambda event: window.destroy())
+
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(
+            btn_frame, text=texts.get("quick_open_reveal", "定位"), command=reveal
+        ).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(
+            btn_frame,
+            text=texts.get("content_search_check_selected", "勾选选中"),
+            command=check_selected,
+        ).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(
+            btn_frame,
+            text=texts.get("content_search_check_all", "勾选全部结果"),
+            command=check_all,
+        ).pack(side=tk.RIGHT, padx=5)
+
+        update_results()
+        if index.building:
+            window.after(PATH_INDEX_POLL_MS, refresh_while_building)
+        entry.focus_set()
+
+    def show_add_dependencies(self):
+        """询问导入层数，然后将选中的 .py 文件导入的项目内模块加入选择"""
+        texts = self.parent.texts
+        if self.parent.tree_model.root is None:
+            self.parent.status_var.set(texts["error_invalid_dir"])
+            return
+        depth = simpledialog.askinteger(
+            texts.get("add_dependencies", "添加依赖..."),
+            texts.get(
+                "prompt_dependency_depth", "导入层数（1 表示只添加直接导入的模块，0 表示不限制）："
+            ),
+            parent=self.parent.root,
+            initialvalue=self._dependency_depth,
+            minvalue=0,
+        )
+        if depth is None:
+            return
+        self._dependency_depth = depth
+        self.parent.tree_ops.add_dependencies(depth)
+
     def show_qrcode(self):
         """
         显示公众号二维码图片
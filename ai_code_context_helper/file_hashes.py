@@ -0,0 +1,103 @@
+"""
+文件内容哈希模块
+
+复制和导出前为待输出的文件计算内容哈希，找出内容完全相同的文件，
+使重复的文件只输出一次，之后的副本改为引用第一次出现的路径。
+
+只有大小相同的文件才可能内容相同，因此只为大小与其他文件相同的文件计算哈希。
+哈希在线程池中计算（hashlib 在计算较大的数据时会释放GIL），
+并按 (路径, 修改时间, 大小) 缓存，文件未变化时不重复读取。
+
+Functions:
+    find_duplicates(paths): 返回内容与之前某个文件相同的文件及其原始文件
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_code_context_helper.config import (
+    FILE_HASH_WORKERS,
+    FILE_HASH_CHUNK_SIZE,
+    DEDUP_MIN_SIZE,
+)
+
+_cache = {}  # 路径 -> (修改时间, 大小, 哈希)
+_cache_lock = threading.Lock()
+
+
+def _hash_file(path, mtime, size):
+    """计算文件内容的哈希并写入缓存，读取失败时返回None"""
+    digest = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(FILE_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    result = digest.hexdigest()
+    with _cache_lock:
+        _cache[path] = (mtime, size, result)
+    return result
+
+
+def find_duplicates(paths):
+    """
+    找出内容与之前某个文件完全相同的文件
+
+    小于 DEDUP_MIN_SIZE 的文件（如空的 __init__.py）直接输出比引用更短，不参与比较。
+
+    Args:
+        paths (list): 按输出顺序排列的文件路径
+
+    Returns:
+        dict: 重复文件的路径 -> 第一个内容相同的文件的路径
+    """
+    by_size = {}
+    stats = {}
+    for path in paths:
+        path = str(path)
+        if path in stats:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size < DEDUP_MIN_SIZE:
+            continue
+        stats[path] = (stat.st_mtime, stat.st_size)
+        by_size.setdefault(stat.st_size, []).append(path)
+
+    candidates = [path for group in by_size.values() if len(group) > 1 for path in group]
+    if not candidates:
+        return {}
+
+    digests = {}
+    pending = []
+    with _cache_lock:
+        for path in candidates:
+            cached = _cache.get(path)
+            if cached is not None and cached[:2] == stats[path]:
+                digests[path] = cached[2]
+            else:
+                pending.append(path)
+    if pending:
+        with ThreadPoolExecutor(max_workers=FILE_HASH_WORKERS) as executor:
+            results = executor.map(
+                lambda path: _hash_file(path, *stats[path]), pending
+            )
+            digests.update(zip(pending, results))
+
+    first = {}  # (大小, 哈希) -> 第一个文件
+    duplicates = {}
+    for path in stats:
+        digest = digests.get(path)
+        if digest is None:
+            continue
+        key = (stats[path][1], digest)
+        if key in first:
+            duplicates[path] = first[key]
+        else:
+            first[key] = path
+    return duplicates
@@ -5,56 +5,80 @@
 内容读取和编码处理等。支持智能检测文本文件的编码，特别对中文编码
 提供了增强支持。
 
+Classes:
+    TruncationPolicy: 复制和导出时单个文件的大小和行数上限
+
 Functions:
+    get_resources_dir(): 返回资源文件所在目录（兼容开发模式和打包后的路径）
     normalize_path(path): 将路径标准化为Windows风格
+    set_gitignore_backend(backend): 选择判断 .gitignore 规则的方式
+    clear_gitignore_cache(): 开始新的扫描轮次并重新检查已缓存的.gitignore文件
+    gitignore_rules_changed(): 当前扫描轮次开始时是否发现.gitignore规则发生变化
+    gitignored_names(directory, names, root_dir): 返回目录中被 .gitignore 忽略的条目名称
     is_text_file(file_path): 检测文件是否为文本文件
-    read_file_content(path_obj): 智能读取文件内容，自动处理编码
+    read_file_content(path_obj, truncation): 智能读取文件内容，自动处理编码
+    read_head_tail(file_path, head_lines, tail_lines, encoding): 只读取文件开头和结尾的若干行
+    read_truncated(file_path, size, truncation, encoding): 读取超过大小上限的文件的开头和结尾
+    truncate_lines(content, truncation): 超过行数上限时只保留开头和结尾的若干行
 """
 
 import os
 import re
+import sys
+import threading
+from collections import namedtuple
 from pathlib import Path
-from charset_normalizer import from_path, is_binary
+from charset_normalizer import from_bytes, from_path, is_binary
 from ai_code_context_helper.config import (
     MAX_TEXT_FILE_SIZE,
     CHINESE_ENCODINGS,
     PREVIEW_CHARS_LENGTH,
+    TEXT_DETECT_BYTES,
+    TRUNCATE_READ_BYTES,
+    GITIGNORE_BACKEND_PYTHON,
+    GITIGNORE_BACKEND_GIT,
+    RESOURCES_DIR,
 )
+from ai_code_context_helper.gitignore_oracle import get_oracle, close_oracles
+
+
+class TruncationPolicy(
+    namedtuple(
+        "TruncationPolicy",
+        "max_bytes max_lines head_lines tail_lines size_marker lines_marker",
+        defaults=(
+            "... [已截断：文件共 {0}，只保留开头 {1} 行和结尾 {2} 行] ...",
+            "... [已截断：省略中间 {0} 行，共 {1} 行] ...",
+        ),
+    )
+):
+    """
+    复制和导出时单个文件的大小和行数上限
 
-_gitignore_cache = {}
-
-
-def _should_refresh_cache(gitignore_path):
-    """检查是否需要刷新缓存"""
-    if not os.path.exists(gitignore_path):
-        return True
-
-    try:
-        current_mtime = os.path.getmtime(gitignore_path)
-        if gitignore_path in _gitignore_cache:
-            cached_mtime, _ = _gitignore_cache[gitignore_path]
-            return current_mtime != cached_mtime
-        return True
-    except OSError:
-        return True
+    超过 max_bytes 的文件只从开头和结尾读取 head_lines 和 tail_lines 行，
+    不读取中间部分；不超过大小上限但超过 max_lines 行的文件同样只保留
+    开头和结尾的行。上限为0表示不限制。size_marker 和 lines_marker 是
+    两种情况下代替中间部分的截断标记（按界面语言设置）。
+    """
 
+    def exceeds_size(self, size):
+        """文件大小是否超过上限"""
+        return bool(self.max_bytes) and size > self.max_bytes
 
-def _parse_gitignore(gitignore_path):
-    """解析.gitignore文件，带简化的缓存机制"""
-    if not os.path.exists(gitignore_path):
-        return []
+# .gitignore 文件路径 -> (验证时的扫描轮次, 修改时间, 规则列表)；文件不存在时修改时间为None
+_gitignore_cache = {}
+_gitignore_cache_lock = threading.Lock()
+_gitignore_epoch = 0  # 当前扫描轮次，每次刷新目录树时加一
+_gitignore_changed_epoch = 0  # 最近一次发现规则文件变化的扫描轮次
+_gitignore_backend = GITIGNORE_BACKEND_PYTHON
 
-    # 检查是否需要刷新缓存
-    if not _should_refresh_cache(gitignore_path):
-        _, rules = _gitignore_cache[gitignore_path]
-        return rules
 
+def _read_gitignore_rules(gitignore_path):
+    """读取并解析.gitignore文件中的规则"""
     print(f"重新解析 .gitignore 文件: {gitignore_path}")
 
     rules = []
     try:
-        current_mtime = os.path.getmtime(gitignore_path)
-
         with open(gitignore_path, "r", encoding="utf-8") as f:
             for line_num, line in enumerate(f, 1):
                 line = line.rstrip("\n\r")
@@ -70,7 +94,6 @@ def _parse_gitignore(gitignore_path):
                 except Exception as e:
                     print(f"Error parsing {gitignore_path} line {line_num}: {e}")
 
-        _gitignore_cache[gitignore_path] = (current_mtime, rules)
         print(f"已缓存 .gitignore 规则: {len(rules)} 条规则")
 
     except Exception as e:
@@ -79,16 +102,90 @@ def _parse_gitignore(gitignore_path):
     return rules
 
 
+def _parse_gitignore(gitignore_path):
+    """
+    返回.gitignore文件中的规则，文件不存在时返回空列表
+
+    每个文件在一个扫描轮次内最多检查一次修改时间，修改时间未变化时沿用
+    之前解析的规则，因此刷新目录树时未修改的文件无需重新解析。
+    可以在多个线程中同时调用：字典的读写持有锁，检查和解析文件不持有锁，
+    两个线程同时解析同一个文件时结果相同，后写入的覆盖先写入的。
+    """
+    epoch = _gitignore_epoch
+    with _gitignore_cache_lock:
+        entry = _gitignore_cache.get(gitignore_path)
+    if entry is not None and entry[0] == epoch:
+        return entry[2]
+
+    try:
+        mtime = os.stat(gitignore_path).st_mtime
+    except OSError:
+        mtime = None
+    if entry is not None and entry[1] == mtime:
+        rules = entry[2]
+    elif mtime is None:
+        rules = []
+    else:
+        rules = _read_gitignore_rules(gitignore_path)
+
+    with _gitignore_cache_lock:
+        _gitignore_cache[gitignore_path] = (epoch, mtime, rules)
+    return rules
+
+
 def clear_gitignore_cache():
-    """清除所有.gitignore缓存"""
-    global _gitignore_cache
-    old_count = len(_gitignore_cache)
-    _gitignore_cache = {}
-    print(f"已清除 {old_count} 个.gitignore缓存项")
+    """
+    开始新的扫描轮次，立即重新检查已缓存且存在的.gitignore文件
+
+    未修改的文件沿用已解析的规则，修改过或删除的文件重新解析。尚不存在的文件
+    仍在使用时才检查：新建文件会改变所在目录的修改时间，由调用方发现。
+    同时关闭 git check-ignore 进程并清除其结果。
+
+    Returns:
+        bool: 是否有规则文件发生变化
+    """
+    global _gitignore_epoch, _gitignore_changed_epoch
+    with _gitignore_cache_lock:
+        _gitignore_epoch += 1
+        epoch = _gitignore_epoch
+        entries = list(_gitignore_cache.items())
+
+    changed = False
+    for gitignore_path, (_, mtime, rules) in entries:
+        if mtime is None:
+            continue
+        try:
+            current_mtime = os.stat(gitignore_path).st_mtime
+        except OSError:
+            current_mtime = None
+        if current_mtime != mtime:
+            changed = True
+            rules = _read_gitignore_rules(gitignore_path) if current_mtime else []
+        with _gitignore_cache_lock:
+            _gitignore_cache[gitignore_path] = (epoch, current_mtime, rules)
+    if changed:
+        _gitignore_changed_epoch = epoch
+
+    close_oracles()
+    print(f"已开始新的 .gitignore 扫描轮次，缓存 {len(entries)} 个路径")
+    return changed
+
+
+def gitignore_rules_changed():
+    """
+    返回当前扫描轮次开始时是否发现.gitignore规则发生变化
+
+    使用 git check-ignore 时无法得知 git 读取的规则文件是否变化，总是返回True。
+    """
+    if _gitignore_backend == GITIGNORE_BACKEND_GIT:
+        return True
+    return _gitignore_changed_epoch == _gitignore_epoch
 
 
 def force_refresh_gitignore():
-    """强制刷新所有.gitignore缓存（通过清除缓存实现）"""
+    """强制刷新所有.gitignore缓存（清除所有已解析的规则）"""
+    with _gitignore_cache_lock:
+        _gitignore_cache.clear()
     clear_gitignore_cache()
     print("已强制刷新所有 .gitignore 缓存")
 
@@ -284,10 +381,8 @@ def is_ignored_by_gitignore(path, root_dir):
     gitignore_files = []
     rel_dir = os.path.dirname(rel_path)
 
-    # 添加根目录的.gitignore
-    root_gitignore = os.path.join(root_dir, ".gitignore")
-    if os.path.exists(root_gitignore):
-        gitignore_files.append((root_gitignore, ""))
+    # 添加根目录的.gitignore（是否存在由缓存在每个扫描轮次检查一次）
+    gitignore_files.append((os.path.join(root_dir, ".gitignore"), ""))
 
     # 逐级添加子目录的.gitignore
     if rel_dir and rel_dir != ".":
@@ -295,9 +390,7 @@ def is_ignored_by_gitignore(path, root_dir):
         for i in range(len(path_parts)):
             sub_path = "/".join(path_parts[: i + 1])
             sub_dir = os.path.join(root_dir, sub_path.replace("/", os.sep))
-            sub_gitignore = os.path.join(sub_dir, ".gitignore")
-            if os.path.exists(sub_gitignore):
-                gitignore_files.append((sub_gitignore, sub_path))
+            gitignore_files.append((os.path.join(sub_dir, ".gitignore"), sub_path))
 
     # 按照Git的规则处理每个.gitignore文件
     for gitignore_path, gitignore_rel_dir in gitignore_files:
@@ -327,6 +420,67 @@ def is_ignored_by_gitignore(path, root_dir):
     return ignored
 
 
+def set_gitignore_backend(backend):
+    """
+    选择判断 .gitignore 规则的方式
+
+    Args:
+        backend (str): GITIGNORE_BACKEND_PYTHON 使用内置规则，
+            GITIGNORE_BACKEND_GIT 使用 git check-ignore（项目不在仓库中时仍使用内置规则）
+    """
+    global _gitignore_backend
+    _gitignore_backend = backend
+    close_oracles()
+
+
+def gitignored_names(directory, names, root_dir):
+    """
+    返回目录中被 .gitignore 忽略的条目名称
+
+    使用 git check-ignore 时整个目录的条目作为一批查询，结果按目录缓存；
+    否则逐个条目按内置规则判断。
+
+    Args:
+        directory (str): 目录的绝对路径
+        names (list): 目录中条目的名称
+        root_dir (str): 项目根目录（绝对路径）
+
+    Returns:
+        set: 被忽略的名称
+    """
+    if _gitignore_backend == GITIGNORE_BACKEND_GIT:
+        oracle = get_oracle(root_dir)
+        if oracle is not None:
+            rel_dir = os.path.relpath(directory, root_dir)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+            ignored = oracle.ignored_names(rel_dir, names)
+            if ignored is not None:
+                return ignored
+    return {
+        name
+        for name in names
+        if is_ignored_by_gitignore(os.path.join(directory, name), root_dir)
+    }
+
+
+def get_resources_dir():
+    """
+    返回资源文件所在目录
+
+    开发模式下为启动脚本旁的 resources 目录；打包后资源文件
+    与可执行文件放在同一目录。
+
+    Returns:
+        Path: 资源目录路径
+    """
+    script_dir = Path(os.path.dirname(os.path.abspath(sys.argv[0])))
+    # 开发模式使用当前包目录
+    if os.path.exists(os.path.join(script_dir, RESOURCES_DIR)):
+        return script_dir / RESOURCES_DIR
+    # 否则使用打包后的路径
+    return script_dir
+
+
 def normalize_path(path):
     """将路径中的正斜杠转换为反斜杠，统一使用Windows风格路径"""
     if path:
@@ -350,12 +504,13 @@ def is_text_file(file_path):
 
     try:
         with open(str(path), "rb") as f:
-            content = f.read()
+            # 较大的文件只检测开头部分，避免为了判断类型读取整个文件
+            content = f.read(TEXT_DETECT_BYTES)
             # 如果是二进制文件，返回False
             if is_binary(content):
                 return False
-            # 使用from_path尝试检测编码，如果有结果则是文本文件
-            matches = from_path(str(path))
+            # 尝试检测编码，如果有结果则是文本文件
+            matches = from_bytes(content)
             return len(matches) > 0
     except Exception:
         return False
@@ -364,6 +519,15 @@ def is_text_file(file_path):
     return False
 
 
+def format_file_size(size_bytes):
+    """将字节数格式化为易读的大小字符串"""
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes/1024:.1f} KB"
+    return f"{size_bytes/(1024*1024):.1f} MB"
+
+
 def get_file_stats(file_path):
     """
     获取文件统计信息（行数和大小）
@@ -378,14 +542,7 @@ def get_file_stats(file_path):
     try:
         # 获取文件大小
         size_bytes = path.stat().st_size
-
-        # 格式化文件大小
-        if size_bytes < 1024:
-            size_str = f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            size_str = f"{size_bytes/1024:.1f} KB"
-        else:
-            size_str = f"{size_bytes/(1024*1024):.1f} MB"
+        size_str = format_file_size(size_bytes)
 
         # 获取文件行数
         if is_text_file(file_path):
@@ -403,43 +560,166 @@ def get_file_stats(file_path):
         return 0, 0, "0 B"
 
 
-def read_file_content(path_obj):
-    """智能读取文件内容，使用多种方法尝试检测正确的编码"""
+def read_file_content(path_obj, truncation=None):
+    """
+    智能读取文件内容，使用多种方法尝试检测正确的编码
+
+    Args:
+        path_obj (Path): 文件路径
+        truncation (TruncationPolicy): 大小和行数上限，为None时读取完整内容
+    """
     try:
         # 如果文件不存在或大小为0，返回空字符串
-        if not path_obj.exists() or path_obj.stat().st_size == 0:
+        if not path_obj.exists():
+            return ""
+        size = path_obj.stat().st_size
+        if size == 0:
             return ""
 
         # 先检查是否为文本文件
         if not is_text_file(path_obj):
             raise Exception("文件不是文本文件")
 
-        # 使用charset_normalizer检测可能的编码并遍历所有匹配项
-        matches = from_path(str(path_obj))
+        if truncation is not None and truncation.exceeds_size(size):
+            return read_truncated(path_obj, size, truncation)
+        content = _read_full_content(path_obj)
+        return truncate_lines(content, truncation) if truncation else content
 
-        # 尝试所有中文常见编码（如果检测到中文）
-        best_match = matches.best()
-        if best_match and best_match.language == "Chinese":
-            for encoding in CHINESE_ENCODINGS:
-                try:
-                    with open(str(path_obj), "r", encoding=encoding) as f:
-                        content = f.read()
-                        # 检查是否有乱码特征
-                        if (
-                            not "\ufffd" in content[:PREVIEW_CHARS_LENGTH]
-                        ):  # 检查前1000个字符中是否有替换字符
-                            return content
-                except UnicodeDecodeError:
-                    continue
+    except Exception as e:
+        raise Exception(f"无法读取文件: {str(e)}")
 
-        # 返回最可能匹配的结果
-        if len(matches) > 0:
-            return str(matches.best())
 
-        return open(str(path_obj), "r", encoding="utf-8", errors="replace").read()
+def _read_full_content(path_obj):
+    """读取完整的文件内容，按检测到的编码解码"""
+    # 使用charset_normalizer检测可能的编码并遍历所有匹配项
+    matches = from_path(str(path_obj))
+
+    # 尝试所有中文常见编码（如果检测到中文）
+    best_match = matches.best()
+    if best_match and best_match.language == "Chinese":
+        for encoding in CHINESE_ENCODINGS:
+            try:
+                with open(str(path_obj), "r", encoding=encoding) as f:
+                    content = f.read()
+                    # 检查是否有乱码特征
+                    if (
+                        not "\ufffd" in content[:PREVIEW_CHARS_LENGTH]
+                    ):  # 检查前1000个字符中是否有替换字符
+                        return content
+            except UnicodeDecodeError:
+                continue
+
+    # 返回最可能匹配的结果
+    if len(matches) > 0:
+        return str(matches.best())
+
+    return open(str(path_obj), "r", encoding="utf-8", errors="replace").read()
+
+
+def read_head_tail(file_path, head_lines, tail_lines, encoding=None):
+    """
+    只读取文件开头和结尾的若干行
+
+    开头和结尾各最多读取 TRUNCATE_READ_BYTES 字节，不读取中间部分，
+    因此读取时间和内存与文件大小无关。按换行符切分，不会截断多字节字符
+    （单行超过读取上限时除外）。
+
+    Args:
+        file_path (str): 文件路径
+        head_lines (int): 保留的开头行数
+        tail_lines (int): 保留的结尾行数
+        encoding (str): 文件编码，为None时根据开头部分检测
+
+    Returns:
+        tuple: (开头部分的文本, 结尾部分的文本, 省略的行数)，文件中间部分
+            未读取时省略的行数为None
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        head = f.read(TRUNCATE_READ_BYTES)
+        tail_start = max(len(head), size - TRUNCATE_READ_BYTES)
+        f.seek(tail_start)
+        tail = f.read(TRUNCATE_READ_BYTES)
+
+    omitted = None
+    if tail_start == len(head):
+        # 开头和结尾相接，整个文件都已读取：按实际行数截取，避免重复或遗漏
+        data = head + tail
+        lines = (data[:-1] if data.endswith(b"\n") else data).split(b"\n")
+        tail_from = max(head_lines, len(lines) - tail_lines)
+        omitted = max(0, tail_from - head_lines)
+        head = b"\n".join(lines[:head_lines])
+        tail = b"\n".join(lines[tail_from:])
+    else:
+        head = b"\n".join(head.split(b"\n", head_lines)[:head_lines])
+        if tail_lines:
+            body = tail[:-1] if tail.endswith(b"\n") else tail
+            parts = body.rsplit(b"\n", tail_lines)
+            if len(parts) <= tail_lines:
+                parts = parts[1:]  # 第一行可能从中间开始
+            tail = b"\n".join(parts[-tail_lines:])
+        else:
+            tail = b""
+
+    if encoding is None:
+        best_match = from_bytes(head).best()
+        encoding = best_match.encoding if best_match else "utf-8"
+    return (
+        head.decode(encoding, errors="replace"),
+        tail.decode(encoding, errors="replace"),
+        omitted,
+    )
+
+
+def read_truncated(file_path, size, truncation, encoding=None):
+    """
+    读取超过大小上限的文件的开头和结尾，中间用截断标记代替
+
+    Args:
+        file_path (str): 文件路径
+        size (int): 文件大小
+        truncation (TruncationPolicy): 大小和行数上限
+        encoding (str): 文件编码，为None时根据开头部分检测
+
+    Returns:
+        str: 截断后的内容
+    """
+    head, tail, omitted = read_head_tail(
+        str(file_path), truncation.head_lines, truncation.tail_lines, encoding
+    )
+    if omitted == 0:
+        marker = ""  # 开头和结尾已包含全部内容
+    else:
+        marker = truncation.size_marker.format(
+            format_file_size(size), truncation.head_lines, truncation.tail_lines
+        )
+    return "\n".join(part for part in (head, marker, tail) if part) + "\n"
+
+
+def truncate_lines(content, truncation):
+    """
+    超过行数上限时只保留开头和结尾的若干行
+
+    Args:
+        content (str): 文件内容
+        truncation (TruncationPolicy): 大小和行数上限
+
+    Returns:
+        str: 未超过上限时返回原内容，否则返回截断后的内容
+    """
+    if not truncation.max_lines:
+        return content
+    lines = content.splitlines()
+    if len(lines) <= truncation.max_lines:
+        return content
+    # 开头和结尾的行数之和不少于总行数时结尾从开头之后开始，不重复输出
+    tail_from = max(truncation.head_lines, len(lines) - truncation.tail_lines)
+    omitted = tail_from - truncation.head_lines
+    if omitted <= 0:
+        return content
+    marker = truncation.lines_marker.format(omitted, len(lines))
+    return "\n".join(lines[: truncation.head_lines] + [marker] + lines[tail_from:]) + "\n"
 
-    except Exception as e:
-        raise Exception(f"无法读取文件: {str(e)}")
 
 def has_hidden_attribute(filepath):
     """检查Windows系统下的隐藏文件属性"""
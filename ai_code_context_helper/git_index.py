@@ -0,0 +1,322 @@
+"""
+Git 文件列表模块
+
+项目位于 Git 仓库中时，Git 已经知道哪些文件被跟踪，无需在 Python 中逐个条目
+判断 .gitignore 规则。这里直接解析 .git/index 得到已跟踪的文件，无法解析时
+（如拆分索引、稀疏索引或 SHA-256 仓库）改为调用一次 git ls-files；可选地再调用
+一次 git ls-files --others --exclude-standard 加入未跟踪且未被忽略的文件。
+
+得到的列表一次性按目录分组，目录树读取目录、后台遍历项目和收集文件都从中取得
+条目，只用一次 listdir 排除工作区中已删除的文件。
+
+Classes:
+    GitListing: 按目录分组的 Git 文件列表
+
+Functions:
+    find_repository(path): 查找路径所在仓库的工作区根目录和 .git 目录
+    read_index(git_dir): 解析 .git/index，返回已跟踪的路径
+    list_git_files(root_dir, include_untracked): 返回项目的 Git 文件列表
+"""
+
+import os
+import struct
+import subprocess
+
+from ai_code_context_helper.config import GIT_COMMAND_TIMEOUT
+from ai_code_context_helper.parallel_walk import parallel_walk
+from ai_code_context_helper.walk_guard import WalkGuard
+
+_MODE_TYPE_MASK = 0o170000
+_MODE_DIR = 0o040000  # 稀疏索引中代表整个目录的条目
+_MODE_GITLINK = 0o160000  # 子模块
+
+_ENTRY_FLAGS_OFFSET = 60  # 条目中标志位的偏移（其前为时间戳、模式、大小和 SHA-1）
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE = 0x3000
+_CHECKSUM_SIZE = 20
+
+
+class GitListing:
+    """
+    按目录分组的 Git 文件列表
+
+    创建后不再修改，可以在多个线程中共享。路径使用 "/" 分隔。
+
+    Attributes:
+        root_dir (str): 项目根目录
+    """
+
+    def __init__(self, root_dir, files, directories=()):
+        """
+        Args:
+            root_dir (str): 项目根目录
+            files (iterable): 文件的相对路径
+            directories (iterable): 没有列出内容的目录（子模块、未跟踪的嵌套仓库）
+        """
+        self.root_dir = root_dir
+        self._dirs = {"": (set(), set())}  # 相对路径 -> (子目录名集合, 文件名集合)
+        self._file_count = 0
+        for path in files:
+            rel_dir, _, name = path.rpartition("/")
+            self._directory(rel_dir)[1].add(name)
+            self._file_count += 1
+        for path in directories:
+            self._directory(path.rstrip("/"))
+
+    def _directory(self, rel_dir):
+        """返回目录的条目集合，不存在时逐级创建"""
+        entry = self._dirs.get(rel_dir)
+        if entry is None:
+            entry = self._dirs[rel_dir] = (set(), set())
+            parent, _, name = rel_dir.rpartition("/")
+            self._directory(parent)[0].add(name)
+        return entry
+
+    def __len__(self):
+        return self._file_count
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, GitListing)
+            and self.root_dir == other.root_dir
+            and self._dirs == other._dirs
+        )
+
+    __hash__ = None
+
+    def children(self, rel_dir):
+        """
+        返回目录中列出的子目录名和文件名
+
+        Args:
+            rel_dir (str): 目录的相对路径，根目录为空字符串
+
+        Returns:
+            tuple: (子目录名集合, 文件名集合)，目录不在列表中时均为空
+        """
+        return self._dirs.get(rel_dir, (set(), set()))
+
+    def walk(self, job):
+        """
+        按列表遍历项目的所有目录，与 walk_project 的结果格式相同
+
+        跳过隐藏的文件和目录、默认排除的大型目录，以及工作区中已不存在的条目。多个线程并行检查
+        目录，目录按先序给出，文件和子目录按名称排序。任务被取消时提前结束。
+        """
+
+        guard = WalkGuard(self.root_dir)
+
+        def list_directory(rel_dir):
+            directory = os.path.join(self.root_dir, rel_dir) if rel_dir else self.root_dir
+            try:
+                existing = set(os.listdir(directory))
+            except OSError:
+                return None, []
+            dir_names, file_names = self._dirs[rel_dir]
+            dirs = sorted(
+                n
+                for n in dir_names
+                if n in existing and not n.startswith(".") and not guard.prunes(n)
+            )
+            files = sorted(n for n in file_names if n in existing and not n.startswith("."))
+            return (files, dirs), dirs
+
+        for rel_dir, listed in parallel_walk(list_directory, job):
+            if listed is not None:
+                yield (rel_dir, *listed)
+
+
+def find_repository(path):
+    """
+    查找路径所在仓库的工作区根目录和 .git 目录
+
+    支持 .git 为文件（工作树和子模块）的情况。
+
+    Returns:
+        tuple: (工作区根目录, .git 目录)，不在仓库中时返回None
+    """
+    directory = os.path.abspath(path)
+    while True:
+        candidate = os.path.join(directory, ".git")
+        if os.path.isdir(candidate):
+            return directory, candidate
+        if os.path.isfile(candidate):
+            try:
+                with open(candidate, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+            except OSError:
+                return None
+            if content.startswith("gitdir:"):
+                git_dir = content[len("gitdir:") :].strip()
+                return directory, os.path.normpath(os.path.join(directory, git_dir))
+            return None
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _read_varint(data, pos):
+    """读取 index v4 中路径前缀压缩使用的变长整数"""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+def read_index(git_dir):
+    """
+    解析 .git/index，返回已跟踪的路径
+
+    支持索引格式版本 2、3 和 4。拆分索引、稀疏索引和 SHA-256 仓库的索引
+    无法单独从这个文件得到完整的列表，抛出 ValueError 由调用方改用 git ls-files。
+
+    Args:
+        git_dir (str): .git 目录
+
+    Returns:
+        tuple: (文件的相对路径列表, 子模块的相对路径列表)，相对于工作区根目录
+    """
+    with open(os.path.join(git_dir, "index"), "rb") as f:
+        data = f.read()
+    if data[:4] != b"DIRC":
+        raise ValueError("不是 Git 索引文件")
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        raise ValueError(f"不支持的索引版本 {version}")
+
+    files = []
+    gitlinks = []
+    pos = 12
+    previous = b""
+    for _ in range(count):
+        start = pos
+        mode = struct.unpack_from(">I", data, start + 24)[0]
+        flags = struct.unpack_from(">H", data, start + _ENTRY_FLAGS_OFFSET)[0]
+        pos = start + _ENTRY_FLAGS_OFFSET + 2
+        if flags & _FLAG_EXTENDED:
+            pos += 2
+        if version == 4:
+            strip, pos = _read_varint(data, pos)
+            end = data.index(b"\0", pos)
+            path = previous[: len(previous) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b"\0", pos)
+            path = data[pos:end]
+            # 条目以1到8个NUL字节补齐到8的倍数
+            pos = start + ((end - start + 8) & ~7)
+
+        if path == previous and flags & _FLAG_STAGE:
+            continue  # 冲突的多个阶段只保留一次
+        previous = path
+        kind = mode & _MODE_TYPE_MASK
+        if kind == _MODE_DIR:
+            raise ValueError("稀疏索引")
+        (gitlinks if kind == _MODE_GITLINK else files).append(os.fsdecode(path))
+
+    # 拆分索引的条目保存在共享索引中
+    while pos + 8 <= len(data) - _CHECKSUM_SIZE:
+        signature = data[pos : pos + 4]
+        if signature == b"link":
+            raise ValueError("拆分索引")
+        size = struct.unpack_from(">I", data, pos + 4)[0]
+        pos += 8 + size
+    if pos != len(data) - _CHECKSUM_SIZE:
+        raise ValueError("索引文件格式不正确")
+    return files, gitlinks
+
+
+def _run_git(root_dir, args):
+    """在项目根目录中运行 git 命令，返回标准输出，失败时返回None"""
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=root_dir,
+            capture_output=True,
+            timeout=GIT_COMMAND_TIMEOUT,
+            **kwargs,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"运行 git {' '.join(args)} 失败: {str(e)}")
+        return None
+    if result.returncode != 0:
+        print(
+            f"git {' '.join(args)} 失败: {result.stderr.decode('utf-8', 'replace').strip()}"
+        )
+        return None
+    return result.stdout
+
+
+def _ls_files_tracked(root_dir):
+    """用 git ls-files 获取项目中已跟踪的文件和子模块（相对于项目根目录）"""
+    output = _run_git(root_dir, ["ls-files", "-z", "--stage"])
+    if output is None:
+        return None
+    files = []
+    gitlinks = []
+    previous = None
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        info, _, path = record.partition(b"\t")
+        if path == previous:
+            continue
+        previous = path
+        mode = int(info.split(b" ", 1)[0], 8)
+        kind = mode & _MODE_TYPE_MASK
+        (gitlinks if kind == _MODE_GITLINK else files).append(os.fsdecode(path))
+    return files, gitlinks
+
+
+def list_git_files(root_dir, include_untracked=False):
+    """
+    返回项目的 Git 文件列表
+
+    Args:
+        root_dir (str): 项目根目录，可以是仓库的子目录
+        include_untracked (bool): 是否加入未跟踪且未被 .gitignore 忽略的文件
+
+    Returns:
+        GitListing: 文件列表；项目不在 Git 仓库中或无法获取列表时返回None
+    """
+    repo = find_repository(root_dir)
+    if repo is None:
+        return None
+    work_tree, git_dir = repo
+
+    try:
+        files, gitlinks = read_index(git_dir)
+        prefix = os.path.relpath(os.path.abspath(root_dir), work_tree)
+        if prefix != ".":
+            # 项目是仓库的子目录时只保留其中的路径
+            prefix = prefix.replace(os.sep, "/") + "/"
+            files = [p[len(prefix) :] for p in files if p.startswith(prefix)]
+            gitlinks = [p[len(prefix) :] for p in gitlinks if p.startswith(prefix)]
+    except FileNotFoundError:
+        files, gitlinks = [], []  # 尚未添加过任何文件
+    except Exception as e:
+        print(f"无法直接读取 Git 索引，改用 git ls-files: {str(e)}")
+        tracked = _ls_files_tracked(root_dir)
+        if tracked is None:
+            return None
+        files, gitlinks = tracked
+
+    if include_untracked:
+        output = _run_git(root_dir, ["ls-files", "-z", "--others", "--exclude-standard"])
+        if output is not None:
+            for record in output.split(b"\0"):
+                if not record:
+                    continue
+                path = os.fsdecode(record)
+                # 未跟踪的嵌套仓库以 "/" 结尾
+                (gitlinks if path.endswith("/") else files).append(path)
+
+    return GitListing(root_dir, files, gitlinks)
@@ -0,0 +1,185 @@
+"""
+Git 忽略规则查询模块
+
+用 git 自身判断路径是否被忽略，结果与 git 完全一致（包括否定规则与父目录、
+"**" 的各种情况、.git/info/exclude 和 core.excludesFile）。每个项目启动一个
+长期运行的 git check-ignore --stdin 进程，一个目录的所有条目作为一批写入，
+结果按目录缓存，之后再读取同一目录时无需再次查询。
+
+与 git status 一样，已跟踪的文件不被视为忽略。git 进程在启动时读取忽略规则，
+清除 .gitignore 缓存时同时关闭所有进程和缓存，下次查询时重新启动。
+
+Classes:
+    GitIgnoreOracle: 单个项目的 git check-ignore 进程和查询结果缓存
+
+Functions:
+    get_oracle(root_dir): 返回项目的查询对象，项目不在 Git 仓库中或无法运行 git 时返回None
+    close_oracles(): 关闭所有 git 进程并清除缓存
+"""
+
+import os
+import subprocess
+import threading
+
+from ai_code_context_helper.git_index import find_repository
+
+_oracles = {}  # 项目根目录 -> GitIgnoreOracle（无法使用时为None）
+_oracles_lock = threading.Lock()
+
+
+class GitIgnoreOracle:
+    """
+    单个项目的 git check-ignore 进程和查询结果缓存
+
+    查询可以来自Tk线程和后台遍历线程，进程的读写和缓存都持有同一把锁。
+    进程意外退出后不再使用，is_broken 为True，调用方改用自己的规则判断。
+
+    Attributes:
+        root_dir (str): 项目根目录
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._process = None
+        self._buffer = b""
+        self._broken = False
+        self._memo = {}  # 目录的相对路径 -> {名称: 是否被忽略}
+
+    @property
+    def is_broken(self):
+        """进程是否已无法使用"""
+        return self._broken
+
+    def _start(self):
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        self._process = subprocess.Popen(
+            ["git", "check-ignore", "--stdin", "-z", "--non-matching", "-v"],
+            cwd=self.root_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            **kwargs,
+        )
+        self._buffer = b""
+
+    def _read_fields(self, count):
+        """从输出中读取 count 个以NUL结尾的字段"""
+        stdout = self._process.stdout
+        available = self._buffer.count(b"\0")
+        chunks = [self._buffer]
+        while available < count:
+            chunk = stdout.read1(65536)
+            if not chunk:
+                raise EOFError("git check-ignore 进程已退出")
+            chunks.append(chunk)
+            available += chunk.count(b"\0")
+        fields = b"".join(chunks).split(b"\0", count)
+        self._buffer = fields.pop()
+        return fields
+
+    def _query(self, paths):
+        """
+        查询一批路径是否被忽略（调用方持有锁）
+
+        写入在单独的线程中进行，避免 git 的输出填满管道时双方互相等待。
+        """
+        if self._process is None or self._process.poll() is not None:
+            self._start()
+        payload = b"".join(os.fsencode(path) + b"\0" for path in paths)
+        stdin = self._process.stdin
+
+        def write():
+            try:
+                stdin.write(payload)
+                stdin.flush()
+            except OSError:
+                pass  # 进程退出，读取时会发现
+
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        try:
+            # 每个路径输出四个字段：规则来源、行号、规则、路径；未匹配时前三个为空
+            fields = self._read_fields(4 * len(paths))
+            return [
+                bool(source) and not pattern.startswith(b"!")
+                for source, pattern in zip(fields[0::4], fields[2::4])
+            ]
+        finally:
+            writer.join()
+
+    def ignored_names(self, rel_dir, names):
+        """
+        返回目录中被忽略的条目名称
+
+        Args:
+            rel_dir (str): 目录相对于项目根目录的路径（"/" 分隔，根目录为空字符串）
+            names (iterable): 目录中条目的名称
+
+        Returns:
+            set: 被忽略的名称；进程无法使用时返回None
+        """
+        names = list(names)
+        with self._lock:
+            if self._broken:
+                return None
+            known = self._memo.setdefault(rel_dir, {})
+            missing = [name for name in names if name not in known]
+            if missing:
+                prefix = rel_dir + "/" if rel_dir else ""
+                try:
+                    results = self._query([prefix + name for name in missing])
+                except (OSError, EOFError, ValueError) as e:
+                    print(f"git check-ignore 查询失败，改用内置的 .gitignore 规则: {str(e)}")
+                    self._broken = True
+                    self._close()
+                    return None
+                known.update(zip(missing, results))
+            return {name for name in names if known[name]}
+
+    def _close(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except Exception:
+            process.kill()
+
+    def close(self):
+        """关闭 git 进程"""
+        with self._lock:
+            self._close()
+
+
+def get_oracle(root_dir):
+    """
+    返回项目的查询对象
+
+    Args:
+        root_dir (str): 项目根目录
+
+    Returns:
+        GitIgnoreOracle: 查询对象；项目不在 Git 仓库中或进程已无法使用时返回None
+    """
+    with _oracles_lock:
+        if root_dir not in _oracles:
+            _oracles[root_dir] = (
+                GitIgnoreOracle(root_dir) if find_repository(root_dir) else None
+            )
+        oracle = _oracles[root_dir]
+    if oracle is None or oracle.is_broken:
+        return None
+    return oracle
+
+
+def close_oracles():
+    """关闭所有 git 进程并清除缓存（.gitignore 文件可能已修改）"""
+    with _oracles_lock:
+        oracles = [oracle for oracle in _oracles.values() if oracle is not None]
+        _oracles.clear()
+    for oracle in oracles:
+        oracle.close()
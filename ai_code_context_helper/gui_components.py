@@ -23,7 +23,10 @@ from ai_code_context_helper.config import (
     SIZE_COLUMN_WIDTH,
     SIZE_COLUMN_MIN_WIDTH,
 )
-from ai_code_context_helper.markdown_exporter import generate_markdown
+from ai_code_context_helper.markdown_exporter import (
+    generate_markdown,
+    generate_markdown_shards,
+)
 from ai_code_context_helper.tree_operations import TreeOperations
 
 
@@ -157,15 +160,12 @@ class GUIComponents:
         self.parent.language_names = {}  # 用于存储显示名称到代码的映射
         language_display_names = []
 
-        for lang_code in self.parent.languages.keys():
-            name = self.parent.languages[lang_code]["language_name"]
+        for lang_code, name in self.parent.languages.items():
             self.parent.language_names[name] = lang_code
             language_display_names.append(name)
 
         # 获取当前语言的显示名称
-        current_display_name = self.parent.languages[self.parent.current_language][
-            "language_name"
-        ]
+        current_display_name = self.parent.languages[self.parent.current_language]
 
         # 语言选择下拉框
         self.parent.language_var = tk.StringVar(value=current_display_name)
@@ -276,6 +276,25 @@ class GUIComponents:
             self.parent.texts["tooltip_use_gitignore"],
         )
 
+        # 按Git索引列出文件选项
+        self.parent.use_git_index = tk.BooleanVar(
+            value=self.parent.settings.use_git_index_value
+        )
+        self.parent.use_git_index_cb = ttk.Checkbutton(
+            left_options,
+            text=self.parent.texts.get("use_git_index", "使用Git索引"),
+            variable=self.parent.use_git_index,
+            command=self.parent.on_setting_option_changed,
+        )
+        self.parent.use_git_index_cb.pack(anchor=tk.W)
+        create_tooltip(
+            self.parent.use_git_index_cb,
+            self.parent.texts.get(
+                "tooltip_use_git_index",
+                "项目在Git仓库中时直接从Git索引读取文件列表（包括未跟踪且未被忽略的文件），不再逐个判断 .gitignore 规则",
+            ),
+        )
+
         # 显示文件选项 - 在目录树中显示文件
         self.parent.show_files = tk.BooleanVar(
             value=self.parent.settings.show_files_value
@@ -321,6 +340,25 @@ class GUIComponents:
             self.parent.relative_path_cb, self.parent.texts["tooltip_use_relative"]
         )
 
+        # 大纲模式选项 - 复制和导出时只输出导入、类和函数签名以及文档字符串
+        self.parent.outline_mode = tk.BooleanVar(
+            value=self.parent.settings.outline_mode_value
+        )
+        self.parent.outline_mode_cb = ttk.Checkbutton(
+            left_options,
+            text=self.parent.texts.get("outline_mode", "大纲模式"),
+            variable=self.parent.outline_mode,
+            command=self.parent.on_output_option_changed,
+        )
+        self.parent.outline_mode_cb.pack(anchor=tk.W)
+        create_tooltip(
+            self.parent.outline_mode_cb,
+            self.parent.texts.get(
+                "tooltip_outline_mode",
+                "复制和导出代码时只输出导入语句、类和函数签名以及文档字符串，省略函数体",
+            ),
+        )
+
         # 启用鼠标框选模式选项 - 允许通过鼠标拖动批量选择文件
         self.parent.enable_easy_multiselect = tk.BooleanVar(
             value=self.parent.settings.enable_easy_multiselect_value
@@ -663,11 +701,18 @@ class GUIComponents:
         self.parent.relative_path_cb.configure(
             text=self.parent.texts["use_relative_path"]
         )
+        self.parent.outline_mode_cb.configure(
+            text=self.parent.texts.get("outline_mode", "大纲模式")
+        )
         # 更新use_gitignore复选框文本
         if hasattr(self.parent, "use_gitignore_cb"):
             self.parent.use_gitignore_cb.configure(
                 text=self.parent.texts["use_gitignore"]
             )
+        if hasattr(self.parent, "use_git_index_cb"):
+            self.parent.use_git_index_cb.configure(
+                text=self.parent.texts.get("use_git_index", "使用Git索引")
+            )
 
         # 更新深度和过滤器标签
         self.parent.depth_label.configure(text=self.parent.texts["max_depth"])
@@ -704,6 +749,13 @@ class GUIComponents:
         create_tooltip(
             self.parent.relative_path_cb, self.parent.texts["tooltip_use_relative"]
         )
+        create_tooltip(
+            self.parent.outline_mode_cb,
+            self.parent.texts.get(
+                "tooltip_outline_mode",
+                "复制和导出代码时只输出导入语句、类和函数签名以及文档字符串，省略函数体",
+            ),
+        )
         create_tooltip(
             self.parent.format_btn, self.parent.texts["tooltip_format_settings"]
         )
@@ -752,20 +804,48 @@ class GUIComponents:
                 self.parent.use_gitignore_cb,
                 self.parent.texts["tooltip_use_gitignore"],
             )
+        if hasattr(self.parent, "use_git_index_cb"):
+            create_tooltip(
+                self.parent.use_git_index_cb,
+                self.parent.texts.get(
+                    "tooltip_use_git_index",
+                    "项目在Git仓库中时直接从Git索引读取文件列表（包括未跟踪且未被忽略的文件），不再逐个判断 .gitignore 规则",
+                ),
+            )
 
     def export_markdown(self):
         """
         导出选中节点及其子节点的所有文件到Markdown
-        只负责界面交互和调用收集逻辑。
+        只负责界面交互和调用收集逻辑。未读取过的目录和文件内容都在后台线程中读取，
+        导出期间界面保持响应，可以按 Esc 取消。
         """
         selected_items = self.parent.tree.selection()
         if not selected_items:
             self.parent.status_var.set(self.parent.texts.get("status_no_selection", "未选中任何项"))
             return
 
+        model = self.parent.tree_model
+        folders = [
+            node
+            for node in (model.node(item) for item in selected_items)
+            if node is not None and node.is_dir
+        ]
+        job = self.parent.jobs.start(
+            "export", self.parent.texts.get("job_export", "导出")
+        )
+        self.parent.tree_ops.prefetch_unread(
+            folders,
+            job,
+            lambda: self._export_selected(job, selected_items),
+            checked_only=False,
+        )
+
+    def _export_selected(self, job, selected_items):
+        """目录预读完成后收集文件、询问保存位置，并在后台线程中生成Markdown"""
         # 新重构：收集所有需要导出的文件（只收集文件绝对路径）
         files = self.collect_export_files(selected_items)
         if not files:
+            self.parent.jobs.finish(job)
             self.parent.status_var.set(self.parent.texts.get("status_no_text_files", "未找到可导出的文本文件"))
             return
 
@@ -785,25 +865,60 @@ class GUIComponents:
             initialfile=default_filename
         )
         if not output_path:
+            self.parent.jobs.finish(job)
             return
 
-        include_markers = self.parent.settings.include_markers
-        show_encoding = self.parent.settings.show_encoding
+        progress_text = self.parent.texts.get(
+            "progress_export", "已导出 {0}/{1} 个文件"
+        )
+
+        def report_progress(done, total):
+            if job.cancelled:
+                return False
+            job.progress(progress_text, done, total)
 
-        success, errors = generate_markdown(
+        options = dict(
             output_path=output_path,
             files=files,  # 只传递文件绝对路径
             project_root=base_dir,  # 新增参数，传递项目根目录
-            include_markers=include_markers,
-            show_encoding=show_encoding
-        )
+            include_markers=self.parent.settings.include_markers,
+            show_encoding=self.parent.settings.show_encoding,
+            progress=report_progress,
+            outline=self.parent.outline_mode.get(),
+            truncation=self.parent.settings.get_truncation_policy(),
+            texts=self.parent.texts,
+        )
+        shard_kb = self.parent.settings.export_shard_max_kb
+        shard_tokens = self.parent.settings.export_shard_max_tokens
+        texts = self.parent.texts
+
+        def export(job):
+            if shard_kb or shard_tokens:
+                # 设置了分片上限时拆分为多个文件并写入索引文件
+                success, errors, shards = generate_markdown_shards(
+                    max_bytes=shard_kb * 1024, max_tokens=shard_tokens, **options
+                )
+                status = texts.get(
+                    "status_export_shards", "成功导出 {0} 个文件到 {1} 个分片"
+                ).format(success, len(shards))
+            else:
+                success, errors = generate_markdown(**options)
+                status = texts.get(
+                    "status_export_success", "成功导出{0}个文件"
+                ).format(success)
+            job.check()
+            return success, errors, status
+
+        def finish(result):
+            success, errors, status = result
+            if success > 0:
+                job.done(status)
+            else:
+                self.parent.jobs.finish(job)
+            if errors:
+                messagebox.showerror("导出错误", "\n".join(errors))
 
-        if success > 0:
-            self.parent.status_var.set(
-                self.parent.texts.get("status_export_success", "成功导出{0}个文件").format(success)
-            )
-        if errors:
-            messagebox.showerror("导出错误", "\n".join(errors))
+        self.parent.jobs.run_in_background(job, export, finish)
 
     def collect_export_files(self, selected_items):
         """
@@ -813,21 +928,23 @@ class GUIComponents:
         3. 混合选择时递归导出文件夹下所有文件并导出选中文件，避免重复。
         返回 [file_path, ...]
         """
-        tree = self.parent.tree
-        tree_items = self.parent.tree_items
+        model = self.parent.tree_model
         tree_ops = self.parent.tree_ops
         supported_exts = set(self.parent.settings.supported_extensions.keys())
-        id_to_path = {v: k for k, v in tree_items.items()}
+        id_to_path = {}
         file_nodes = []
         folder_nodes = []
         for item in selected_items:
-            if item not in id_to_path:
+            node = model.node(item)
+            if node is None:
                 continue
-            path = id_to_path[item]
-            if os.path.isfile(path):
+            if node.is_file:
                 file_nodes.append(item)
-            elif os.path.isdir(path):
+            elif node.is_dir:
                 folder_nodes.append(item)
+            else:
+                continue
+            id_to_path[item] = model.path(node)
         result = set()
         # 只选文件夹
         if folder_nodes and not file_nodes:
@@ -0,0 +1,357 @@
+"""
+Python 导入关系模块
+
+用 ast 解析项目中每个 .py 文件的 import 语句，按模块名解析到项目内的文件，
+用于为选中的文件添加它们（传递）导入的项目内模块。
+
+每个文件的导入语句按修改时间和大小缓存，并保存在项目状态目录中。之后每次
+刷新只重新解析变化的文件，变化的文件较多时（如第一次建立）在进程池中并行解析。
+模块名到文件的对应关系每次刷新时按当前的文件列表重建，查询时再解析导入语句，
+因此新增或删除文件后无需重新解析导入它们的文件。
+
+Classes:
+    ImportGraph: 项目内 Python 文件的导入关系
+
+Functions:
+    build_import_graph(graph, root_dir, use_gitignore, job, cache_file, listing): 建立或刷新导入关系（在后台线程中调用）
+"""
+
+import ast
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ai_code_context_helper.config import IMPORT_GRAPH_POOL_THRESHOLD
+from ai_code_context_helper.path_index import walk_project
+from ai_code_context_helper.project_state import _atomic_write
+
+# 缓存文件的格式版本，格式变化时旧的缓存文件被忽略
+_CACHE_VERSION = 1
+
+# 包含子语句的字段（except 子句和 match 分支本身也有 body）
+_STATEMENT_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+def parse_imports(file_path):
+    """
+    解析文件中的所有 import 语句（在进程池的工作进程中调用，必须可被 pickle）
+
+    Args:
+        file_path (str): 文件的绝对路径
+
+    Returns:
+        list: [模块名, 导入的名称列表, 相对导入的层级] 列表；
+              "import a.b" 的名称列表为空，文件无法解析时返回空列表
+    """
+    try:
+        with open(file_path, "rb") as f:
+            source = f.read()
+        if b"import" not in source:
+            return []
+        tree = ast.parse(source, filename=file_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+    # import 只能出现在语句中，只遍历语句（包括函数、类和控制结构内部的），
+    # 不进入表达式，比 ast.walk 快得多
+    imports = []
+    stack = list(tree.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, [], 0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names = [alias.name for alias in node.names if alias.name != "*"]
+            imports.append([node.module or "", names, node.level])
+        else:
+            for field in _STATEMENT_FIELDS:
+                stack.extend(getattr(node, field, ()))
+    return imports
+
+
+def _module_parts(path):
+    """返回文件对应的模块名各部分（包的 __init__.py 对应包名）"""
+    parts = path[: -len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return parts
+
+
+class ImportGraph:
+    """
+    项目内 Python 文件的导入关系
+
+    路径使用 "/" 分隔。后台刷新和查询可以在不同线程中进行，
+    所有公开方法都持有同一把锁。
+
+    项目根目录和其中每个不是包（没有 __init__.py）的目录都可以作为导入的起点，
+    例如 src 不是包而 src/pkg 是包时，"src/pkg/mod.py" 可以作为 "src.pkg.mod"
+    或 "pkg.mod" 导入，无需知道项目的源码根目录。同一个模块名对应多个文件时，
+    选择与导入它的文件共同目录最深的一个。
+
+    Attributes:
+        root_dir (str): 对应的项目根目录，尚未建立时为None
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.root_dir = None
+        self._build_job = None  # 正在刷新的任务
+        self._reset()
+
+    def _reset(self):
+        self._imports = {}  # 相对路径 -> (修改时间, 大小, 导入语句列表)
+        self._modules = {}  # 模块名 -> 相对路径列表
+
+    def begin_build(self, root_dir, job):
+        """
+        开始为项目根目录建立或刷新导入关系
+
+        根目录与当前相同时保留已解析的结果，只重新解析变化的文件。
+        """
+        with self._lock:
+            if self.root_dir != root_dir:
+                self._reset()
+                self.root_dir = root_dir
+            self._build_job = job
+
+    @property
+    def building(self):
+        """是否正在后台刷新"""
+        return self._build_job is not None
+
+    def finish_build(self, job):
+        """标记任务刷新结束（任务已被新的任务取代时不影响新任务）"""
+        with self._lock:
+            if self._build_job is job:
+                self._build_job = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._imports)
+
+    def file_meta(self, path):
+        """返回已解析文件的 (修改时间, 大小)，未解析时返回None"""
+        with self._lock:
+            entry = self._imports.get(path)
+            return None if entry is None else entry[:2]
+
+    def update(self, parsed, paths):
+        """
+        写入新解析的结果，并按完整的文件列表重建模块名对应关系
+
+        Args:
+            parsed (dict): 相对路径 -> (修改时间, 大小, 导入语句列表)
+            paths (set): 项目中所有 .py 文件的相对路径，不在其中的缓存被删除
+
+        Returns:
+            int: 删除的文件数
+        """
+        packages = {
+            path[: -len("/__init__.py")] for path in paths if path.endswith("/__init__.py")
+        }
+        modules = {}
+        for path in paths:
+            parts = _module_parts(path)
+            for i in range(len(parts)):
+                # 包内的目录不能作为导入的起点
+                if i and "/".join(parts[:i]) in packages:
+                    continue
+                modules.setdefault(".".join(parts[i:]), []).append(path)
+        with self._lock:
+            self._imports.update(parsed)
+            removed = set(self._imports) - paths
+            for path in removed:
+                del self._imports[path]
+            self._modules = modules
+        return len(removed)
+
+    def load(self, file_path):
+        """从缓存文件加载解析结果（尚未解析任何文件时调用）"""
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"加载导入关系缓存失败: {str(e)}")
+            return
+        with self._lock:
+            if (
+                data.get("version") != _CACHE_VERSION
+                or data.get("root_dir") != self.root_dir
+            ):
+                return
+            for path, (mtime, size, imports) in data.get("files", {}).items():
+                self._imports[path] = (mtime, size, imports)
+
+    def save(self, file_path):
+        """将解析结果写入缓存文件"""
+        with self._lock:
+            data = {
+                "version": _CACHE_VERSION,
+                "root_dir": self.root_dir,
+                "files": {
+                    path: [mtime, size, imports]
+                    for path, (mtime, size, imports) in self._imports.items()
+                },
+            }
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        _atomic_write(file_path, json.dumps(data, ensure_ascii=False))
+
+    def _resolve_module(self, name, importer):
+        """按模块名查找项目内的文件，找不到时返回None"""
+        candidates = self._modules.get(name)
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        importer_dirs = importer.split("/")[:-1]
+
+        def closeness(path):
+            common = 0
+            for a, b in zip(importer_dirs, path.split("/")[:-1]):
+                if a != b:
+                    break
+                common += 1
+            return (-common, len(path), path)
+
+        return min(candidates, key=closeness)
+
+    def _resolve_path(self, parts):
+        """按相对于项目根目录的模块路径查找文件（用于相对导入）"""
+        base = "/".join(parts)
+        for path in (base + ".py", base + "/__init__.py"):
+            if path in self._imports:
+                return path
+        return None
+
+    def _dependencies(self, path):
+        """返回文件直接导入的项目内文件"""
+        entry = self._imports.get(path)
+        if entry is None:
+            return set()
+
+        result = set()
+        for module, names, level in entry[2]:
+            if level:
+                # 相对导入：从文件所在的包向上 level-1 级
+                package = path.split("/")[:-1]
+                up = level - 1
+                if up > len(package):
+                    continue
+                base = package[: len(package) - up] + (module.split(".") if module else [])
+                resolve = self._resolve_path
+            else:
+                base = module.split(".")
+                resolve = lambda parts: self._resolve_module(".".join(parts), path)
+            # "from a import b" 中的 b 可能是子模块，也可能是 a 中定义的名称
+            targets = [resolve(base + [name]) for name in names]
+            if not names or not all(targets):
+                targets.append(resolve(base))
+            result.update(target for target in targets if target and target != path)
+        return result
+
+    def dependencies(self, paths, depth):
+        """
+        返回文件（传递）导入的项目内文件
+
+        Args:
+            paths (iterable): 起始文件的相对路径
+            depth (int): 最多展开的层数，0表示不限制
+
+        Returns:
+            list: 新增的相对路径（不包括起始文件），按发现的顺序排列
+        """
+        start = set(paths)
+        seen = set(start)
+        added = []
+        queue = deque((path, 0) for path in sorted(start))
+        with self._lock:
+            while queue:
+                path, level = queue.popleft()
+                if depth and level >= depth:
+                    continue
+                for target in sorted(self._dependencies(path)):
+                    if target not in seen:
+                        seen.add(target)
+                        added.append(target)
+                        queue.append((target, level + 1))
+        return added
+
+
+def build_import_graph(graph, root_dir, use_gitignore, job, cache_file=None, listing=None):
+    """
+    建立或刷新导入关系（在后台线程中调用）
+
+    尚未解析任何文件时先从缓存文件加载，然后遍历项目，只解析修改时间
+    或大小发生变化的 .py 文件。需要解析的文件较多时使用进程池并行解析。
+    任务被取消时不更新结果。
+
+    Args:
+        graph (ImportGraph): 要建立的导入关系
+        root_dir (str): 项目根目录
+        use_gitignore (bool): 是否应用 .gitignore 规则
+        job (Job): 任务，只读取其 cancelled 标记
+        cache_file (str): 缓存文件路径，为None时不持久化
+        listing (GitListing): 项目的 Git 文件列表，为None时读取磁盘
+    """
+    try:
+        if cache_file and not len(graph):
+            graph.load(cache_file)
+
+        paths = set()
+        stale = {}  # 相对路径 -> (修改时间, 大小)
+        for rel_dir, files, _ in walk_project(
+            root_dir, use_gitignore, job, listing
+        ):
+            if graph.root_dir != root_dir:
+                return
+            prefix = rel_dir + "/" if rel_dir else ""
+            for name in files:
+                if not name.endswith(".py"):
+                    continue
+                path = prefix + name
+                try:
+                    stat = os.stat(os.path.join(root_dir, path))
+                except OSError:
+                    continue
+                paths.add(path)
+                meta = (stat.st_mtime, stat.st_size)
+                if graph.file_meta(path) != meta:
+                    stale[path] = meta
+        if job.cancelled:
+            return
+
+        file_paths = [os.path.join(root_dir, path) for path in stale]
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(file_paths) >= IMPORT_GRAPH_POOL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(
+                        parse_imports,
+                        file_paths,
+                        chunksize=max(1, len(file_paths) // (workers * 4)),
+                    )
+                )
+        else:
+            results = [parse_imports(file_path) for file_path in file_paths]
+        if job.cancelled:
+            return
+
+        parsed = {
+            path: (mtime, size, imports)
+            for (path, (mtime, size)), imports in zip(stale.items(), results)
+        }
+        removed = graph.update(parsed, paths)
+        print(f"导入关系已刷新: 解析 {len(parsed)} 个文件，共 {len(paths)} 个文件")
+
+        if (parsed or removed) and cache_file and graph.root_dir == root_dir:
+            graph.save(cache_file)
+    except Exception as e:
+        print(f"建立导入关系时出错: {str(e)}")
+    finally:
+        graph.finish_build(job)
@@ -0,0 +1,241 @@
+"""
+长时间操作的任务管理模块
+
+为生成目录树、全部展开、复制和导出等耗时操作提供统一的取消标记、
+节流的状态栏进度显示和耗时统计。同一类操作同时只保留一个任务，
+启动新的任务时会取消正在进行的同类任务。
+
+耗时的读取工作通过 JobManager.run_in_background() 在后台线程中执行，
+Tk线程保持响应，Esc 和启动同类任务都能随时取消；结果通过轮询交回Tk线程。
+除 Job.check()、Job.progress() 和 cancelled 标记外，所有方法都只应在Tk线程中调用。
+后台执行的操作在检查点调用 check() 或 progress()，分片执行的操作在每个分片开始时
+检查 cancelled。
+
+Classes:
+    JobCancelled: 任务被取消时由 Job.check() 抛出的异常
+    Job: 单个任务，提供取消标记、进度和耗时
+    JobManager: 按类型管理正在进行的任务
+"""
+
+import threading
+import time
+import traceback
+
+from ai_code_context_helper.config import JOB_PROGRESS_INTERVAL, JOB_POLL_MS
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class Job:
+    """
+    单个长时间操作
+
+    可以作为上下文管理器使用：退出时自动结束任务，任务被取消时
+    吞掉 JobCancelled 异常并在状态栏显示取消提示。
+
+    Attributes:
+        kind (str): 任务类型，同类任务互相取代
+        label (str): 显示在进度信息前的任务名称
+        cancelled (bool): 是否已被取消
+        background (bool): 是否正在后台线程中执行（进度由Tk线程轮询显示）
+    """
+
+    def __init__(self, manager, kind, label):
+        self.manager = manager
+        self.kind = kind
+        self.label = label
+        self.cancelled = False
+        self.background = False
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+        self._pending_status = None  # 后台线程报告、尚未显示的进度
+
+    def cancel(self):
+        """请求取消任务"""
+        self.cancelled = True
+
+    def check(self):
+        """任务已被取消时抛出 JobCancelled"""
+        if self.cancelled:
+            raise JobCancelled(self.kind)
+
+    def elapsed(self):
+        """返回任务已运行的秒数"""
+        return time.perf_counter() - self.started
+
+    def progress(self, message, *args, force=False):
+        """
+        在状态栏显示进度，两次显示的间隔不少于 JOB_PROGRESS_INTERVAL 秒
+
+        在后台线程中调用时只记录进度，由Tk线程在下一次轮询时显示。
+
+        Args:
+            message (str): 进度信息，只在实际显示时才用 args 格式化
+            *args: 格式化参数
+            force (bool): 忽略节流立即显示
+        """
+        self.check()
+        now = time.perf_counter()
+        if not force and now - self._last_report < JOB_PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        text = message.format(*args) if args else message
+        status = f"{self.label}: {text} ({now - self.started:.1f}s)"
+        if self.background:
+            self._pending_status = status
+        else:
+            self.manager.show_status(status)
+
+    def take_status(self):
+        """取出后台线程报告的最新进度，没有新进度时返回None"""
+        status, self._pending_status = self._pending_status, None
+        return status
+
+    def done(self, message):
+        """结束任务，并在状态栏显示附带耗时的结果信息"""
+        self.manager.finish(self)
+        elapsed = self.elapsed()
+        self.manager.show_status(f"{message} | {elapsed:.2f}s")
+        print(f"任务完成 [{self.kind}]，耗时 {elapsed:.2f}s")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.manager.finish(self)
+        if exc_type is not None and issubclass(exc_type, JobCancelled):
+            self.manager.show_cancelled(self)
+            return True
+        return False
+
+
+class JobManager:
+    """
+    按类型管理正在进行的任务
+
+    Attributes:
+        parent: 主应用实例（提供 status_var、texts 和 root）
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+        self._running = {}  # 任务类型 -> Job
+
+    def start(self, kind, label):
+        """
+        启动新任务，取消正在进行的同类任务
+
+        Args:
+            kind (str): 任务类型
+            label (str): 任务名称
+
+        Returns:
+            Job: 新任务
+        """
+        previous = self._running.get(kind)
+        if previous is not None:
+            print(f"取消正在进行的任务 [{kind}]")
+            previous.cancel()
+        job = Job(self, kind, label)
+        self._running[kind] = job
+        return job
+
+    def finish(self, job):
+        """结束任务（任务已被取代时不影响新任务）"""
+        if self._running.get(job.kind) is job:
+            del self._running[job.kind]
+
+    def running(self, kind):
+        """返回正在进行的指定类型任务，没有时返回None"""
+        return self._running.get(kind)
+
+    def cancel(self, kind):
+        """取消指定类型的任务，返回是否有任务被取消"""
+        job = self._running.pop(kind, None)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self):
+        """取消所有正在进行的任务，返回被取消的任务数量"""
+        jobs = list(self._running.values())
+        self._running.clear()
+        for job in jobs:
+            job.cancel()
+            self.show_cancelled(job)
+        return len(jobs)
+
+    def run_in_background(self, job, work, on_done):
+        """
+        在后台线程中执行任务的耗时部分，完成后在Tk线程中处理结果
+
+        work 不能访问Tk控件和变量，所需的选项应事先在Tk线程中读取。任务被取消
+        （Esc 或启动了同类任务）时丢弃结果，不调用 on_done；work 出错时结束任务
+        并在状态栏显示错误。
+
+        Args:
+            job (Job): 任务
+            work (callable): 在后台线程中调用 work(job)，返回结果
+            on_done (callable): 在Tk线程中调用 on_done(结果)，负责结束任务
+        """
+        job.background = True
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = work(job)
+            except JobCancelled:
+                pass
+            except Exception as e:
+                traceback.print_exc()
+                outcome["error"] = e
+            finally:
+                outcome["done"] = True
+
+        threading.Thread(target=run, daemon=True).start()
+        self.parent.root.after(JOB_POLL_MS, self._poll, job, outcome, on_done)
+
+    def _poll(self, job, outcome, on_done):
+        """在Tk线程中显示后台任务的进度，并在完成时交回结果"""
+        if job.cancelled:
+            # 取消提示已由 cancel_all 显示；被同类任务取代时由新任务更新状态栏
+            return
+        status = job.take_status()
+        if status is not None:
+            self.show_status(status)
+        if not outcome.get("done"):
+            self.parent.root.after(JOB_POLL_MS, self._poll, job, outcome, on_done)
+            return
+
+        job.background = False
+        if "error" in outcome:
+            self.finish(job)
+            self.show_status(
+                self.parent.texts["error_msg"].format(str(outcome["error"]))
+            )
+            return
+        if "result" not in outcome:
+            # 后台线程检查到取消后退出
+            self.finish(job)
+            self.show_cancelled(job)
+            return
+        on_done(outcome["result"])
+
+    def show_status(self, text):
+        """更新状态栏并立即重绘，使同步执行的操作也能显示进度"""
+        self.parent.status_var.set(text)
+        try:
+            self.parent.root.update_idletasks()
+        except Exception:
+            pass
+
+    def show_cancelled(self, job):
+        """在状态栏显示任务已取消"""
+        self.show_status(
+            self.parent.texts.get("status_job_cancelled", "{0}已取消").format(
+                job.label
+            )
+        )
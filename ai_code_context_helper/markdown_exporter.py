@@ -1,8 +1,19 @@
+import glob
 import os
 import chardet
 from charset_normalizer import from_bytes
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List
-from ai_code_context_helper.config import SUPPORTED_EXTENSIONS
+from ai_code_context_helper.config import (
+    SUPPORTED_EXTENSIONS,
+    CHARS_PER_TOKEN,
+    EXPORT_READ_WORKERS,
+    EXPORT_WRITE_WORKERS,
+)
+from ai_code_context_helper.file_utils import read_truncated, truncate_lines
+from ai_code_context_helper.outline import get_outline, supports_outline
+from ai_code_context_helper.file_hashes import find_duplicates
 
 def detect_encoding(file_path: str) -> str:
     """混合检测编码（优化中文优先检测）"""
@@ -64,8 +75,30 @@ def validate_encoding(file_path: str, encoding: str) -> bool:
         return False
 
 def read_file_with_encoding(file_path: str, 
-                           fallback_encodings: list = None) -> Tuple[str, str]:
-    """多编码尝试读取文件"""
+                           fallback_encodings: list = None,
+                           truncation=None) -> Tuple[str, str]:
+    """
+    多编码尝试读取文件
+
+    truncation 为截断上限（TruncationPolicy），超过大小上限的文件只读取开头和结尾，
+    超过行数上限的文件只保留开头和结尾的行。
+    """
+    if truncation is None:
+        return _read_file_with_encoding(file_path, fallback_encodings)
+    size = os.path.getsize(file_path)
+    if truncation.exceeds_size(size):
+        encoding = detect_encoding(file_path)
+        if not validate_encoding(file_path, encoding):
+            encoding = 'utf-8'
+        return read_truncated(file_path, size, truncation, encoding), encoding
+    content, encoding = _read_file_with_encoding(file_path, fallback_encodings)
+    if content is not None:
+        content = truncate_lines(content, truncation)
+    return content, encoding
+
+def _read_file_with_encoding(file_path: str,
+                             fallback_encodings: list = None) -> Tuple[str, str]:
+    """多编码尝试读取完整的文件"""
     if fallback_encodings is None:
         fallback_encodings = ['utf-8', 'gbk', 'latin-1']
         
@@ -120,11 +153,97 @@ def get_relative_display_path(file_path: str, base_dir: str) -> str:
     except Exception:
         return os.path.basename(file_path)
 
+def estimate_tokens(text: str) -> int:
+    """估计文本的 token 数（ASCII 字符按每 CHARS_PER_TOKEN 个计一个，其他字符每个计一个）"""
+    ascii_count = len(text.encode('ascii', 'ignore'))
+    return -(-ascii_count // CHARS_PER_TOKEN) + len(text) - ascii_count
+
+# 一个文件在导出结果中的内容：标题和代码块开头、文件内容、代码块结尾
+_Block = namedtuple('_Block', 'display_path head content tail')
+
+def _render_block(file_path: str,
+                  project_root: str,
+                  include_markers: bool,
+                  show_encoding: bool,
+                  outline: bool,
+                  truncation,
+                  original: str = None,
+                  texts: dict = None) -> Tuple[_Block, str]:
+    """
+    读取文件并生成其导出内容，返回 (内容, 错误信息)，出错时内容为None
+
+    original 不为None时只输出对内容相同的原始文件的引用，引用文字取自
+    语言包 texts。
+    """
+    try:
+        if not os.path.isfile(file_path) or not os.access(file_path, os.R_OK):
+            return None, f"无效文件: {file_path}"
+        # 用项目根目录生成相对路径
+        display_path = get_relative_display_path(file_path, project_root)
+        header = f"### {display_path}\n"
+        if original is not None:
+            original_path = get_relative_display_path(original, project_root)
+            note = (texts or {}).get("duplicate_of", "（内容与 {0} 相同）")
+            return _Block(display_path, header, note.format(f"`{original_path}`") + "\n\n", ""), None
+        _, ext = os.path.splitext(display_path)
+        lang = SUPPORTED_EXTENSIONS.get(ext.lower(), '')
+        # 大纲从完整内容生成，截断上限只作用于大纲本身
+        use_outline = outline and supports_outline(file_path)
+        content, encoding = read_file_with_encoding(
+            file_path, truncation=None if use_outline else truncation
+        )
+        if content is None:
+            return None, f"编码错误: {file_path}"
+        if use_outline:
+            content = get_outline(content, file_path)
+            if truncation is not None:
+                content = truncate_lines(content, truncation)
+        if not content.endswith('\n'):
+            content += '\n'
+        head = header
+        if show_encoding and encoding:
+            clean_enc = encoding.replace(" (替换错误字符)", "")
+            head += f"<!-- 文件编码: {clean_enc} -->\n"
+        if include_markers:
+            head += f"<!-- [START OF FILE: {os.path.basename(file_path)}] -->\n"
+        head += f"```{lang}\n"
+        tail = "```\n\n"
+        if include_markers:
+            tail += f"<!-- [END OF FILE: {os.path.basename(file_path)}] -->\n\n"
+        return _Block(display_path, head, content, tail), None
+    except Exception as e:
+        return None, f"处理失败 ({file_path}): {str(e)}"
+
+def _render_in_parallel(render, files: list):
+    """在线程池中读取文件并按原顺序逐个返回结果，同时只预读有限数量的文件"""
+    with ThreadPoolExecutor(max_workers=EXPORT_READ_WORKERS) as executor:
+        pending = deque()
+        remaining = iter(files)
+        try:
+            for file_path in remaining:
+                pending.append(executor.submit(render, file_path))
+                if len(pending) >= EXPORT_READ_WORKERS * 4:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                file_path = next(remaining, None)
+                if file_path is not None:
+                    pending.append(executor.submit(render, file_path))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
 def generate_markdown(output_path: str, 
                       files: list,  # 只接收文件绝对路径列表
                       project_root: str,  # 新增参数，项目根目录
                       include_markers: bool = True, 
-                      show_encoding: bool = False) -> Tuple[int, List[str]]:
+                      show_encoding: bool = False,
+                      progress=None,
+                      outline: bool = False,
+                      deduplicate: bool = True,
+                      truncation=None,
+                      texts: dict = None) -> Tuple[int, List[str]]:
     """
     生成最终Markdown文件
     Args:
@@ -133,44 +252,222 @@ def generate_markdown(output_path: str,
         project_root: 项目根目录
         include_markers: 是否包含代码块标记
         show_encoding: 是否显示编码信息
+        progress: 可选的进度回调，参数为(已处理数量, 总数量)，返回False时中止导出
+        outline: 是否只输出代码大纲（不支持大纲的语言仍输出完整内容）
+        deduplicate: 内容与之前的文件完全相同时是否只输出引用
+        truncation: 单个文件的截断上限（TruncationPolicy），为None时输出完整内容
+        texts: 界面语言包，用于输出中的提示文字
     Returns:
         (成功数量, 错误信息列表)
     """
     error_files = []
     processed = 0
+    duplicates = find_duplicates(files) if deduplicate else {}
+    rendered = {}  # 重复组的第一个文件 -> 实际输出完整内容的文件
     try:
         with open(output_path, 'w', encoding='utf-8') as md_file:
-            for file_path in files:
-                try:
-                    if not os.path.isfile(file_path) or not os.access(file_path, os.R_OK):
-                        error_files.append(f"无效文件: {file_path}")
-                        continue
-                    # 用项目根目录生成相对路径
-                    display_path = get_relative_display_path(file_path, project_root)
-                    _, ext = os.path.splitext(display_path)
-                    lang = SUPPORTED_EXTENSIONS.get(ext.lower(), '')
-                    content, encoding = read_file_with_encoding(file_path)
-                    if content is None:
-                        error_files.append(f"编码错误: {file_path}")
-                        continue
-                    header = f"### {display_path}\n"
-                    md_file.write(header)
-                    if show_encoding and encoding:
-                        clean_enc = encoding.replace(" (替换错误字符)", "")
-                        md_file.write(f"<!-- 文件编码: {clean_enc} -->\n")
-                    if include_markers:
-                        md_file.write(f"<!-- [START OF FILE: {os.path.basename(file_path)}] -->\n")
-                    code_block = f"```{lang}\n"
-                    md_file.write(code_block)
-                    md_file.write(content)
-                    if not content.endswith('\n'):
-                        md_file.write('\n')
-                    md_file.write("```\n\n")
-                    if include_markers:
-                        md_file.write(f"<!-- [END OF FILE: {os.path.basename(file_path)}] -->\n\n")
-                    processed += 1
-                except Exception as e:
-                    error_files.append(f"处理失败 ({file_path}): {str(e)}")
+            for index, file_path in enumerate(files):
+                if progress is not None and progress(index, len(files)) is False:
+                    break
+                # 原始文件读取失败时，组内下一个文件输出完整内容
+                group = duplicates.get(str(file_path), str(file_path))
+                original = rendered.get(group)
+                block, error = _render_block(
+                    file_path, project_root, include_markers, show_encoding,
+                    outline, truncation, original, texts
+                )
+                if error:
+                    error_files.append(error)
+                    continue
+                if original is None:
+                    rendered[group] = str(file_path)
+                md_file.write(block.head + block.content + block.tail)
+                processed += 1
+    except Exception as e:
+        error_files.append(f"写入失败: {str(e)}")
+    return processed, error_files
+
+def _split_block(block: _Block, fits, texts: dict = None) -> List[str]:
+    """
+    将超过分片上限的文件内容按行拆分为多段，每段都是完整的代码块
+
+    单行超过上限时按字符拆分。fits(文本, 已用字节数, 已用 token 数) 判断
+    文本能否放入已用了指定字节数和 token 数的分片。段标题取自语言包 texts。
+    """
+    _, _, head_rest = block.head.partition('\n')
+    title = (texts or {}).get("export_part_heading", "{0} (第 {1} 部分)")
+    def part_head(number):
+        return f"### {title.format(block.display_path, number)}\n" + head_rest
+
+    # 按最长的段标题预留空间
+    overhead = part_head(999) + block.tail + '\n'
+    base = (len(overhead.encode('utf-8')), estimate_tokens(overhead))
+    pieces = []
+    current = []
+    used = base
+    for line in block.content.splitlines(keepends=True):
+        if fits(line, *used):
+            current.append(line)
+            used = (used[0] + len(line.encode('utf-8')), used[1] + estimate_tokens(line))
+            continue
+        if current:
+            pieces.append(''.join(current))
+        while not fits(line, *base) and len(line) > 1:
+            # 单行超过上限：二分查找能放入的最长前缀
+            low, high = 1, len(line) - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if fits(line[:middle], *base):
+                    low = middle
+                else:
+                    high = middle - 1
+            pieces.append(line[:low])
+            line = line[low:]
+        current = [line]
+        used = (base[0] + len(line.encode('utf-8')), base[1] + estimate_tokens(line))
+    if current:
+        pieces.append(''.join(current))
+
+    return [
+        part_head(number) + (piece if piece.endswith('\n') else piece + '\n') + block.tail
+        for number, piece in enumerate(pieces, 1)
+    ]
+
+def _write_shard(path: str, texts: List[str]):
+    """写入一个分片文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(texts))
+
+def generate_markdown_shards(output_path: str,
+                             files: list,
+                             project_root: str,
+                             include_markers: bool = True,
+                             show_encoding: bool = False,
+                             progress=None,
+                             outline: bool = False,
+                             deduplicate: bool = True,
+                             truncation=None,
+                             max_bytes: int = 0,
+                             max_tokens: int = 0,
+                             texts: dict = None) -> Tuple[int, List[str], List[str]]:
+    """
+    按大小或估计的 token 数将导出内容拆分为多个编号的分片文件
+
+    文件在线程池中并行读取，按原顺序依次放入分片；放不下时开始新的分片，
+    已满的分片在后台线程中写入。一个文件的内容不会跨分片，除非它单独就
+    超过上限，此时拆分为多个各自完整的代码块，每段单独占一个分片。
+    另外写入一个索引文件，列出每个分片包含的文件。
+
+    分片文件名为 "<名称>.part001.md"，索引文件名为 "<名称>.index.md"。
+    写入前删除之前导出留下的同名分片，避免分片数减少时残留旧的分片。
+
+    Args:
+        output_path: 输出文件路径，用于确定分片和索引文件的名称
+        max_bytes: 每个分片的最大字节数（UTF-8），0表示不限制
+        max_tokens: 每个分片的最大估计 token 数，0表示不限制
+        其余参数同 generate_markdown
+    Returns:
+        (成功数量, 错误信息列表, 分片文件路径列表)
+    """
+    def fits(text, used_bytes=0, used_tokens=0):
+        if max_bytes and used_bytes + len(text.encode('utf-8')) > max_bytes:
+            return False
+        if max_tokens and used_tokens + estimate_tokens(text) > max_tokens:
+            return False
+        return True
+
+    stem, ext = os.path.splitext(output_path)
+    ext = ext or '.md'
+    error_files = []
+    # 分片编号至少三位，超过999个分片时位数更多
+    prefix = stem + '.part'
+    for path in glob.glob(glob.escape(prefix) + '[0-9]*' + glob.escape(ext)):
+        number = path[len(prefix):len(path) - len(ext)]
+        if not (len(number) >= 3 and number.isdigit()):
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            error_files.append(f"删除旧分片失败 ({path}): {str(e)}")
+    processed = 0
+    duplicates = find_duplicates(files) if deduplicate else {}
+    shards = []  # (分片路径, 显示路径列表, 字节数, 估计 token 数)
+    writes = []
+    current = {'texts': [], 'paths': [], 'bytes': 0, 'tokens': 0}
+
+    rendered = {}  # 重复组的第一个文件 -> 实际输出完整内容的文件
+
+    def render(file_path, original=None):
+        return _render_block(
+            file_path, project_root, include_markers, show_encoding,
+            outline, truncation, original, texts
+        )
+
+    def render_ahead(file_path):
+        # 预读时先假定原始文件能成功读取
+        return render(file_path, duplicates.get(str(file_path)))
+
+    def add(text, display_path):
+        current['texts'].append(text)
+        if display_path not in current['paths']:
+            current['paths'].append(display_path)
+        current['bytes'] += len(text.encode('utf-8'))
+        current['tokens'] += estimate_tokens(text)
+
+    def flush(executor):
+        if not current['texts']:
+            return
+        path = f"{stem}.part{len(shards) + 1:03d}{ext}"
+        writes.append((path, executor.submit(_write_shard, path, current['texts'])))
+        shards.append((path, current['paths'], current['bytes'], current['tokens']))
+        current.update(texts=[], paths=[], bytes=0, tokens=0)
+
+    with ThreadPoolExecutor(max_workers=EXPORT_WRITE_WORKERS) as writer:
+        for index, (block, error) in enumerate(_render_in_parallel(render_ahead, files)):
+            if progress is not None and progress(index, len(files)) is False:
+                break
+            file_path = str(files[index])
+            group = duplicates.get(file_path, file_path)
+            original = rendered.get(group)
+            if group != file_path and original != group:
+                # 原始文件读取失败（或组内更早的文件代替它输出了完整内容）
+                block, error = render(file_path, original)
+            if error:
+                error_files.append(error)
+                continue
+            if original is None:
+                rendered[group] = file_path
+            text = block.head + block.content + block.tail
+            if not fits(text, current['bytes'], current['tokens']):
+                flush(writer)
+            if fits(text):
+                add(text, block.display_path)
+            else:
+                for piece in _split_block(block, fits, texts):
+                    flush(writer)
+                    add(piece, block.display_path)
+            processed += 1
+        flush(writer)
+
+    shard_paths = []
+    for path, future in writes:
+        try:
+            future.result()
+            shard_paths.append(path)
+        except Exception as e:
+            error_files.append(f"写入失败 ({path}): {str(e)}")
+
+    index_summary = (texts or {}).get(
+        "export_index_summary", "{0} 个文件，{1} 字节，约 {2} tokens"
+    )
+    try:
+        with open(f"{stem}.index{ext}", 'w', encoding='utf-8') as index_file:
+            for path, display_paths, size, tokens in shards:
+                summary = index_summary.format(len(display_paths), size, tokens)
+                index_file.write(f"## {os.path.basename(path)}\n<!-- {summary} -->\n")
+                for display_path in display_paths:
+                    index_file.write(f"- {display_path}\n")
+                index_file.write("\n")
     except Exception as e:
         error_files.append(f"写入失败: {str(e)}")
-    return processed, error_files
\ No newline at end of file
+    return processed, error_files, shard_paths
@@ -0,0 +1,254 @@
+"""
+代码大纲模块
+
+大纲模式下复制和导出只输出文件的导入语句、类和函数的签名以及文档字符串，
+省略函数体，用于在上下文较大时减少内容。Python 文件用 ast 解析，
+其他语言按行用正则表达式识别声明，并保留紧邻声明之前的文档注释。
+没有大纲规则的语言（如 JSON、YAML）返回None，由调用方输出完整内容。
+大纲应从完整的文件内容生成，截断只作用于生成的大纲，否则会遗漏中间部分的声明。
+
+大纲按文件内容的哈希缓存，内容不变的文件再次生成大纲时无需重新解析。
+
+Functions:
+    supports_outline(file_path): 文件的语言是否有大纲规则
+    get_outline(source, file_path): 返回文件内容的大纲，不支持的语言返回None
+"""
+
+import ast
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from ai_code_context_helper.config import SUPPORTED_EXTENSIONS, OUTLINE_CACHE_SIZE
+
+# 不是声明的 C 风格语句开头（避免把 "if (...) {" 等当作函数签名）
+_NOT_KEYWORD = (
+    r"(?!(?:if|for|foreach|while|switch|catch|return|else|do|try|using|sizeof|"
+    r"new|throw|case|await|yield|delete|lock|fixed|when)\b)"
+)
+
+# C 风格语言中的函数签名：返回类型和名称，参数在同一行内，行尾是 ")" 或 "{"
+_C_SIGNATURE = (
+    r"\s*(?=\S)" + _NOT_KEYWORD + r"[\w:<>,\*&\[\]\s~.?@]+?\b[\w~:.]+\s*\([^;{}]*\)"
+    r"\s*(?:const|override|final|noexcept|throws\s+[\w.,\s]+|->\s*[^{;]+|:\s*[^{;=]+)*"
+    r"\s*\{?\s*$"
+)
+
+_C_DECLARATION = (
+    r"\s*(?:(?:public|private|protected|internal|static|abstract|final|sealed|partial|"
+    r"export|default|data|open|override|inline|virtual|extern|async|suspend|"
+    r"template\s*<[^>]*>)\s+)*"
+    r"(?:class|struct|interface|enum|record|trait|object|protocol|extension|"
+    r"typedef|union|namespace|fun|func|function|mixin|impl)\b"
+)
+
+_C_IMPORT = (
+    r"\s*(?:import|package|using|#\s*include|#\s*import|namespace|use|"
+    r"require(?:_once)?|include(?:_once)?|part(?:\s+of)?|library)\b"
+)
+
+_C_DOC = ("///", "/**", "*", "*/", "//", "/*", "@")
+
+_HASH_DOC = ("#",)
+
+# 语言 -> (识别声明行的正则表达式, 可以作为文档注释保留的行前缀)
+_RULES = {
+    "javascript": (
+        r"\s*(?:import\b|export\b|(?:async\s+)?function\b|class\b|"
+        r"(?:const|let|var)\s+[\w$]+\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|[\w$]+\s*=>)|"
+        r"(?:const|let|var)\s+.*=\s*require\s*\(|"
+        r"(?:(?:static|async|get|set)\s+)*" + _NOT_KEYWORD + r"[\w$]+\s*\([^;]*\)\s*\{\s*$)",
+        _C_DOC,
+    ),
+    "typescript": (
+        r"\s*(?:import\b|export\b|(?:async\s+)?function\b|(?:abstract\s+)?class\b|"
+        r"interface\b|type\s+\w+|enum\b|declare\b|namespace\b|"
+        r"(?:const|let|var)\s+[\w$]+\s*(?::[^=]+)?=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>)|"
+        r"(?:(?:public|private|protected|static|async|readonly|abstract|get|set)\s+)*"
+        + _NOT_KEYWORD
+        + r"[\w$]+\s*\([^;]*\)\s*(?::\s*[^={;]+)?\{\s*$)",
+        _C_DOC,
+    ),
+    "c": (r"(?:" + _C_IMPORT + r"|#\s*define\b|" + _C_DECLARATION + r"|" + _C_SIGNATURE + r")", _C_DOC),
+    "go": (r"(?:package|import|func|type)\b", ("//",)),
+    "rust": (
+        r"\s*(?:#!?\[|(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?(?:const\s+)?"
+        r"(?:fn|struct|enum|trait|impl|mod|use|type|static|macro_rules!|extern\s+crate)\b)",
+        ("///", "//!"),
+    ),
+    "ruby": (
+        r"\s*(?:require|require_relative|include|extend|class|module|def|attr_\w+)\b",
+        _HASH_DOC,
+    ),
+    "lua": (
+        r"\s*(?:(?:local\s+)?function\b|(?:local\s+)?[\w.]+\s*=\s*(?:require\b|function\b))",
+        ("--",),
+    ),
+    "perl": (r"\s*(?:use|require|package|sub)\b", _HASH_DOC),
+    "shell": (
+        r"\s*(?:function\s+[\w-]+|[\w-]+\s*\(\)|source\s+\S|\.\s+\S)",
+        _HASH_DOC,
+    ),
+    "powershell": (
+        r"(?i)\s*(?:function|filter|class|enum|param|import-module|using)\b",
+        ("#", "<#", "#>", ".SYNOPSIS", ".DESCRIPTION"),
+    ),
+    "batch": (r"(?i)\s*(?::\w+|call\s+\S)", ("::", "rem ", "REM ")),
+    "r": (r"\s*(?:[\w.]+\s*(?:<-|=)\s*function\b|(?:library|require|source)\s*\()", _HASH_DOC),
+    "sql": (
+        r"(?i)\s*(?:create|alter)\s+(?:or\s+replace\s+)?(?:temporary\s+|temp\s+)?"
+        r"(?:table|view|index|unique\s+index|function|procedure|trigger|type|schema|sequence)\b",
+        ("--",),
+    ),
+    "vbnet": (
+        r"(?i)\s*(?:imports|namespace|(?:(?:public|private|protected|friend|shared|overrides|"
+        r"overridable|overloads|partial|mustinherit|notinheritable|async)\s+)*"
+        r"(?:class|module|structure|interface|enum|sub|function|property))\b",
+        ("'''",),
+    ),
+    "fsharp": (r"(?:(?:open|module|namespace|type|let)\b|\s+(?:member|abstract|override)\b)", ("///",)),
+    "markdown": (r"#{1,6}\s", ()),
+    "css": (r"[^\s{}/*][^{}]*\{\s*$|@(?:import|media|font-face|keyframes)\b", ()),
+    "python": (r"\s*(?:import|from|class|def|async\s+def|@)\b", ("#",)),
+}
+for _language in ("cpp", "java", "csharp", "php", "swift", "kotlin", "scala", "dart"):
+    _RULES[_language] = _RULES["c"]
+
+_PATTERNS = {
+    language: (re.compile(pattern), doc_prefixes)
+    for language, (pattern, doc_prefixes) in _RULES.items()
+}
+
+_cache = OrderedDict()  # (内容哈希, 语言) -> 大纲
+_cache_lock = threading.Lock()
+
+
+def _outline_by_pattern(source, pattern, doc_prefixes):
+    """按行识别声明，保留声明行和紧邻其前的文档注释行"""
+    lines = source.splitlines()
+    kept = []
+    last = -1  # 已保留的最后一行
+    for i, line in enumerate(lines):
+        if not pattern.match(line):
+            continue
+        start = i
+        while (
+            doc_prefixes
+            and start - 1 > last
+            and lines[start - 1].lstrip().startswith(doc_prefixes)
+        ):
+            start -= 1
+        kept.extend(lines[start : i + 1])
+        last = i
+    return "\n".join(kept) + "\n" if kept else ""
+
+
+def _outline_python(source):
+    """用 ast 生成 Python 文件的大纲，语法错误时按行识别"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        pattern, doc_prefixes = _PATTERNS["python"]
+        return _outline_by_pattern(source, pattern, doc_prefixes)
+
+    lines = source.splitlines()
+    out = []
+
+    def docstring(node):
+        body = node.body
+        if (
+            body
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)
+        ):
+            return body[0]
+        return None
+
+    def emit(nodes, top_level=False):
+        for node in nodes:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                out.extend(lines[node.lineno - 1 : node.end_lineno])
+            elif isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                if top_level and out:
+                    out.append("")
+                emit_definition(node)
+
+    def emit_definition(node):
+        start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+        first = node.body[0]
+        if first.lineno == node.lineno:
+            # 单行定义，例如 "def f(): pass"
+            out.extend(lines[start - 1 : node.end_lineno])
+            return
+        header = lines[start - 1 : first.lineno - 1]
+        # 去掉签名和函数体之间的空行和注释
+        while len(header) > node.lineno - start + 1 and (
+            not header[-1].strip() or header[-1].lstrip().startswith("#")
+        ):
+            header.pop()
+        out.extend(header)
+
+        indent = " " * first.col_offset
+        doc = docstring(node)
+        if doc is not None:
+            out.extend(lines[doc.lineno - 1 : doc.end_lineno])
+        if isinstance(node, ast.ClassDef):
+            count = len(out)
+            emit(node.body)
+            if len(out) > count:
+                return
+        out.append(indent + "...")
+
+    doc = docstring(tree)
+    if doc is not None:
+        out.extend(lines[doc.lineno - 1 : doc.end_lineno])
+    emit(tree.body, top_level=True)
+    return "\n".join(out) + "\n" if out else ""
+
+
+def supports_outline(file_path):
+    """文件的语言是否有大纲规则（按扩展名判断）"""
+    _, ext = os.path.splitext(str(file_path))
+    return SUPPORTED_EXTENSIONS.get(ext.lower()) in _PATTERNS
+
+
+def get_outline(source, file_path):
+    """
+    返回文件内容的大纲
+
+    Args:
+        source (str): 文件内容
+        file_path (str): 文件路径，用扩展名确定语言
+
+    Returns:
+        str: 大纲文本；该语言没有大纲规则时返回None
+    """
+    _, ext = os.path.splitext(str(file_path))
+    language = SUPPORTED_EXTENSIONS.get(ext.lower())
+    if language not in _PATTERNS:
+        return None
+
+    key = (
+        hashlib.sha1(source.encode("utf-8", "surrogatepass")).hexdigest(),
+        language,
+    )
+    with _cache_lock:
+        outline = _cache.get(key)
+        if outline is not None:
+            _cache.move_to_end(key)
+            return outline
+
+    if language == "python":
+        outline = _outline_python(source)
+    else:
+        pattern, doc_prefixes = _PATTERNS[language]
+        outline = _outline_by_pattern(source, pattern, doc_prefixes)
+
+    with _cache_lock:
+        _cache[key] = outline
+        while len(_cache) > OUTLINE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return outline
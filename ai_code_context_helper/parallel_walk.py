@@ -0,0 +1,126 @@
+"""
+并行目录遍历模块
+
+读取目录和获取条目信息的耗时主要在等待磁盘或网络文件系统，多个线程同时读取
+不同的目录可以成倍缩短遍历大型项目的时间。各线程从共享的待读取目录队列中
+取出目录，读取时在线程中直接应用忽略和过滤规则，得到的子目录再放回队列。
+
+队列按目录在先序遍历中的位置排序（位置用从根目录起每一级的子目录序号表示），
+空闲的线程总是先取最靠前的目录，调用方按先序依次取得结果，结果的顺序与单线程
+遍历完全相同，不受线程调度影响。
+
+Functions:
+    default_workers(): 返回按处理器核数确定的线程数
+    parallel_walk(list_directory, job, workers): 并行遍历目录树，按先序给出各目录的读取结果
+"""
+
+import heapq
+import os
+import threading
+
+from ai_code_context_helper.config import WALK_MAX_WORKERS
+
+_WAIT_SECONDS = 0.1  # 等待结果时检查任务是否取消的间隔
+
+
+def default_workers():
+    """返回按处理器核数确定的线程数（读取目录主要等待I/O，线程数多于核数）"""
+    return min(WALK_MAX_WORKERS, (os.cpu_count() or 1) * 2)
+
+
+def _walk_sequential(list_directory, job):
+    """单线程按先序遍历，结果与并行遍历相同"""
+    stack = [""]
+    while stack:
+        if job is not None and job.cancelled:
+            return
+        rel_dir = stack.pop()
+        result, subdirs = list_directory(rel_dir)
+        yield rel_dir, result
+        stack.extend(
+            f"{rel_dir}/{name}" if rel_dir else name for name in reversed(subdirs)
+        )
+
+
+def parallel_walk(list_directory, job=None, workers=None):
+    """
+    并行遍历目录树，按先序给出各目录的读取结果
+
+    list_directory 在工作线程中调用，应自行处理读取失败（返回空的子目录列表），
+    抛出的其他异常在调用方取得该目录的结果时重新抛出。任务被取消或调用方
+    提前结束遍历时，各线程读取完手头的目录后退出。
+
+    Args:
+        list_directory (callable): 接收目录的相对路径（"/" 分隔，根目录为空字符串），
+            返回 (读取结果, 需要继续遍历的子目录名列表)，子目录按此顺序遍历
+        job (Job): 任务，只读取其 cancelled 标记，可以为None
+        workers (int): 线程数，为None时按处理器核数确定，不大于1时在当前线程中遍历
+
+    Yields:
+        tuple: (目录的相对路径, 读取结果)
+    """
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1:
+        yield from _walk_sequential(list_directory, job)
+        return
+
+    condition = threading.Condition()
+    queue = [((), "")]  # (先序位置, 相对路径) 的最小堆
+    results = {}  # 先序位置 -> (相对路径, 读取结果, 子目录数, 异常)
+    state = {"busy": 0, "stopped": False}
+
+    def work():
+        while True:
+            with condition:
+                while not queue and state["busy"] and not state["stopped"]:
+                    condition.wait()
+                if state["stopped"] or not queue:
+                    # 已停止，或者队列为空且没有线程在读取（遍历完成）
+                    condition.notify_all()
+                    return
+                key, rel_dir = heapq.heappop(queue)
+                state["busy"] += 1
+
+            result, subdirs, error = None, (), None
+            if job is None or not job.cancelled:
+                try:
+                    result, subdirs = list_directory(rel_dir)
+                except Exception as e:
+                    error = e
+
+            with condition:
+                state["busy"] -= 1
+                results[key] = (rel_dir, result, len(subdirs), error)
+                for i, name in enumerate(subdirs):
+                    child = f"{rel_dir}/{name}" if rel_dir else name
+                    heapq.heappush(queue, (key + (i,), child))
+                condition.notify_all()
+
+    threads = [
+        threading.Thread(target=work, daemon=True)
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        stack = [()]
+        while stack:
+            key = stack.pop()
+            with condition:
+                while key not in results:
+                    if job is not None and job.cancelled:
+                        return
+                    condition.wait(_WAIT_SECONDS)
+                rel_dir, result, count, error = results.pop(key)
+            if error is not None:
+                raise error
+            if job is not None and job.cancelled:
+                return
+            yield rel_dir, result
+            stack.extend(key + (i,) for i in reversed(range(count)))
+    finally:
+        with condition:
+            state["stopped"] = True
+            condition.notify_all()
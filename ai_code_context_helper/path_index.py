@@ -0,0 +1,446 @@
+"""
+文件路径索引模块
+
+为项目中所有文件的相对路径建立三字母组（trigram）倒排索引，供快速打开框
+进行全项目的模糊文件名搜索。索引在后台线程中遍历整个项目建立，之后目录树
+每次读取目录时按目录增量更新。
+
+查询中长度不少于3的词通过倒排表求交集得到候选路径，查询中的某个三字母组
+不在任何路径中时立即判定没有子串匹配。文件名包含查询词的候选优先，每一级
+只为其中最短的有限数量的路径打分，耗时不随项目规模增长。没有子串匹配时
+（缩写式的查询，如 "setmgr"），只在文件名包含查询词开头三个字符的路径中
+按子序列匹配；只有短词的查询按文件名开头查找。
+
+Classes:
+    PathIndex: 文件相对路径的三字母组索引
+
+Functions:
+    walk_project(root_dir, use_gitignore, job, listing): 遍历项目的所有目录（在后台线程中调用）
+    build_path_index(index, root_dir, use_gitignore, job, listing): 遍历项目建立索引（在后台线程中调用）
+"""
+
+import os
+import re
+import threading
+
+from ai_code_context_helper.file_utils import gitignored_names
+from ai_code_context_helper.parallel_walk import parallel_walk
+from ai_code_context_helper.walk_guard import WalkGuard
+
+# 每一级最多打分的候选路径数，候选更多时只为最短的路径打分
+_MAX_SCORED = 500
+# 候选超过全部路径的该比例时，按长度顺序逐个查找最短的候选，而不是排序
+_DENSE_RATIO = 8
+
+
+def _trigrams(text):
+    """返回字符串中所有三字母组的集合"""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _name_heads(name):
+    """返回文件名的前一个和前两个字符（用于只有短词的查询）"""
+    return {name[:1], name[:2]} - {""}
+
+
+def _is_subsequence(query, text):
+    """判断 query 的字符是否按顺序出现在 text 中"""
+    it = iter(text)
+    return all(ch in it for ch in query)
+
+
+def _score(tokens, path):
+    """
+    计算路径与查询词的匹配得分，任一查询词完全不匹配时返回None
+
+    文件名中的匹配优先于目录中的匹配，连续子串优先于子序列，
+    同等条件下较短的路径排在前面。
+    """
+    name = path[path.rfind("/") + 1 :]
+    score = 0.0
+    for token in tokens:
+        if token in name:
+            score += 100 if name.startswith(token) else 80
+        elif token in path:
+            score += 50
+        elif _is_subsequence(token, name):
+            score += 30
+        elif _is_subsequence(token, path):
+            score += 10
+        else:
+            return None
+    return score - len(path) * 0.1
+
+
+class PathIndex:
+    """
+    文件相对路径的三字母组索引
+
+    路径使用 "/" 分隔。写入（后台建立和目录树增量更新）和查询可以在
+    不同线程中进行，所有公开方法都持有同一把锁。
+
+    Attributes:
+        root_dir (str): 索引对应的项目根目录，尚未建立时为None
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.root_dir = None
+        self._build_job = None  # 正在建立索引的任务
+        self._reset()
+
+    def _reset(self):
+        self._paths = []  # 编号 -> 相对路径（已删除的位置为None）
+        self._lower = []  # 编号 -> 小写的相对路径
+        self._lengths = []  # 编号 -> 路径长度
+        self._ids = {}  # 相对路径 -> 编号
+        self._free = []  # 可复用的编号
+        self._postings = {}  # 三字母组 -> 路径包含它的编号集合
+        self._name_postings = {}  # 三字母组 -> 文件名包含它的编号集合
+        self._heads = {}  # 文件名的前一个或前两个字符 -> 编号集合
+        self._files = {}  # 目录相对路径 -> 直接包含的文件名集合
+        self._subdirs = {}  # 目录相对路径 -> 直接包含的子目录名集合
+        self._by_length = None  # 按路径长度排序的编号，索引变化后按需重建
+
+    def reset(self, root_dir, job=None):
+        """
+        清空索引，准备为新的项目根目录建立索引
+
+        Args:
+            root_dir (str): 项目根目录
+            job (Job): 负责建立索引的任务
+        """
+        with self._lock:
+            self._reset()
+            self.root_dir = root_dir
+            self._build_job = job
+
+    @property
+    def building(self):
+        """是否正在后台建立索引"""
+        return self._build_job is not None
+
+    def finish_build(self, job):
+        """
+        标记任务建立索引结束（任务已被新的任务取代时不影响新任务）
+
+        同时在后台线程中预先按长度排序路径，使第一次搜索不必等待。
+        """
+        with self._lock:
+            if self._build_job is job:
+                self._build_job = None
+                self._ensure_order()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids)
+
+    @staticmethod
+    def _keys(lower):
+        """返回路径在三种倒排表中的键：(路径的三字母组, 文件名的三字母组, 文件名开头)"""
+        name = lower[lower.rfind("/") + 1 :]
+        return _trigrams(lower), _trigrams(name), _name_heads(name)
+
+    def _add(self, path):
+        if path in self._ids:
+            return
+        lower = path.lower()
+        if self._free:
+            path_id = self._free.pop()
+            self._paths[path_id] = path
+            self._lower[path_id] = lower
+            self._lengths[path_id] = len(lower)
+        else:
+            path_id = len(self._paths)
+            self._paths.append(path)
+            self._lower.append(lower)
+            self._lengths.append(len(lower))
+        self._ids[path] = path_id
+        self._by_length = None
+        tables = (self._postings, self._name_postings, self._heads)
+        for table, keys in zip(tables, self._keys(lower)):
+            for key in keys:
+                table.setdefault(key, set()).add(path_id)
+
+    def _remove(self, path):
+        path_id = self._ids.pop(path, None)
+        if path_id is None:
+            return
+        tables = (self._postings, self._name_postings, self._heads)
+        for table, keys in zip(tables, self._keys(self._lower[path_id])):
+            for key in keys:
+                ids = table.get(key)
+                if ids is not None:
+                    ids.discard(path_id)
+                    if not ids:
+                        del table[key]
+        self._paths[path_id] = None
+        self._lower[path_id] = None
+        self._free.append(path_id)
+
+    def _remove_tree(self, dir_path):
+        """删除目录及其所有子目录下的文件"""
+        stack = [dir_path]
+        while stack:
+            current = stack.pop()
+            prefix = current + "/" if current else ""
+            for name in self._files.pop(current, ()):
+                self._remove(prefix + name)
+            stack.extend(prefix + name for name in self._subdirs.pop(current, ()))
+
+    def sync_directory(self, dir_path, file_names, dir_names):
+        """
+        用目录的最新内容更新索引
+
+        新增的文件加入索引，消失的文件和子目录（包括其下的所有文件）从索引中删除。
+
+        Args:
+            dir_path (str): 目录的相对路径，根目录为空字符串
+            file_names (iterable): 目录中的文件名
+            dir_names (iterable): 目录中的子目录名
+        """
+        prefix = dir_path + "/" if dir_path else ""
+        file_names = set(file_names)
+        dir_names = set(dir_names)
+        with self._lock:
+            old_files = self._files.get(dir_path, set())
+            for name in old_files - file_names:
+                self._remove(prefix + name)
+            for name in file_names - old_files:
+                self._add(prefix + name)
+            for name in self._subdirs.get(dir_path, set()) - dir_names:
+                self._remove_tree(prefix + name)
+            self._files[dir_path] = file_names
+            self._subdirs[dir_path] = dir_names
+
+    def search(self, query, limit=50):
+        """
+        模糊搜索文件路径
+
+        Args:
+            query (str): 查询文本，空格分隔的多个词需要同时匹配
+            limit (int): 最多返回的结果数
+
+        Returns:
+            list: 按得分从高到低排列的相对路径
+        """
+        tokens = query.lower().replace("\\", "/").split()
+        if not tokens:
+            return []
+
+        with self._lock:
+            scored = self._search(tokens, limit)
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            return [self._paths[path_id] for _, _, path_id in scored[:limit]]
+
+    def _search(self, tokens, limit):
+        """返回 (得分, 小写路径, 编号) 列表，按匹配质量分级，每一级只为有限数量的路径打分"""
+        long_tokens = [token for token in tokens if len(token) >= 3]
+        if not long_tokens:
+            # 只有短词：按文件名开头查找
+            ids = self._heads.get(max(tokens, key=len))
+            return self._score_shortest(tokens, ids) if ids else []
+
+        # 文件名包含全部查询词（含 "/" 的词则在路径中）的路径优先，
+        # 这一级结果足够时不再对整条路径的索引求交集
+        scored = []
+        seen = ()
+        name_tokens = [token for token in long_tokens if "/" not in token]
+        if name_tokens:
+            name_ids = self._intersect(self._name_postings, name_tokens)
+            dir_tokens = [token for token in long_tokens if "/" in token]
+            if name_ids and dir_tokens:
+                dir_ids = self._intersect(self._postings, dir_tokens)
+                name_ids = name_ids & dir_ids if dir_ids else None
+            if name_ids:
+                scored = self._score_shortest(tokens, name_ids)
+                seen = name_ids
+        if len(scored) >= limit:
+            return scored
+
+        path_ids = self._intersect(self._postings, long_tokens)
+        if path_ids:
+            scored += self._score_shortest(tokens, path_ids, seen)
+        elif not scored:
+            # 没有路径包含全部查询词（查询中的三字母组不存在时不求交集）
+            return self._fuzzy(tokens)
+        return scored
+
+    def _intersect(self, postings, tokens):
+        """
+        求查询词所有三字母组的倒排表交集
+
+        Returns:
+            set: 候选编号（只有一个倒排表时直接返回该集合，调用方不能修改）；
+                某个三字母组不在倒排表中时返回None
+        """
+        grams = set()
+        for token in tokens:
+            grams |= _trigrams(token)
+
+        lists = []
+        for gram in grams:
+            ids = postings.get(gram)
+            if not ids:
+                return None
+            lists.append(ids)
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = result & ids
+            if not result:
+                break
+        return result
+
+    def _fuzzy(self, tokens):
+        """
+        按子序列查找缩写式的查询（如 "setmgr" 匹配 settings_manager.py）
+
+        只检查文件名包含每个查询词开头三个字符（短词为文件名开头）的路径，
+        开头不在任何文件名中时立即返回。
+        """
+        ids = None
+        for token in sorted(tokens, key=len, reverse=True):
+            if len(token) >= 3:
+                postings = self._name_postings.get(token[:3])
+            else:
+                postings = self._heads.get(token)
+            if not postings:
+                return []
+            ids = postings if ids is None else ids & postings
+            if not ids:
+                return []
+
+        # 每个字符之前只跳过不等于它的字符，匹配时不会回溯
+        patterns = [
+            re.compile("".join(f"[^{re.escape(ch)}]*{re.escape(ch)}" for ch in token))
+            for token in tokens
+        ]
+        lower = self._lower
+        if len(patterns) == 1:
+            match = patterns[0].match
+            matched = {path_id for path_id in ids if match(lower[path_id])}
+        else:
+            matched = {
+                path_id
+                for path_id in ids
+                if all(pattern.match(lower[path_id]) for pattern in patterns)
+            }
+        return self._score_shortest(tokens, matched)
+
+    def _ensure_order(self):
+        """按需重建按路径长度排序的编号列表（索引变化后第一次需要时）"""
+        if self._by_length is None:
+            self._by_length = sorted(self._ids.values(), key=self._lengths.__getitem__)
+
+    def _shortest(self, ids, exclude=()):
+        """返回候选中最短的至多 _MAX_SCORED 个编号，跳过 exclude 中的编号"""
+        if len(ids) - len(exclude) <= _MAX_SCORED:
+            return [path_id for path_id in ids if path_id not in exclude]
+        if len(ids) * _DENSE_RATIO > len(self._ids):
+            # 候选很多时按长度顺序查找，很快就能找到足够的候选
+            self._ensure_order()
+            result = []
+            for path_id in self._by_length:
+                if path_id in ids and path_id not in exclude:
+                    result.append(path_id)
+                    if len(result) >= _MAX_SCORED:
+                        break
+            return result
+        candidates = ids - exclude if exclude else ids
+        return sorted(candidates, key=self._lengths.__getitem__)[:_MAX_SCORED]
+
+    def _score_shortest(self, tokens, ids, exclude=()):
+        """为候选中最短的有限数量的路径打分，返回 (得分, 小写路径, 编号) 列表"""
+        scored = []
+        for path_id in self._shortest(ids, exclude):
+            lower = self._lower[path_id]
+            score = _score(tokens, lower)
+            if score is not None:
+                scored.append((score, lower, path_id))
+        return scored
+
+
+def walk_project(root_dir, use_gitignore, job, listing=None):
+    """
+    遍历项目的所有目录（在后台线程中调用）
+
+    跳过隐藏的文件和目录，启用 .gitignore 时跳过被忽略的条目。
+    给出 Git 文件列表时按列表遍历，不再判断 .gitignore 规则。
+    多个线程并行读取目录（在各线程中判断 .gitignore 规则），目录按先序给出，
+    文件和子目录按名称排序。默认排除的大型目录在判断 .gitignore 规则之前
+    按名称跳过。按设置跟随目录符号链接，不进入与上级目录相同的目录
+    （符号链接循环），设置只遍历一个文件系统时不进入其他文件系统。
+    任务被取消时提前结束。
+
+    Args:
+        root_dir (str): 项目根目录
+        use_gitignore (bool): 是否应用 .gitignore 规则
+        job (Job): 任务，只读取其 cancelled 标记
+        listing (GitListing): 项目的 Git 文件列表，为None时读取磁盘
+
+    Yields:
+        tuple: (目录的相对路径（"/" 分隔，根目录为空字符串）, 文件名列表, 子目录名列表)
+    """
+    if listing is not None and listing.root_dir == root_dir:
+        yield from listing.walk(job)
+        return
+
+    guard = WalkGuard(root_dir)
+
+    def list_directory(rel_dir):
+        directory = os.path.join(root_dir, rel_dir) if rel_dir else root_dir
+        files = []
+        dirs = []
+        try:
+            if guard.enter(rel_dir)[1] is not None:
+                return None, dirs
+            with os.scandir(directory) as it:
+                entries = [
+                    entry
+                    for entry in it
+                    if not entry.name.startswith(".")
+                    and not (guard.prunes(entry.name) and entry.is_dir())
+                ]
+        except OSError:
+            return None, dirs
+        if use_gitignore and entries:
+            ignored = gitignored_names(directory, [e.name for e in entries], root_dir)
+            entries = [e for e in entries if e.name not in ignored]
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+                if is_dir and not guard.follows(entry.path, entry.is_symlink()):
+                    continue
+            except OSError:
+                continue
+            (dirs if is_dir else files).append(entry.name)
+        files.sort()
+        dirs.sort()
+        return (files, dirs), dirs
+
+    for rel_dir, listed in parallel_walk(list_directory, job):
+        if listed is not None:
+            yield (rel_dir, *listed)
+
+
+def build_path_index(index, root_dir, use_gitignore, job, listing=None):
+    """
+    遍历项目并建立路径索引（在后台线程中调用）
+
+    任务被取消或索引已切换到其他项目时提前结束。
+
+    Args:
+        index (PathIndex): 要建立的索引
+        root_dir (str): 项目根目录
+        use_gitignore (bool): 是否应用 .gitignore 规则
+        job (Job): 任务，只读取其 cancelled 标记
+        listing (GitListing): 项目的 Git 文件列表，为None时读取磁盘
+    """
+    try:
+        for rel_dir, files, dirs in walk_project(root_dir, use_gitignore, job, listing):
+            if index.root_dir != root_dir:
+                return
+            index.sync_directory(rel_dir, files, dirs)
+    finally:
+        index.finish_build(job)
@@ -0,0 +1,266 @@
+"""
+项目状态存储模块
+
+每个项目的状态（展开路径、勾选状态和文件扫描缓存）保存在独立的JSON文件中，
+只在打开该项目时才加载。项目数量超过上限时按最近最少使用（LRU）的顺序淘汰，
+使全局设置文件保持精简，加载迅速。项目的内容索引和导入关系等缓存保存在
+与状态文件同名、后缀不同的文件中，随项目状态一起淘汰和删除。
+
+Classes:
+    ProjectState: 单个项目的状态
+    ProjectStateStore: 管理所有项目状态文件的存储
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+INDEX_FILENAME = "index.json"
+# 项目的索引缓存文件与状态文件同名，后缀不同
+CONTENT_INDEX_SUFFIX = ".content.json"  # 内容索引
+IMPORT_GRAPH_SUFFIX = ".imports.json"  # Python 导入关系
+COMPANION_SUFFIXES = (CONTENT_INDEX_SUFFIX, IMPORT_GRAPH_SUFFIX)
+
+
+def _atomic_write(file_path, content):
+    """先写入临时文件再替换目标文件，避免写入中断导致文件损坏"""
+    temp_file = str(file_path) + ".tmp"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, file_path)
+    except Exception:
+        if os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        raise
+
+
+class ProjectState:
+    """
+    单个项目的状态
+
+    Attributes:
+        path (str): 项目根目录（标准化路径）
+        expanded_paths (list): 展开的相对路径列表，None表示尚未保存过
+        unchecked_paths (set): 取消勾选的相对路径集合
+        scan_meta (dict): 文件扫描缓存，相对路径 -> [修改时间, 大小, 行数]
+        dirty (bool): 是否有尚未写入文件的修改
+    """
+
+    def __init__(self, path, data=None):
+        data = data or {}
+        self.path = path
+        self.expanded_paths = data.get("expanded_paths")
+        self.unchecked_paths = set(data.get("unchecked_paths", []))
+        self.scan_meta = data.get("scan_meta", {})
+        self.dirty = False
+
+    def to_dict(self):
+        """返回可序列化的状态快照"""
+        data = {
+            "path": self.path,
+            "unchecked_paths": sorted(self.unchecked_paths),
+            "scan_meta": dict(self.scan_meta),
+        }
+        if self.expanded_paths is not None:
+            data["expanded_paths"] = list(self.expanded_paths)
+        return data
+
+
+class ProjectStateStore:
+    """
+    项目状态存储
+
+    状态文件以项目路径的哈希命名，索引文件记录项目路径与文件名的对应关系
+    以及最近使用顺序。所有方法都可以在Tk线程中调用，flush() 由后台
+    持久化线程调用。
+
+    Attributes:
+        state_dir (Path): 状态文件目录
+        max_projects (int): 最多保留的项目数量
+    """
+
+    def __init__(self, state_dir, max_projects):
+        self.state_dir = Path(state_dir)
+        self.max_projects = max_projects
+        self._lock = threading.RLock()
+        self._index = OrderedDict()  # 项目路径 -> 文件名，最近使用的在末尾
+        self._states = {}  # 已加载的项目状态
+        self._removed_files = set()  # 等待删除的状态文件
+        self._index_dirty = False
+        self._load_index()
+
+    @staticmethod
+    def _filename(path):
+        """根据项目路径生成状态文件名"""
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+        return f"{digest}.json"
+
+    @staticmethod
+    def _companion_filename(filename, suffix):
+        """根据状态文件名生成索引缓存文件名"""
+        return filename[: -len(".json")] + suffix
+
+    def _discard_files(self, filename):
+        """登记删除状态文件及其索引缓存文件"""
+        self._removed_files.add(filename)
+        for suffix in COMPANION_SUFFIXES:
+            self._removed_files.add(self._companion_filename(filename, suffix))
+
+    def companion_file(self, path, suffix):
+        """
+        返回项目索引缓存文件的路径（随项目状态一起淘汰和删除）
+
+        Args:
+            path (str): 项目根目录（标准化路径）
+            suffix (str): COMPANION_SUFFIXES 中的文件后缀
+
+        Returns:
+            Path: 索引缓存文件路径
+        """
+        with self._lock:
+            filename = self._index.get(path) or self._filename(path)
+            return self.state_dir / self._companion_filename(filename, suffix)
+
+    def _load_index(self):
+        """加载索引文件（只包含项目路径，不加载任何项目状态）"""
+        index_file = self.state_dir / INDEX_FILENAME
+        if not index_file.exists():
+            return
+        try:
+            with open(index_file, "r", encoding="utf-8") as f:
+                for path, filename in json.load(f).get("projects", []):
+                    self._index[path] = filename
+        except Exception as e:
+            print(f"加载项目状态索引失败: {str(e)}")
+
+    def _read_state(self, path, filename):
+        """从文件读取单个项目的状态"""
+        try:
+            with open(self.state_dir / filename, "r", encoding="utf-8") as f:
+                return ProjectState(path, json.load(f))
+        except FileNotFoundError:
+            return ProjectState(path)
+        except Exception as e:
+            print(f"加载项目状态失败 ({path}): {str(e)}")
+            return ProjectState(path)
+
+    def contains(self, path):
+        """检查是否保存过该项目的状态"""
+        with self._lock:
+            return path in self._states or path in self._index
+
+    def get(self, path, create=True):
+        """
+        获取项目状态，首次访问时从文件加载，并标记为最近使用
+
+        Args:
+            path (str): 项目根目录（标准化路径）
+            create (bool): 不存在时是否创建新的状态
+
+        Returns:
+            ProjectState: 项目状态；create为False且不存在时返回None
+        """
+        with self._lock:
+            state = self._states.get(path)
+            if state is None:
+                if path in self._index:
+                    state = self._read_state(path, self._index[path])
+                elif create:
+                    state = ProjectState(path)
+                else:
+                    return None
+                self._states[path] = state
+            self._touch(path)
+            return state
+
+    def _touch(self, path):
+        """将项目移到最近使用的位置，并淘汰超出上限的项目"""
+        if path in self._index:
+            if next(reversed(self._index)) == path:
+                return
+            self._index.move_to_end(path)
+        else:
+            filename = self._filename(path)
+            self._index[path] = filename
+            self._removed_files.discard(filename)
+            for suffix in COMPANION_SUFFIXES:
+                self._removed_files.discard(self._companion_filename(filename, suffix))
+        self._index_dirty = True
+        self._evict()
+
+    def _evict(self):
+        """按LRU顺序淘汰超出数量上限的项目状态"""
+        while len(self._index) > max(1, self.max_projects):
+            old_path, filename = self._index.popitem(last=False)
+            self._states.pop(old_path, None)
+            self._discard_files(filename)
+            print(f"淘汰项目状态: {old_path}")
+
+    def remove(self, path):
+        """删除指定项目的状态"""
+        with self._lock:
+            self._states.pop(path, None)
+            filename = self._index.pop(path, None)
+            if filename:
+                self._discard_files(filename)
+                self._index_dirty = True
+
+    def clear(self):
+        """删除所有项目的状态"""
+        with self._lock:
+            for filename in self._index.values():
+                self._discard_files(filename)
+            self._index.clear()
+            self._states.clear()
+            self._index_dirty = True
+
+    def flush(self):
+        """将有修改的项目状态和索引写入文件（在后台持久化线程中调用）"""
+        with self._lock:
+            pending = []
+            for path, state in self._states.items():
+                if state.dirty and path in self._index:
+                    state.dirty = False
+                    pending.append((state, self._index[path], state.to_dict()))
+            removed = list(self._removed_files)
+            self._removed_files.clear()
+            index = None
+            if self._index_dirty:
+                self._index_dirty = False
+                index = {"projects": [list(item) for item in self._index.items()]}
+
+        if not pending and not removed and index is None:
+            return
+
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            for _, filename, data in pending:
+                _atomic_write(
+                    self.state_dir / filename, json.dumps(data, ensure_ascii=False)
+                )
+            for filename in removed:
+                try:
+                    os.remove(self.state_dir / filename)
+                except FileNotFoundError:
+                    pass
+            if index is not None:
+                _atomic_write(
+                    self.state_dir / INDEX_FILENAME,
+                    json.dumps(index, ensure_ascii=False, indent=2),
+                )
+        except Exception as e:
+            # 写入失败时保留修改标记，等待下一次保存
+            for state, _, _ in pending:
+                state.dirty = True
+            if index is not None:
+                self._index_dirty = True
+            print(f"保存项目状态失败: {str(e)}")
@@ -4,12 +4,15 @@ AI代码上下文助手启动脚本
 此脚本是应用程序的入口点，运行此脚本将启动AI代码上下文助手。
 """
 
+import multiprocessing
 import tkinter as tk
 from ai_code_context_helper.code_context_generator import CodeContextGenerator
 
 
 def main():
     """应用程序入口点，创建主窗口并启动事件循环"""
+    # 打包为可执行文件后，进程池的工作进程需要在这里识别并退出
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = CodeContextGenerator(root)
     root.mainloop()
@@ -6,9 +6,9 @@
 """
 
 import json
-from pathlib import Path
 import os
-import sys
+import threading
+import time
 
 from ai_code_context_helper.markdown_exporter import SUPPORTED_EXTENSIONS
 from ai_code_context_helper.config import (
@@ -18,8 +18,33 @@ from ai_code_context_helper.config import (
     DEFAULT_CODE_SUFFIX,
     MAX_HISTORY_ITEMS,
     SETTINGS_FILENAME,
+    PROJECT_STATE_DIR,
+    MAX_PROJECT_STATES,
+    SETTINGS_SAVE_DELAY,
+    HISTORY_CHECK_TIMEOUT,
+    HISTORY_CHECK_INTERVAL,
+    DEFAULT_LANGUAGE,
+    TRUNCATE_MAX_KB,
+    TRUNCATE_MAX_LINES,
+    TRUNCATE_HEAD_LINES,
+    TRUNCATE_TAIL_LINES,
+    EXPORT_SHARD_MAX_KB,
+    EXPORT_SHARD_MAX_TOKENS,
+    GITIGNORE_BACKEND_PYTHON,
+    SYMLINK_FOLLOW_ALWAYS,
+    PRUNE_DIRECTORIES,
+)
+from ai_code_context_helper.file_utils import (
+    get_resources_dir,
+    normalize_path,
+    TruncationPolicy,
+)
+from ai_code_context_helper.languages import LANGUAGE_NAMES, load_language
+from ai_code_context_helper.project_state import (
+    ProjectStateStore,
+    CONTENT_INDEX_SUFFIX,
+    IMPORT_GRAPH_SUFFIX,
 )
-from ai_code_context_helper.file_utils import normalize_path
 
 
 class SettingsManager:
@@ -31,7 +56,6 @@ class SettingsManager:
 
     Attributes:
         settings_file (Path): 设置文件路径
-        languages (dict): 支持的语言和文本字典
         PATH_PREFIX (str): 文件路径前缀
         PATH_SUFFIX (str): 文件路径后缀
         CODE_PREFIX (str): 代码前缀
@@ -40,32 +64,35 @@ class SettingsManager:
         show_files_value (bool): 是否显示文件
         show_folders_value (bool): 是否显示文件夹
         use_relative_path_value (bool): 是否使用相对路径
+        outline_mode_value (bool): 复制和导出时是否只输出代码大纲
         max_depth_value (int): 目录树最大深度
         file_filter_value (str): 文件过滤器
         preserve_tree_state_value (bool): 是否保留树状态
         dir_history (list): 目录历史记录
+        project_states (ProjectStateStore): 各项目的展开、勾选状态和扫描缓存
+        max_project_states (int): 最多保留状态的项目数量
+        truncate_max_kb (int): 复制和导出时超过此大小（KB）的文件只读取开头和结尾
+        truncate_max_lines (int): 复制和导出时超过此行数的文件只保留开头和结尾
+        truncate_head_lines (int): 截断时保留的开头行数
+        truncate_tail_lines (int): 截断时保留的结尾行数
+        export_shard_max_kb (int): 分片导出时每个分片的最大大小（KB），0表示不限制
+        export_shard_max_tokens (int): 分片导出时每个分片的最大估计 token 数，0表示不限制
+        use_git_index_value (bool): 项目在Git仓库中时是否按Git索引列出文件
+        git_include_untracked (bool): 使用Git索引时是否包含未跟踪且未被忽略的文件
+        gitignore_backend (str): 判断 .gitignore 规则的方式（"python" 或 "git"）
+        follow_symlinks (str): 遍历时跟随目录符号链接的策略（"always"、"inside_project" 或 "never"）
+        same_filesystem (bool): 遍历时是否只进入项目根目录所在的文件系统
+        prune_directories (list): 默认排除的大型目录名，不依赖 .gitignore
         current_language (str): 当前语言代码
         texts (dict): 当前语言文本
         show_advanced_options_value (bool): 是否显示高级选项
-        settings_changed (bool): 设置是否已更改
+        settings_changed (bool): 设置是否已更改（等待后台线程保存）
         max_history_items (int): 最大历史记录数量
     """
 
-    def __init__(self, languages):
-        """
-        初始化设置管理器
-
-        Args:
-            languages (dict): 支持的语言和文本字典
-        """
-        script_dir = Path(os.path.dirname(os.path.abspath(sys.argv[0])))
-        # 开发模式使用当前包目录
-        if os.path.exists(os.path.join(script_dir, "resources")):
-            self.settings_file = script_dir / "resources" / SETTINGS_FILENAME
-        # 否则使用打包后的路径
-        else:
-            self.settings_file = script_dir / SETTINGS_FILENAME
-        self.languages = languages
+    def __init__(self):
+        """初始化设置管理器"""
+        self.settings_file = get_resources_dir() / SETTINGS_FILENAME
 
         # 默认设置
         self.PATH_PREFIX = DEFAULT_PATH_PREFIX
@@ -76,15 +103,29 @@ class SettingsManager:
         self.show_files_value = True
         self.show_folders_value = True
         self.use_relative_path_value = True
+        self.outline_mode_value = False
         self.max_depth_value = 0
         self.file_filter_value = ""
         self.dir_history = []
-        self.current_language = "en_US"
-        self.texts = self.languages.get(self.current_language, self.languages["en_US"])
+        self.current_language = DEFAULT_LANGUAGE
+        self.texts = None
         self.show_advanced_options_value = True
         self.enable_easy_multiselect_value = True
-        self.expanded_states = {}
+        self.max_project_states = MAX_PROJECT_STATES
+        self.truncate_max_kb = TRUNCATE_MAX_KB
+        self.truncate_max_lines = TRUNCATE_MAX_LINES
+        self.truncate_head_lines = TRUNCATE_HEAD_LINES
+        self.truncate_tail_lines = TRUNCATE_TAIL_LINES
+        self.export_shard_max_kb = EXPORT_SHARD_MAX_KB
+        self.export_shard_max_tokens = EXPORT_SHARD_MAX_TOKENS
+        self._legacy_expanded_states = {}
         self.use_gitignore_value = False
+        self.use_git_index_value = False
+        self.git_include_untracked = True
+        self.gitignore_backend = GITIGNORE_BACKEND_PYTHON
+        self.follow_symlinks = SYMLINK_FOLLOW_ALWAYS
+        self.same_filesystem = False
+        self.prune_directories = list(PRUNE_DIRECTORIES)
         self.is_topmost_value = False
 
         self.settings_changed = False
@@ -94,8 +135,25 @@ class SettingsManager:
         self.show_encoding = False
         self.supported_extensions = SUPPORTED_EXTENSIONS
 
+        # 后台持久化状态
+        self._save_event = threading.Event()
+        self._write_lock = threading.Lock()
+        self._last_change_time = 0.0
+        self._saved_content = None
+        self._history_checks = {}  # 路径 -> (检查时间, 是否存在)
+        self._pending_history_checks = set()
+
         self.load_settings()
 
+        # 项目状态单独存放，打开项目时才加载
+        self.project_states = ProjectStateStore(
+            self.settings_file.parent / PROJECT_STATE_DIR, self.max_project_states
+        )
+        self._migrate_expanded_states()
+
+        self._save_thread = threading.Thread(target=self._save_worker, daemon=True)
+        self._save_thread.start()
+
     def load_settings(self):
         """
         从配置文件加载应用程序设置
@@ -122,6 +180,7 @@ class SettingsManager:
                     self.use_relative_path_value = settings.get(
                         "use_relative_path", True
                     )
+                    self.outline_mode_value = settings.get("outline_mode", False)
                     self.max_depth_value = settings.get("max_depth", 0)
                     self.file_filter_value = settings.get("file_filter", "")
                     self.show_advanced_options_value = settings.get(
@@ -131,13 +190,48 @@ class SettingsManager:
                         "enable_easy_multiselect", True
                     )
                     self.use_gitignore_value = settings.get("use_gitignore", False)
+                    self.use_git_index_value = settings.get("use_git_index", False)
+                    self.git_include_untracked = settings.get(
+                        "git_include_untracked", True
+                    )
+                    self.gitignore_backend = settings.get(
+                        "gitignore_backend", GITIGNORE_BACKEND_PYTHON
+                    )
+                    self.follow_symlinks = settings.get(
+                        "follow_symlinks", SYMLINK_FOLLOW_ALWAYS
+                    )
+                    self.same_filesystem = settings.get("same_filesystem", False)
+                    self.prune_directories = settings.get(
+                        "prune_directories", list(PRUNE_DIRECTORIES)
+                    )
                     self.is_topmost_value = settings.get("is_topmost", False)
                     self.include_markers = settings.get("include_markers", self.include_markers)
                     self.show_encoding = settings.get("show_encoding", self.show_encoding)
                     self.supported_extensions = SUPPORTED_EXTENSIONS
-                    # 加载目录历史和展开状态
+                    self.max_project_states = settings.get(
+                        "max_project_states", MAX_PROJECT_STATES
+                    )
+                    self.truncate_max_kb = settings.get(
+                        "truncate_max_kb", TRUNCATE_MAX_KB
+                    )
+                    self.truncate_max_lines = settings.get(
+                        "truncate_max_lines", TRUNCATE_MAX_LINES
+                    )
+                    self.truncate_head_lines = settings.get(
+                        "truncate_head_lines", TRUNCATE_HEAD_LINES
+                    )
+                    self.truncate_tail_lines = settings.get(
+                        "truncate_tail_lines", TRUNCATE_TAIL_LINES
+                    )
+                    self.export_shard_max_kb = settings.get(
+                        "export_shard_max_kb", EXPORT_SHARD_MAX_KB
+                    )
+                    self.export_shard_max_tokens = settings.get(
+                        "export_shard_max_tokens", EXPORT_SHARD_MAX_TOKENS
+                    )
+                    # 加载目录历史（旧版本的展开状态随后迁移到项目状态存储）
                     self.dir_history = []
-                    self.expanded_states = {}
+                    self._legacy_expanded_states = {}
 
                     if "directory_history" in settings:
                         for entry in settings["directory_history"]:
@@ -145,98 +239,316 @@ class SettingsManager:
                                 path = normalize_path(entry["path"])
                                 self.dir_history.append(path)
                                 if "expanded_paths" in entry:
-                                    print(f"从设置加载展开状态: {path} -> {entry['expanded_paths']}")
-                                    self.expanded_states[path] = entry["expanded_paths"]
+                                    self._legacy_expanded_states[path] = entry[
+                                        "expanded_paths"
+                                    ]
                         
                         # 限制历史记录数量
                         if len(self.dir_history) > self.max_history_items:
                             self.dir_history = self.dir_history[:self.max_history_items]
 
                     # 加载语言设置
-                    self.current_language = settings.get("language", "en_US")
-                    if self.current_language not in self.languages:
-                        self.current_language = "en_US"
-                    self.texts = self.languages[self.current_language]
+                    self.current_language = settings.get("language", DEFAULT_LANGUAGE)
+                    if self.current_language not in LANGUAGE_NAMES:
+                        self.current_language = DEFAULT_LANGUAGE
 
                     self.settings_changed = False
         except Exception as e:
-            print(f"{self.texts['load_settings_failed'].format(e)}")
+            texts = load_language(self.current_language)
+            print(f"{texts['load_settings_failed'].format(e)}")
+
+        # 只加载当前语言的语言包
+        self.texts = load_language(self.current_language)
 
     def save_settings(self):
-        """保存设置，使用原子写入"""
+        """
+        请求保存设置（非阻塞）
+
+        实际写入由后台持久化线程完成：短时间内的多次修改会被合并为一次写入，
+        因此可以在Tk线程中随时调用。
+
+        Returns:
+            bool: 总是返回True
+        """
         if not self.settings_changed:
             return True
-        
-        try:
-            # 验证并构建设置数据
-            valid_history = [path for path in self.dir_history if path and os.path.exists(path)]
-            if len(valid_history) != len(self.dir_history):
-                self.dir_history = valid_history
-
-            directory_history = []
-            for path in self.dir_history:
-                entry = {"path": path}
-                if path in self.expanded_states:
-                    entry["expanded_paths"] = self.expanded_states[path]
-                directory_history.append(entry)
-
-            settings = {
-                "path_prefix": self.PATH_PREFIX,
-                "path_suffix": self.PATH_SUFFIX,
-                "code_prefix": self.CODE_PREFIX,
-                "code_suffix": self.CODE_SUFFIX,
-                "show_hidden": self.show_hidden_value,
-                "show_files": self.show_files_value,
-                "show_folders": self.show_folders_value,
-                "use_relative_path": self.use_relative_path_value,
-                "max_depth": self.max_depth_value,
-                "file_filter": self.file_filter_value,
-                "language": self.current_language,
-                "directory_history": directory_history,
-                "show_advanced_options": self.show_advanced_options_value,
-                "enable_easy_multiselect": self.enable_easy_multiselect_value,
-                "use_gitignore": self.use_gitignore_value,
-                "is_topmost": self.is_topmost_value,
-                "include_markers": self.include_markers,
-                "show_encoding": self.show_encoding,
-                "supported_extensions": self.supported_extensions,
-            }
-
-            # 确保目录存在
-            settings_dir = os.path.dirname(self.settings_file)
-            os.makedirs(settings_dir, exist_ok=True)
-
-            # 原子写入
-            temp_file = str(self.settings_file) + '.tmp'
-        
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
-                f.flush()
-                os.fsync(f.fileno())
-        
-            # 原子替换
-            if os.name == 'nt':
-                if os.path.exists(self.settings_file):
-                    os.replace(temp_file, self.settings_file)
-                else:
-                    os.rename(temp_file, self.settings_file)
-            else:
-                os.rename(temp_file, self.settings_file)
 
+        self._last_change_time = time.monotonic()
+        self._save_event.set()
+        return True
+
+    def flush(self):
+        """
+        立即在当前线程中保存设置，用于程序退出前
+
+        Returns:
+            bool: 保存成功（或内容未变化）返回True，否则返回False
+        """
+        return self._write_settings()
+
+    def _save_worker(self):
+        """后台持久化线程，合并保存窗口内的修改后写入设置文件"""
+        while True:
+            self._save_event.wait()
+
+            # 等待保存窗口内不再有新的修改
+            while True:
+                remaining = (
+                    self._last_change_time + SETTINGS_SAVE_DELAY - time.monotonic()
+                )
+                if remaining <= 0:
+                    break
+                time.sleep(remaining)
+
+            self._save_event.clear()
+            self._write_settings()
+
+    def _build_settings(self):
+        """构建要保存的设置数据快照"""
+        # 先复制可变容器，避免Tk线程同时修改
+        dir_history = list(self.dir_history)
+        directory_history = [
+            {"path": path} for path in self._existing_history(dir_history)
+        ]
+
+        return {
+            "path_prefix": self.PATH_PREFIX,
+            "path_suffix": self.PATH_SUFFIX,
+            "code_prefix": self.CODE_PREFIX,
+            "code_suffix": self.CODE_SUFFIX,
+            "show_hidden": self.show_hidden_value,
+            "show_files": self.show_files_value,
+            "show_folders": self.show_folders_value,
+            "use_relative_path": self.use_relative_path_value,
+            "outline_mode": self.outline_mode_value,
+            "max_depth": self.max_depth_value,
+            "file_filter": self.file_filter_value,
+            "language": self.current_language,
+            "directory_history": directory_history,
+            "show_advanced_options": self.show_advanced_options_value,
+            "enable_easy_multiselect": self.enable_easy_multiselect_value,
+            "use_gitignore": self.use_gitignore_value,
+            "use_git_index": self.use_git_index_value,
+            "git_include_untracked": self.git_include_untracked,
+            "gitignore_backend": self.gitignore_backend,
+            "follow_symlinks": self.follow_symlinks,
+            "same_filesystem": self.same_filesystem,
+            "prune_directories": self.prune_directories,
+            "is_topmost": self.is_topmost_value,
+            "include_markers": self.include_markers,
+            "show_encoding": self.show_encoding,
+            "supported_extensions": self.supported_extensions,
+            "max_project_states": self.max_project_states,
+            "truncate_max_kb": self.truncate_max_kb,
+            "truncate_max_lines": self.truncate_max_lines,
+            "truncate_head_lines": self.truncate_head_lines,
+            "truncate_tail_lines": self.truncate_tail_lines,
+            "export_shard_max_kb": self.export_shard_max_kb,
+            "export_shard_max_tokens": self.export_shard_max_tokens,
+        }
+
+    def _write_settings(self):
+        """序列化设置并原子写入文件，内容未变化时跳过写入"""
+        with self._write_lock:
+            # 先清除标记，快照之后的修改会重新标记并触发下一次保存
             self.settings_changed = False
-            print(f"设置已保存")
-            return True
+            temp_file = str(self.settings_file) + ".tmp"
 
-        except Exception as e:
-            # 清理临时文件
-            temp_file = str(self.settings_file) + '.tmp'
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
-            print(f"保存设置失败: {str(e)}")
-            return False
+            # 项目状态有各自的修改标记，单独写入
+            self.project_states.flush()
+
+            try:
+                content = json.dumps(
+                    self._build_settings(), ensure_ascii=False, indent=2
+                )
+                if content == self._saved_content:
+                    return True
+
+                # 确保目录存在
+                settings_dir = os.path.dirname(self.settings_file)
+                os.makedirs(settings_dir, exist_ok=True)
+
+                # 原子写入
+                with open(temp_file, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                # 原子替换
+                os.replace(temp_file, self.settings_file)
+
+                self._saved_content = content
+                print(f"设置已保存")
+                return True
+
+            except Exception as e:
+                self.settings_changed = True
+                # 清理临时文件
+                if os.path.exists(temp_file):
+                    try:
+                        os.remove(temp_file)
+                    except:
+                        pass
+                print(f"保存设置失败: {str(e)}")
+                return False
+
+    def _existing_history(self, paths):
+        """
+        过滤掉已不存在的历史目录
+
+        每个目录在独立的守护线程中检查，避免无法访问的网络驱动器阻塞保存；
+        超时仍未返回结果的目录视为有效并保留。
+
+        Args:
+            paths (list): 历史目录列表
+
+        Returns:
+            list: 存在（或无法及时确认）的目录列表
+        """
+        now = time.monotonic()
+        threads = []
+        for path in paths:
+            if not path or path in self._pending_history_checks:
+                continue
+            checked = self._history_checks.get(path)
+            if checked and now - checked[0] < HISTORY_CHECK_INTERVAL:
+                continue
+            self._pending_history_checks.add(path)
+            thread = threading.Thread(
+                target=self._check_history_path, args=(path,), daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        deadline = now + HISTORY_CHECK_TIMEOUT
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        return [
+            path
+            for path in paths
+            if path and self._history_checks.get(path, (0, True))[1]
+        ]
+
+    def _check_history_path(self, path):
+        """检查单个历史目录是否存在（在守护线程中运行）"""
+        try:
+            exists = os.path.exists(path)
+        except Exception:
+            exists = True
+        self._history_checks[path] = (time.monotonic(), exists)
+        self._pending_history_checks.discard(path)
+
+    def _migrate_expanded_states(self):
+        """将旧版本保存在设置文件中的展开状态迁移到项目状态存储"""
+        if not self._legacy_expanded_states:
+            return
+        # 按历史记录从旧到新迁移，使最近的项目保留在LRU末尾
+        for path in reversed(list(self._legacy_expanded_states)):
+            if not self.project_states.contains(path):
+                state = self.project_states.get(path)
+                state.expanded_paths = self._legacy_expanded_states[path]
+                state.dirty = True
+        print(f"已迁移 {len(self._legacy_expanded_states)} 个项目的展开状态")
+        self._legacy_expanded_states = {}
+        self.settings_changed = True
+
+    def get_project_state(self, directory):
+        """
+        获取项目状态（首次访问时从文件加载）
+
+        Args:
+            directory (str): 项目根目录
+
+        Returns:
+            ProjectState: 项目状态
+        """
+        return self.project_states.get(normalize_path(directory))
+
+    def get_expanded_state(self, directory):
+        """
+        获取保存的展开路径列表
+
+        Args:
+            directory (str): 项目根目录
+
+        Returns:
+            list: 展开的相对路径列表，未保存过时返回None
+        """
+        state = self.project_states.get(normalize_path(directory), create=False)
+        return state.expanded_paths if state else None
+
+    def set_expanded_state(self, directory, expanded_paths):
+        """
+        设置目录的展开状态
+
+        Args:
+            directory (str): 项目根目录
+            expanded_paths (list): 展开的相对路径列表
+        """
+        state = self.get_project_state(directory)
+        state.expanded_paths = list(expanded_paths)
+        state.dirty = True
+        self.settings_changed = True
+
+    def get_content_index_file(self, directory):
+        """
+        获取项目内容索引文件的路径
+
+        Args:
+            directory (str): 项目根目录
+
+        Returns:
+            Path: 内容索引文件路径
+        """
+        return self.project_states.companion_file(
+            normalize_path(directory), CONTENT_INDEX_SUFFIX
+        )
+
+    def get_import_graph_file(self, directory):
+        """
+        获取项目导入关系缓存文件的路径
+
+        Args:
+            directory (str): 项目根目录
+
+        Returns:
+            Path: 导入关系缓存文件路径
+        """
+        return self.project_states.companion_file(
+            normalize_path(directory), IMPORT_GRAPH_SUFFIX
+        )
+
+    def get_truncation_policy(self):
+        """
+        获取复制和导出时单个文件的截断上限
+
+        Returns:
+            TruncationPolicy: 大小和行数上限
+        """
+        return TruncationPolicy(
+            max_bytes=self.truncate_max_kb * 1024,
+            max_lines=self.truncate_max_lines,
+            head_lines=self.truncate_head_lines,
+            tail_lines=self.truncate_tail_lines,
+            size_marker=self.texts.get(
+                "truncated_size_marker",
+                "... [已截断：文件共 {0}，只保留开头 {1} 行和结尾 {2} 行] ...",
+            ),
+            lines_marker=self.texts.get(
+                "truncated_lines_marker", "... [已截断：省略中间 {0} 行，共 {1} 行] ..."
+            ),
+        )
+
+    def remove_project_state(self, directory):
+        """删除指定项目保存的状态"""
+        self.project_states.remove(normalize_path(directory))
+        self.settings_changed = True
+
+    def clear_project_states(self):
+        """删除所有项目保存的状态"""
+        self.project_states.clear()
+        self.settings_changed = True
 
     def update_expanded_state(self, directory, expanded_paths):
         """
@@ -246,15 +558,10 @@ class SettingsManager:
             directory (str): 目录路径
             expanded_paths (list): 新的展开路径列表
         """
-        directory = normalize_path(directory)
-
-        if directory in self.expanded_states:
+        existing_paths = self.get_expanded_state(directory)
+        if existing_paths is not None:
             # 合并现有和新的展开路径，保留所有路径
-            existing_paths = self.expanded_states[directory]
-            merged_paths = list(set(existing_paths + expanded_paths))
-            self.expanded_states[directory] = merged_paths
-        else:
-            self.expanded_states[directory] = expanded_paths
+            expanded_paths = list(set(existing_paths + expanded_paths))
 
-        self.settings_changed = True
+        self.set_expanded_state(directory, expanded_paths)
         self.save_settings()
@@ -0,0 +1,436 @@
+"""
+目录树模型模块
+
+在内存中保存项目的目录结构、文件信息、勾选和展开状态，是目录树的唯一数据来源。
+Treeview控件只是模型的视图：节点对应的行按需创建，选择、过滤和渲染等逻辑
+都直接读取模型，无需查询Treeview控件。
+
+节点只保存自身的名称（已驻留的字符串），完整路径通过父节点指针按需拼接，
+避免为每个节点保存完整的绝对路径。
+
+勾选状态按节点的先序编号保存在一个字节数组中，任意子树对应一段连续的编号区间，
+勾选或取消勾选整个子树只是一次切片赋值。树结构变化后编号延迟到下一次区间操作
+时才重新计算，新建节点在此之前的勾选状态暂存在字典中。
+
+模型保存目录中的全部条目（.gitignore 忽略的除外），显示隐藏文件、只显示文件/目录、
+名称过滤器和最大深度等选项作为过滤条件在读取模型时应用，修改这些选项无需重新扫描磁盘。
+
+Classes:
+    TreeNode: 目录树中的单个节点
+    TreeModel: 目录树模型，维护节点与Treeview行的对应关系
+
+Functions:
+    render_tree_text(model): 将模型渲染为目录树文本
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# 节点类型
+KIND_DIR = "dir"
+KIND_FILE = "file"
+KIND_ERROR = "error"  # 读取目录失败时显示的提示行
+
+_NO_CHILDREN = ()
+
+
+class TreeNode:
+    """
+    目录树中的单个节点
+
+    Attributes:
+        name (str): 名称（路径的最后一部分，根节点为显示名称）
+        parent (TreeNode): 父节点，根节点为None
+        children (list): 子节点列表，顺序与显示顺序一致；文件节点为空元组
+        kind (str): 节点类型，KIND_DIR、KIND_FILE 或 KIND_ERROR
+        size (int): 文件大小（字节）
+        lines (int): 文件行数
+        hidden (bool): 是否为隐藏文件或目录
+        loaded (bool): 目录的子节点是否已从磁盘读取
+        expanded (bool): 是否处于展开状态
+        item_id (str): 对应的Treeview行ID，尚未创建行时为None
+        index (int): 先序编号，尚未编号时为-1
+        end (int): 子树编号区间的结束位置（不含）
+        scan_stamp (tuple): 目录上次从磁盘读取时的 (修改时间, 扫描代数)，尚未读取时为None
+        dir_id (tuple): 目录的 (st_dev, st_ino)，用于发现符号链接循环，尚未读取时为None
+        pruned (bool): 是否为默认排除的大型目录，用户未展开时批量操作不进入
+    """
+
+    __slots__ = (
+        "name",
+        "parent",
+        "children",
+        "kind",
+        "size",
+        "lines",
+        "hidden",
+        "loaded",
+        "expanded",
+        "item_id",
+        "index",
+        "end",
+        "scan_stamp",
+        "dir_id",
+        "pruned",
+    )
+
+    def __init__(self, name, parent=None, kind=KIND_DIR, size=0, lines=0, hidden=False):
+        self.name = sys.intern(name)
+        self.parent = parent
+        self.kind = kind
+        self.children = [] if kind == KIND_DIR else _NO_CHILDREN
+        self.size = size
+        self.lines = lines
+        self.hidden = hidden
+        self.loaded = kind != KIND_DIR
+        self.expanded = False
+        self.item_id = None
+        self.index = -1
+        self.end = -1
+        self.scan_stamp = None
+        self.dir_id = None
+        self.pruned = False
+
+    @property
+    def is_dir(self):
+        return self.kind == KIND_DIR
+
+    @property
+    def is_file(self):
+        return self.kind == KIND_FILE
+
+    def depth(self):
+        """返回节点的层级，根节点为0"""
+        level = 0
+        node = self.parent
+        while node is not None:
+            level += 1
+            node = node.parent
+        return level
+
+    def child(self, name):
+        """按名称查找子节点，不存在时返回None"""
+        for child in self.children:
+            if child.name == name and child.kind != KIND_ERROR:
+                return child
+        return None
+
+    def iter_subtree(self):
+        """先序遍历以该节点为根的子树（包含自身）"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.children:
+                stack.extend(reversed(node.children))
+
+
+class TreeModel:
+    """
+    目录树模型
+
+    Attributes:
+        root (TreeNode): 根节点，树为空时为None
+        root_path (str): 根节点对应的目录路径
+        entry_filter (callable): 条目过滤条件，接收节点返回是否显示，None表示不过滤
+        max_depth (int): 显示的最大深度，0表示不限制
+    """
+
+    def __init__(self):
+        self.root = None
+        self.root_path = None
+        self.entry_filter = None
+        self.max_depth = 0
+        self._by_item = {}  # Treeview行ID -> 节点
+        self._checked = bytearray()  # 先序编号 -> 是否勾选
+        self._pending = {}  # 尚未编号的节点 -> 是否勾选
+        self._numbered = True  # 编号是否与当前树结构一致
+
+    def clear(self):
+        """清空模型"""
+        self.root = None
+        self.root_path = None
+        self._by_item = {}
+        self._checked = bytearray()
+        self._pending = {}
+        self._numbered = True
+
+    def set_root(self, root_path, name):
+        """
+        清空模型并创建根节点
+
+        Args:
+            root_path (str): 根目录路径
+            name (str): 根节点显示名称
+
+        Returns:
+            TreeNode: 新的根节点
+        """
+        self.clear()
+        self.root_path = str(root_path)
+        self.root = self.create_node(None, name, KIND_DIR)
+        self.root.expanded = True
+        return self.root
+
+    def create_node(
+        self, parent, name, kind, checked=True, size=0, lines=0, hidden=False
+    ):
+        """
+        创建节点（还需通过 set_children 放入父节点）
+
+        Args:
+            parent (TreeNode): 父节点
+            name (str): 名称
+            kind (str): 节点类型
+            checked (bool): 初始勾选状态
+            size (int): 文件大小（字节）
+            lines (int): 文件行数
+            hidden (bool): 是否为隐藏文件或目录
+
+        Returns:
+            TreeNode: 新节点
+        """
+        node = TreeNode(name, parent, kind, size, lines, hidden)
+        self._pending[node] = checked and kind != KIND_ERROR
+        self._numbered = False
+        return node
+
+    def set_children(self, node, children):
+        """替换节点的子节点列表"""
+        node.children = children
+        self._numbered = False
+
+    # ---- 过滤 ----
+
+    def filtered_children(self, node):
+        """返回通过条目过滤条件的子节点（不受最大深度限制），错误提示总是保留"""
+        entry_filter = self.entry_filter
+        if entry_filter is None:
+            return node.children
+        return [c for c in node.children if c.kind == KIND_ERROR or entry_filter(c)]
+
+    def visible_children(self, node, depth=None):
+        """
+        返回在目录树中显示的子节点
+
+        Args:
+            node (TreeNode): 目录节点
+            depth (int): 节点的层级，调用方已知时传入以免重新计算
+
+        Returns:
+            list: 子节点列表，节点已达到最大深度时为空
+        """
+        if self.max_depth > 0:
+            if depth is None:
+                depth = node.depth()
+            if depth >= self.max_depth:
+                return []
+        return self.filtered_children(node)
+
+    # ---- 勾选状态 ----
+
+    def _renumber(self):
+        """按当前树结构重新计算先序编号，并迁移勾选状态"""
+        order = []
+        if self.root is not None:
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                order.append(node)
+                if node.children:
+                    stack.extend(reversed(node.children))
+
+        old = self._checked
+        pending = self._pending
+        checked = bytearray(len(order))
+        for i, node in enumerate(order):
+            if 0 <= node.index < len(old):
+                checked[i] = old[node.index]
+            else:
+                checked[i] = pending.get(node, True)
+            node.index = i
+
+        # 逆先序计算子树区间，子节点总是先于父节点处理
+        for node in reversed(order):
+            node.end = node.children[-1].end if node.children else node.index + 1
+
+        self._checked = checked
+        self._pending = {}
+        self._numbered = True
+
+    def is_checked(self, node):
+        """返回节点是否勾选"""
+        if node.kind == KIND_ERROR:
+            return False
+        if node.index < 0:
+            return self._pending.get(node, True)
+        return self._checked[node.index] == 1
+
+    def set_checked(self, node, checked):
+        """设置单个节点的勾选状态"""
+        if node.index < 0:
+            self._pending[node] = checked
+        else:
+            self._checked[node.index] = checked
+
+    def set_subtree_checked(self, node, checked):
+        """设置节点及其整个子树（包括未显示的节点）的勾选状态"""
+        if not self._numbered:
+            self._renumber()
+        count = node.end - node.index
+        self._checked[node.index : node.end] = (b"\x01" if checked else b"\x00") * count
+
+    # ---- 节点与Treeview行的对应关系 ----
+
+    def bind(self, node, item_id):
+        """记录节点对应的Treeview行"""
+        node.item_id = item_id
+        self._by_item[item_id] = node
+
+    def unbind_subtree(self, node, include_self=False):
+        """清除子树中所有节点的行ID（对应的行已从Treeview中删除）"""
+        for child in node.iter_subtree():
+            if child is node and not include_self:
+                continue
+            if child.item_id is not None:
+                self._by_item.pop(child.item_id, None)
+                child.item_id = None
+
+    def node(self, item_id):
+        """根据Treeview行ID获取节点，不存在时返回None"""
+        return self._by_item.get(item_id)
+
+    # ---- 路径 ----
+
+    def relative_parts(self, node):
+        """返回节点相对于根目录的路径各部分"""
+        parts = []
+        while node is not None and node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        parts.reverse()
+        return parts
+
+    def relative_path(self, node):
+        """返回节点相对于根目录的路径，根节点返回 "." """
+        parts = self.relative_parts(node)
+        return os.path.join(*parts) if parts else "."
+
+    def path(self, node):
+        """返回节点的完整路径"""
+        parts = self.relative_parts(node)
+        return os.path.join(self.root_path, *parts) if parts else self.root_path
+
+    def find(self, path):
+        """
+        根据完整路径查找已加载的节点
+
+        Args:
+            path (str): 完整路径
+
+        Returns:
+            TreeNode: 对应的节点，不在模型中时返回None
+        """
+        if self.root is None:
+            return None
+        try:
+            parts = Path(path).relative_to(self.root_path).parts
+        except ValueError:
+            return None
+        return self.find_relative(parts)
+
+    def find_relative(self, parts):
+        """根据相对路径各部分查找节点"""
+        node = self.root
+        for part in parts:
+            if node is None:
+                return None
+            node = node.child(part)
+        return node
+
+    def iter_with_paths(self):
+        """
+        先序遍历所有节点，同时给出相对路径
+
+        Yields:
+            tuple: (节点, 相对路径)，根节点的相对路径为 "."
+        """
+        if self.root is None:
+            return
+        yield self.root, "."
+        stack = [(child, "") for child in reversed(self.root.children)]
+        while stack:
+            node, prefix = stack.pop()
+            rel_path = os.path.join(prefix, node.name) if prefix else node.name
+            yield node, rel_path
+            if node.children:
+                stack.extend((child, rel_path) for child in reversed(node.children))
+
+    def expanded_paths(self):
+        """
+        返回所有可见的展开目录的相对路径（只进入已展开的目录）
+
+        Returns:
+            list: 相对路径列表，总是包含表示根目录的 "."
+        """
+        paths = ["."]
+        if self.root is None:
+            return paths
+        stack = [(child, "") for child in reversed(self.root.children)]
+        while stack:
+            node, prefix = stack.pop()
+            if not (node.is_dir and node.expanded):
+                continue
+            rel_path = os.path.join(prefix, node.name) if prefix else node.name
+            paths.append(rel_path)
+            stack.extend((child, rel_path) for child in reversed(node.children))
+        return paths
+
+
+def render_tree_text(model):
+    """
+    将模型渲染为目录树文本，只包含勾选的、通过过滤条件且可见（父节点已展开）的节点
+
+    一次遍历写入列表后拼接，耗时与输出大小成线性关系。
+
+    Args:
+        model (TreeModel): 目录树模型
+
+    Returns:
+        str: 目录树文本，根节点未勾选时返回空字符串
+    """
+    root = model.root
+    if root is None or not model.is_checked(root):
+        return ""
+
+    def visible_children(node, depth):
+        if not node.expanded:
+            return []
+        return [c for c in model.visible_children(node, depth) if model.is_checked(c)]
+
+    parts = [root.name, "\n"]
+    # 栈中每一项为 [可见子节点列表, 下一个子节点的下标, 前缀, 子节点的层级]
+    stack = [[visible_children(root, 0), 0, "", 1]]
+    while stack:
+        frame = stack[-1]
+        children, index, prefix, depth = frame
+        if index >= len(children):
+            stack.pop()
+            continue
+        frame[1] = index + 1
+
+        child = children[index]
+        is_last = index == len(children) - 1
+        parts.append(prefix)
+        parts.append("└── " if is_last else "├── ")
+        parts.append(child.name)
+        parts.append("\n")
+
+        grandchildren = visible_children(child, depth)
+        if grandchildren:
+            stack.append(
+                [grandchildren, 0, prefix + ("    " if is_last else "│   "), depth + 1]
+            )
+
+    return "".join(parts)
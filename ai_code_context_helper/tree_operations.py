@@ -2,21 +2,41 @@
 树形视图操作模块
 
 该模块包含处理树形视图相关操作的代码，负责树的生成、节点展开收起、
-节点选择和状态维护等功能。支持复杂的树状态保持逻辑，允许用户
-在重新加载时保留节点的展开/收起和选择状态。
+节点选择和状态维护等功能。目录结构和节点状态保存在目录树模型
+（tree_model.TreeModel）中，Treeview控件只是模型的视图，
+重新加载时按名称合并节点，从而保留展开/收起和选择状态。
+显示选项（隐藏文件、文件/目录、名称过滤器、最大深度）作为模型的过滤条件，
+修改后只需按模型重建视图。
 
 Classes:
     TreeOperations: 处理树形视图操作的类
 """
 
+from collections import deque
 from pathlib import Path
 from ai_code_context_helper.config import CHECK_MARK
-from ai_code_context_helper.file_utils import normalize_path, has_hidden_attribute
-from ai_code_context_helper.file_utils import get_file_stats, is_ignored_by_gitignore
-from ai_code_context_helper.config import CHECK_MARK
+from ai_code_context_helper.config import EXPAND_ALL_MAX_NODES, EXPAND_ALL_SLICE_MS
+from ai_code_context_helper.config import PATH_INDEX_POLL_MS, IMPORT_GRAPH_POLL_MS
+from ai_code_context_helper.file_utils import normalize_path
+from ai_code_context_helper.file_utils import get_file_stats, gitignored_names
+from ai_code_context_helper.file_utils import gitignore_rules_changed
+from ai_code_context_helper.file_utils import format_file_size
+from ai_code_context_helper.tree_model import (
+    TreeNode,
+    KIND_DIR,
+    KIND_FILE,
+    KIND_ERROR,
+)
+from ai_code_context_helper.path_index import build_path_index
+from ai_code_context_helper.content_index import build_content_index
+from ai_code_context_helper.import_graph import build_import_graph
+from ai_code_context_helper.git_index import list_git_files
+from ai_code_context_helper.parallel_walk import parallel_walk
+from ai_code_context_helper.walk_guard import WalkGuard, REASON_LOOP
 import os
+import threading
+import time
 import traceback
-from tkinter import filedialog
 import re
 
 
@@ -30,6 +50,20 @@ class TreeOperations:
         self._is_dragging = False  # 跟踪是否在拖动
         self._confirmed_selections = set()  # 存储已确认的选择
         self._last_item_toggle_state = {}  # 存储项目在拖动开始时的状态
+        self._project_state = None  # 当前项目的状态（展开、勾选和扫描缓存）
+        self._project_root = None
+        self._visible_rows = []  # 当前可见的行ID，按显示顺序排列
+        self._visible_pos = {}  # 行ID -> 在 _visible_rows 中的位置
+        self._drag_anchor = None  # 拖动开始时所在行的位置
+        self._drag_last = None  # 拖动经过的最后一行的位置
+        self._scanned_options = None  # 生成模型时使用的扫描选项（.gitignore、Git索引）
+        self._indexed_options = None  # 建立文件索引时使用的扫描选项
+        self._git_listing = None  # 使用Git索引时项目的文件列表
+        self._scan_generation = 0  # 扫描代数，扫描规则变化时加一，使记录的目录修改时间失效
+        self._prefetched = {}  # 目录路径 -> 并行预先读取的 (os.stat 结果, 子目录列表, 文件列表)
+        self._guard = None  # 当前项目的符号链接循环和跨文件系统检查
+        self._job = None  # 当前加载目录时用于报告进度的任务
+        self._job_dirs = 0  # 当前任务已加载的目录数
 
     def on_tree_button_down(self, event):
         """处理鼠标按下事件，开始可能的拖动操作"""
@@ -42,35 +76,22 @@ class TreeOperations:
         column = self.parent.tree.identify_column(event.x)
 
         if column == "#1":  # 点击的是复选框列
-            # 复选框列的点击处理保持不变
-            values = self.parent.tree.item(item, "values")
-            if values and values[0] == "✓":
-                self.parent.tree.item(item, values=("",))
-                self.parent.checked_items.discard(item)
-                self.parent.tree.item(item, tags=("gray",))
-                self._uncheck_all_children(item)
+            node = self.parent.tree_model.node(item)
+            if node is None or node.kind == KIND_ERROR:
+                return
+            if self.parent.tree_model.is_checked(node):
+                self._set_subtree_checked(node, False)
             else:
-                self.parent.tree.item(item, values=("✓",))
-                self.parent.checked_items.add(item)
-                self.parent.tree.item(item, tags=())
-                self._check_all_children(item)
-                self._ensure_parents_checked(item)
+                self._set_subtree_checked(node, True)
+                self._ensure_parents_checked(node)
         elif self.parent.enable_easy_multiselect.get():  # 使用鼠标框选模式
-            # 初始化拖动状态
+            # 初始化拖动状态，起点和终点之间的行在拖动过程中切换选择状态
             self._is_dragging = True
-            self._last_item = item  # 记录最后处理的项目
-            self._previous_item = None  # 记录倒数第二个处理的项目
-            self._item_positions = {}  # 用于跟踪项目在树中的顺序
-
-            # 为了判断方向，记录所有可见项目的顺序
-            for i, visible_item in enumerate(self._get_visible_items()):
-                self._item_positions[visible_item] = i
+            self._drag_anchor = self._visible_pos.get(item)
+            self._drag_last = self._drag_anchor
 
             # 切换初始项的选择状态
-            if item in self.parent.tree.selection():
-                self.parent.tree.selection_remove(item)
-            else:
-                self.parent.tree.selection_add(item)
+            self.parent.tree.selection_toggle(item)
 
             # 绑定拖动事件
             self.parent.tree.bind("<B1-Motion>", self._on_tree_drag)
@@ -78,18 +99,62 @@ class TreeOperations:
             # 阻止事件继续传播，防止默认的selection_set行为
             return "break"
 
-    def _get_visible_items(self):
-        """获取当前可见的所有树项目"""
-        visible_items = []
+    def _visible_descendants(self, node):
+        """返回节点下当前可见的所有行ID（不含节点自身），按显示顺序排列"""
+        rows = []
+        if not node.expanded:
+            return rows
+        stack = list(reversed(node.children))
+        while stack:
+            current = stack.pop()
+            if current.item_id is None:
+                continue
+            rows.append(current.item_id)
+            if current.expanded:
+                stack.extend(reversed(current.children))
+        return rows
+
+    def _rebuild_visible_rows(self):
+        """按模型重新计算全部可见行的顺序"""
+        root = self.parent.tree_model.root
+        if root is None or root.item_id is None:
+            self._visible_rows = []
+        else:
+            self._visible_rows = [root.item_id] + self._visible_descendants(root)
+        self._visible_pos = {item: i for i, item in enumerate(self._visible_rows)}
+
+    def _visible_subtree_end(self, node):
+        """返回节点的可见子树之后第一行的位置"""
+        current = node
+        while current.parent is not None:
+            siblings = current.parent.children
+            for sibling in siblings[siblings.index(current) + 1 :]:
+                pos = self._visible_pos.get(sibling.item_id)
+                if pos is not None:
+                    return pos
+            current = current.parent
+        return len(self._visible_rows)
+
+    def _update_visible_rows(self, node):
+        """节点展开、收起或子节点重新加载后，只替换其可见子树对应的一段行"""
+        start = self._visible_pos.get(node.item_id)
+        if start is None:
+            # 节点本身不可见，其子树的变化不影响可见行
+            return
+        end = self._visible_subtree_end(node)
 
-        def collect_visible(parent=""):
-            for item in self.parent.tree.get_children(parent):
-                visible_items.append(item)
-                if self.parent.tree.item(item, "open"):
-                    collect_visible(item)
+        for item in self._visible_rows[start + 1 : end]:
+            self._visible_pos.pop(item, None)
+        self._visible_rows[start + 1 : end] = self._visible_descendants(node)
+        for i in range(start + 1, len(self._visible_rows)):
+            self._visible_pos[self._visible_rows[i]] = i
 
-        collect_visible()
-        return visible_items
+    def _set_open(self, node, is_open):
+        """设置节点的展开状态，同时更新视图"""
+        node.expanded = is_open
+        if node.item_id is not None:
+            self.parent.tree.item(node.item_id, open=is_open)
+            self._update_visible_rows(node)
 
     def on_tree_double_click(self, event):
         """处理双击事件，确保展开目录并加载内容"""
@@ -98,40 +163,39 @@ class TreeOperations:
         if not item_id:
             return
 
-        # 获取项目路径
-        item_path = None
-        for path, tree_id in self.parent.tree_items.items():
-            if tree_id == item_id:
-                item_path = path
-                break
+        node = self.parent.tree_model.node(item_id)
 
         # 如果是目录
-        if item_path and Path(item_path).is_dir():
+        if node is not None and node.is_dir:
             # 切换展开状态
-            is_open = self.parent.tree.item(item_id, "open")
-
-            if not is_open:
+            if not self.parent.tree.item(item_id, "open"):
                 # 展开并强制加载子内容
-                self.parent.tree.item(item_id, open=True)
-                self._load_children_content(item_id, item_path)
-                # 更新展开状态
-                self.parent._save_expanded_state()
+                self._set_open(node, True)
+                self._load_children_content(node)
             else:
                 # 关闭节点
-                self.parent.tree.item(item_id, open=False)
-                # 更新展开状态
-                self.parent._save_expanded_state()
+                self._set_open(node, False)
+
+            # 更新展开状态
+            self.parent._save_expanded_state()
 
             # 防止默认处理
             return "break"
 
-    def generate_tree(self, preserve_state=False):
+    def generate_tree(self, preserve_state=False, on_done=None):
         """生成并显示目录树结构
 
+        读取目录、Git文件列表和统计文件行数在后台线程中进行，期间界面保持响应，
+        可以按 Esc 取消，再次生成时取代正在进行的生成。读取完成后才在Tk线程中
+        并入模型并重建视图，取消时模型和视图保持原状。
+
         Args:
             preserve_state: 是否保留展开状态，True保留，False只展开根节点
+            on_done: 生成完成后在Tk线程中调用的函数（无参数），可以为None
         """
         print(f"===== 生成树调用，preserve_state={preserve_state} =====")
+        # 重新生成会替换模型，正在进行的全部展开不再有效
+        self.parent.jobs.cancel("expand")
 
         directory = self.parent.dir_path.get().strip()
         directory_path = Path(directory)
@@ -144,710 +208,1056 @@ class TreeOperations:
         directory = normalize_path(directory)
         print(f"生成目录 '{directory}' 的树")
 
-        old_tree_items = {}
-        old_checked_items = set()
-        old_open_items = set()
+        model = self.parent.tree_model
+        paths_to_expand = None
 
-        # 定义一个变量控制是否使用保存的展开状态
-        use_saved_expansion = False
-        use_old_state = False
+        # 打开项目时才加载该项目保存的状态（读取完成后才切换到该状态）
+        project_state = self.parent.settings.get_project_state(directory)
+        saved_expansion = project_state.expanded_paths
 
-        # 根据preserve_state决定是否使用保存的展开状态
-        if preserve_state and directory in self.parent.settings.expanded_states:
-            print(
-                f"使用保存的展开状态: {self.parent.settings.expanded_states[directory]}"
-            )
-            self._paths_to_expand = self.parent.settings.expanded_states.get(
-                directory, []
-            )
-            use_saved_expansion = True
-        elif preserve_state and self.parent.tree_items:
-            # 使用当前会话状态
+        # 同一项目的模型仍在内存中时直接在模型上合并，保留全部展开和勾选状态
+        use_session_state = (
+            preserve_state
+            and model.root is not None
+            and model.root_path == str(directory_path)
+        )
+
+        if use_session_state:
             print("使用当前会话的树状态")
-            old_tree_items = self.parent.tree_items.copy()
-            old_checked_items = self.parent.checked_items.copy()
-            old_open_items = {
-                item_id
-                for item_id in self.parent.tree_items.values()
-                if self.parent.tree.item(item_id, "open")
-            }
-            use_old_state = True  # 新增：标记使用旧状态
+        elif preserve_state and saved_expansion is not None:
+            print(f"使用保存的展开状态: {saved_expansion}")
+            paths_to_expand = saved_expansion
         else:
             # 重置状态，只展开根节点
             print("重置状态，只保留根节点展开")
-            self._paths_to_expand = ["."]
             # 更新设置中的展开状态
-            if directory in self.parent.settings.expanded_states:
-                self.parent.settings.expanded_states[directory] = ["."]
-                self.parent.settings.settings_changed = True
+            if saved_expansion is not None:
+                self.parent.settings.set_expanded_state(directory, ["."])
 
-        # 清空当前树
-        print("清空当前树")
-        self.parent.tree.delete(*self.parent.tree.get_children())
-        self.parent.tree_items = {}
-        self.parent.checked_items = set()
         self.parent.status_var.set(self.parent.texts["generating_tree"])
-        self.parent.root.update_idletasks()
 
-        try:
-            # 创建根节点
-            dir_name = directory_path.name
-            if not dir_name:
-                dir_name = str(directory_path)
-
-            print(f"创建根节点: {dir_name}")
-            root_id = self.parent.tree.insert(
-                "", "end", text=dir_name, open=True, values=(CHECK_MARK,)
+        job = self.parent.jobs.start(
+            "scan", self.parent.texts.get("job_scan", "扫描目录")
+        )
+        self._apply_view_options()
+
+        # 后台线程只读取磁盘，需要的选项和模型信息先在Tk线程中取出
+        root_dir = str(directory_path)
+        if use_session_state:
+            known = self._loaded_directory_stamps()
+            targets = list(known)
+        else:
+            known = {}
+            targets = [root_dir] + [
+                str(directory_path / rel_path)
+                for rel_path in paths_to_expand or ()
+                if rel_path != "." and not os.path.isabs(rel_path)
+            ]
+        options = self._scan_options()
+        scan = dict(
+            root_dir=root_dir,
+            targets=targets,
+            known=known,
+            use_gitignore=options[0],
+            use_git_index=options[1],
+            include_untracked=self.parent.settings.git_include_untracked,
+            same_options=use_session_state and self._scanned_options == options,
+            old_listing=self._git_listing,
+            entry_filter=self.parent.tree_model.entry_filter,
+            scan_meta=project_state.scan_meta,
+        )
+
+        def finish(result):
+            self._finish_tree(
+                job,
+                result,
+                directory,
+                directory_path,
+                project_state,
+                use_session_state,
+                paths_to_expand,
+                options,
+            )
+            if on_done is not None:
+                on_done()
+
+        self.parent.jobs.run_in_background(
+            job, lambda job: self._read_tree(job, **scan), finish
+        )
+
+    def _loaded_directory_stamps(self):
+        """
+        返回模型中需要重新加载的目录（根目录和已加载的展开目录）及其记录的修改时间
+
+        Returns:
+            dict: 目录路径 -> 上次读取时的 scan_stamp，尚未读取时为None
+        """
+        model = self.parent.tree_model
+        stamps = {}
+        stack = [model.root]
+        while stack:
+            node = stack.pop()
+            stamps[str(Path(model.path(node)))] = node.scan_stamp
+            stack.extend(
+                c for c in node.children if c.is_dir and c.expanded and c.loaded
             )
-            self.parent.tree_items[str(directory_path)] = root_id
-            self.parent.checked_items.add(root_id)
-
-            # 填充树 - 修改这部分代码，根据状态选择填充方法
-            if use_old_state:
-                # 使用保留状态的填充方法
-                print("使用状态保留模式填充树")
-                self._populate_tree_with_state(
-                    directory_path,
-                    root_id,
-                    0,
-                    old_tree_items,
-                    old_checked_items,
-                    old_open_items,
+        return stamps
+
+    def _read_tree(
+        self,
+        job,
+        root_dir,
+        targets,
+        known,
+        use_gitignore,
+        use_git_index,
+        include_untracked,
+        same_options,
+        old_listing,
+        entry_filter,
+        scan_meta,
+    ):
+        """
+        在后台线程中读取生成目录树所需的目录内容和文件统计信息（不修改模型）
+
+        修改时间未变的目录只获取 os.stat 结果，由 _load_node 沿用已读取的子节点。
+        读取失败的目录不保存结果，由 _load_node 重新读取并显示原因。
+
+        Args:
+            job (Job): 任务
+            root_dir (str): 项目根目录
+            targets (list): 需要读取的目录路径
+            known (dict): 目录路径 -> 上次读取时的 scan_stamp
+            use_gitignore (bool): 是否应用 .gitignore 规则
+            use_git_index (bool): 是否按Git索引列出文件
+            include_untracked (bool): 使用Git索引时是否包含未跟踪的文件
+            same_options (bool): 扫描选项是否与生成当前模型时相同
+            old_listing: 生成当前模型时的Git文件列表
+            entry_filter (callable): 模型的条目过滤条件，被过滤的文件不统计行数
+            scan_meta (dict): 项目的文件扫描缓存（只读）
+
+        Returns:
+            dict: Git文件列表、是否需要重新扫描、遍历检查、预读的目录内容和新的文件统计信息
+        """
+        listing = (
+            self._load_git_listing(root_dir, include_untracked)
+            if use_git_index
+            else None
+        )
+        # 扫描规则可能变化时，修改时间未变的目录也要重新读取
+        rescan = not (
+            same_options
+            and listing == old_listing
+            and not (listing is None and use_gitignore and gitignore_rules_changed())
+        )
+        guard = WalkGuard(root_dir)
+        scan_state = (listing, guard, root_dir)
+        generation = self._scan_generation + (1 if rescan else 0)
+
+        prefetched = {}
+        file_stats = {}
+        progress_text = self.parent.texts.get("progress_dirs_loaded", "已加载 {0} 个目录")
+        for count, path in enumerate(targets, 1):
+            job.progress(progress_text, count)
+            directory_path = Path(path)
+            stat_result = self._stat_directory(directory_path)
+            if stat_result is None:
+                continue
+            if known.get(path) == (stat_result.st_mtime_ns, generation):
+                prefetched[path] = (stat_result, None, None)
+                continue
+            try:
+                dirs, files = self._scan_directory(
+                    directory_path, use_gitignore, scan_state
                 )
+            except Exception:
+                continue
+            prefetched[path] = (stat_result, dirs, files)
+
+            for f, hidden in files:
+                if entry_filter is not None and not entry_filter(
+                    TreeNode(f.name, kind=KIND_FILE, hidden=hidden)
+                ):
+                    continue
+                rel_path = os.path.relpath(str(f), root_dir)
+                try:
+                    stat = f.stat()
+                except OSError:
+                    continue
+                cached = scan_meta.get(rel_path)
+                if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                    continue
+                lines = get_file_stats(str(f))[0]
+                file_stats[rel_path] = [stat.st_mtime, stat.st_size, lines]
+                job.check()
+
+        return dict(
+            listing=listing,
+            rescan=rescan,
+            guard=guard,
+            prefetched=prefetched,
+            file_stats=file_stats,
+        )
+
+    def _finish_tree(
+        self,
+        job,
+        result,
+        directory,
+        directory_path,
+        project_state,
+        use_session_state,
+        paths_to_expand,
+        options,
+    ):
+        """在Tk线程中将后台读取的结果并入模型并重建视图"""
+        model = self.parent.tree_model
+        self._job = job
+        self._job_dirs = 0
+        try:
+            self._project_state = project_state
+            self._project_root = directory_path
+            if result["rescan"]:
+                self._scan_generation += 1
+            self._scanned_options = options
+            self._git_listing = result["listing"]
+            self._guard = result["guard"]
+            if result["file_stats"]:
+                project_state.scan_meta.update(result["file_stats"])
+                project_state.dirty = True
+            self._prefetched.update(result["prefetched"])
+
+            if use_session_state and model.root_path == str(directory_path):
+                root = model.root
             else:
-                # 使用标准填充方法
-                print("使用标准模式填充树")
-                self._populate_tree(directory_path, root_id, 0)
+                # 创建根节点
+                dir_name = directory_path.name
+                if not dir_name:
+                    dir_name = str(directory_path)
+                print(f"创建根节点: {dir_name}")
+                root = model.set_root(str(directory_path), dir_name)
 
             # 确保根节点展开
-            self.parent.tree.item(root_id, open=True)
+            root.expanded = True
+            self._load_node(root)
 
-            # 在树生成完成后，如果需要恢复保存的展开状态
-            if (
-                use_saved_expansion
-                and hasattr(self, "_paths_to_expand")
-                and self._paths_to_expand
-            ):
-                print(f"恢复保存的展开状态: {self._paths_to_expand}")
-                self._restore_expanded_state(directory_path)
+            # 恢复保存的展开状态
+            if paths_to_expand:
+                print(f"恢复保存的展开状态: {paths_to_expand}")
+                self._restore_expanded_state(paths_to_expand)
             else:
                 print("无需恢复展开状态")
 
-            self.parent.status_var.set(
-                self.parent.texts["status_tree_generated"].format(directory)
-            )
+            # 清空当前树并按模型重新创建可见的行
+            print("重建树视图")
+            self._rebuild_view()
+
+            # 扫描缓存有更新时交给后台保存
+            if self._project_state.dirty:
+                self.parent.settings.settings_changed = True
+                self.parent.settings.save_settings()
+
+            job.done(self.parent.texts["status_tree_generated"].format(directory))
             print("目录树生成完成")
+
+            self._start_path_index()
         except Exception as e:
             print(f"生成树时出错: {str(e)}")
 
             traceback.print_exc()
             self.parent.status_var.set(self.parent.texts["error_msg"].format(str(e)))
-
-    def _restore_expanded_state(self, root_path):
-        """从保存的路径列表恢复展开状态"""
-        if not hasattr(self, "_paths_to_expand") or not self._paths_to_expand:
-            print("没有找到要展开的路径")
-            return
-
-        # 打印初始的展开路径列表
-        print(f"初始展开路径列表: {self._paths_to_expand}")
-
+        finally:
+            self._job = None
+            # 未用到的预读结果可能过时，不再保留
+            self._prefetched.clear()
+            self.parent.jobs.finish(job)
+
+    def _restore_expanded_state(self, paths_to_expand):
+        """从保存的相对路径列表恢复模型中的展开状态（不操作视图）"""
         # 过滤掉可能的非相对路径，确保只使用属于当前项目的路径
-        valid_paths = []
-
-        for path in self._paths_to_expand:
-            # 确保是相对路径或根目录标记
-            if path == "." or (not os.path.isabs(path)):
-                valid_paths.append(path)
-
+        valid_paths = [
+            path for path in paths_to_expand if path == "." or not os.path.isabs(path)
+        ]
         print(f"过滤后的有效路径: {valid_paths}")
 
-        if not valid_paths:
-            print("没有有效的相对路径需要展开")
-            return
+        # 按照路径层级排序，确保先展开上层目录
+        sorted_paths = sorted(valid_paths, key=lambda p: len(re.split(r"[\\/]", p)))
 
-        # 按照路径长度排序，确保先展开上层目录
-        sorted_paths = sorted(valid_paths, key=lambda p: len(p.split("\\")))
-
-        print(f"将要展开的路径: {sorted_paths}")
-
-        # 首先确保根节点展开
-        root_items = self.parent.tree.get_children()
-        if root_items:
-            self.parent.tree.item(root_items[0], open=True)
-
-        # 处理所有路径
         for rel_path in sorted_paths:
+            # 跳过根目录标记，根节点总是展开
+            if rel_path == ".":
+                continue
             try:
-                # 跳过根目录标记，因为已处理
-                if rel_path == ".":
-                    continue
-
-                print(f"正在处理路径: {rel_path}")
-
-                # 如果是单级目录（没有斜杠），则直接在根目录下寻找
-                if not "\\" in rel_path and not "/" in rel_path:
-                    # 尝试在根节点的子项中查找
-                    root_id = None
-                    for path, tree_id in self.parent.tree_items.items():
-                        if str(path) == str(root_path):
-                            root_id = tree_id
-                            break
-
-                    if root_id:
-                        for child_id in self.parent.tree.get_children(root_id):
-                            child_text = self.parent.tree.item(child_id, "text")
-                            if child_text == rel_path:
-                                # 找到了匹配项，展开它并确保加载其内容
-                                self.parent.tree.item(child_id, open=True)
-
-                                # 关键部分：确保子节点已加载
-                                self._ensure_children_loaded(child_id)
-
-                                # 检查是否需要触发展开事件
-                                child_path = None
-                                for p, tid in self.parent.tree_items.items():
-                                    if tid == child_id:
-                                        child_path = p
-                                        break
-
-                                if child_path:
-                                    # 确保目录内容已经加载
-                                    has_dummy = False
-                                    for grandchild in self.parent.tree.get_children(
-                                        child_id
-                                    ):
-                                        tags = self.parent.tree.item(grandchild, "tags")
-                                        if tags and "dummy" in tags:
-                                            has_dummy = True
-                                            break
-
-                                    if has_dummy:
-                                        # 如果有dummy节点，需要触发on_tree_open事件来加载内容
-                                        print(
-                                            f"检测到 {rel_path} 有dummy节点，正在加载内容..."
-                                        )
-                                        # 手动调用on_tree_open方法来加载内容
-                                        self.parent.tree.focus(child_id)
-                                        self.on_tree_open(None)
-
-                                print(f"已成功展开单级目录: {rel_path}")
-                                break
-                    continue
-
-                # 构建完整路径
-                full_path = root_path / rel_path
-
-                # 检查路径是否存在于树中
-                path_str = str(full_path)
-                if path_str in self.parent.tree_items:
-                    item_id = self.parent.tree_items[path_str]
-
-                    # 展开所有父节点
-                    parent_id = self.parent.tree.parent(item_id)
-                    while parent_id:
-                        self.parent.tree.item(parent_id, open=True)
-                        # 确保子节点已加载
-                        self._ensure_children_loaded(parent_id)
-                        parent_id = self.parent.tree.parent(parent_id)
-
-                    # 展开当前节点
-                    self.parent.tree.item(item_id, open=True)
-                    self._ensure_children_loaded(item_id)
-                    print(f"已成功展开: {rel_path}")
-                else:
-                    print(f"未在树中找到路径: {path_str}，尝试逐级展开")
-                    # 尝试逐级构建和展开路径
-                    self._expand_path_by_parts(root_path, rel_path)
+                self._expand_relative_path(rel_path)
             except Exception as e:
                 print(f"展开路径 {rel_path} 时出错: {str(e)}")
 
                 traceback.print_exc()
-                continue
-
-    def _expand_path_by_parts(self, root_path, rel_path):
-        """逐级展开路径"""
-        parts = rel_path.split("\\")
-        current_path = root_path
-        current_id = None
 
-        # 找到根节点ID
-        for path, tree_id in self.parent.tree_items.items():
-            if str(path) == str(root_path):
-                current_id = tree_id
-                break
-
-        if not current_id:
-            print(f"找不到根节点ID: {root_path}")
-            return
-
-        # 逐级展开
-        for part in parts:
+    def _expand_relative_path(self, rel_path):
+        """逐级加载并展开相对路径上的所有目录"""
+        node = self.parent.tree_model.root
+        for part in re.split(r"[\\/]", rel_path):
             if not part:  # 跳过空部分
                 continue
+            if not node.loaded:
+                self._load_node(node)
+            node.expanded = True
 
-            current_path = current_path / part
-
-            # 检查当前路径是否存在
-            if not current_path.exists() or not current_path.is_dir():
-                print(f"路径不存在或不是目录: {current_path}")
-                break
+            node = node.child(part)
+            if node is None or not node.is_dir:
+                print(f"在树中找不到路径: {rel_path}")
+                return
 
-            # 展开当前父节点
-            self.parent.tree.item(current_id, open=True)
-            self._ensure_children_loaded(current_id)
-
-            # 在子节点中查找下一级
-            found = False
-            for child_id in self.parent.tree.get_children(current_id):
-                child_text = self.parent.tree.item(child_id, "text")
-                if child_text == part:
-                    current_id = child_id
-                    found = True
-                    break
-
-            if not found:
-                print(f"在树中找不到部分: {part}")
-                break
+        node.expanded = True
+        if not node.loaded:
+            self._load_node(node)
 
-        # 最后展开找到的节点
-        if current_id:
-            self.parent.tree.item(current_id, open=True)
-            self._ensure_children_loaded(current_id)
-            print(f"逐级展开成功: {rel_path}")
-
-    def _properly_expand_node(self, item_id):
-        """正确地展开一个节点，确保其内容被加载"""
-        # 先检查是否需要加载子节点
-        children = self.parent.tree.get_children(item_id)
-        has_dummy = False
-
-        for child in children:
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
-                has_dummy = True
-                break
+    def _scan_options(self):
+        """返回影响磁盘扫描结果的选项"""
+        return (self.parent.use_gitignore.get(), self.parent.use_git_index.get())
 
-        if has_dummy:
-            # 如果有dummy节点，需要先删除它们并加载真实内容
-            for child in children:
-                tags = self.parent.tree.item(child, "tags")
-                if tags and "dummy" in tags:
-                    self.parent.tree.delete(child)
-
-            # 获取对应的路径，并加载其内容
-            path = None
-            for p, tree_id in self.parent.tree_items.items():
-                if tree_id == item_id:
-                    path = p
-                    break
-
-            if path:
-                level = 0
-                temp_id = item_id
-                while temp_id != "":
-                    parent = self.parent.tree.parent(temp_id)
-                    if parent != "":
-                        level += 1
-                    temp_id = parent
-
-                path_obj = Path(path)
-                if path_obj.exists() and path_obj.is_dir():
-                    # 使用_populate_tree加载子节点
-                    self._populate_tree(path_obj, item_id, level)
-
-        # 设置为展开状态
-        self.parent.tree.item(item_id, open=True)
-
-    def _ensure_children_loaded(self, item_id):
-        """确保节点的子节点已经加载"""
-        # 检查是否有未加载的子节点（dummy 节点）
-        children = self.parent.tree.get_children(item_id)
-        has_dummy = False
-
-        for child in children:
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
-                has_dummy = True
-                break
+    def _load_git_listing(self, directory, include_untracked):
+        """项目在Git仓库中时一次性读取项目的文件列表（可以在后台线程中调用）"""
+        start = time.time()
+        listing = list_git_files(directory, include_untracked)
+        if listing is None:
+            print("项目不在Git仓库中或无法读取Git索引，按目录扫描")
+        else:
+            print(f"已读取Git文件列表: {len(listing)} 个文件，耗时 {time.time() - start:.2f}s")
+        return listing
+
+    def _scan_listed_directory(self, directory_path, listing):
+        """按Git文件列表读取目录内容，只用一次 listdir 排除已删除的条目"""
+        rel_dir = os.path.relpath(str(directory_path), listing.root_dir)
+        rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+        dir_names, file_names = listing.children(rel_dir)
+        existing = set(os.listdir(directory_path))
+        dirs = [
+            (directory_path / name, name.startswith("."))
+            for name in sorted(dir_names & existing, key=str.lower)
+        ]
+        files = [
+            (directory_path / name, name.startswith("."))
+            for name in sorted(file_names & existing, key=str.lower)
+        ]
+        return dirs, files
+
+    def _scan_directory(self, directory_path, use_gitignore=None, scan_state=None):
+        """
+        读取目录内容，只应用 .gitignore 规则
 
-        if has_dummy:
-            item_text = self.parent.tree.item(item_id, "text")
-            print(f"正在加载节点 '{item_text}' 的子内容...")
-            # 获取对应的路径
-            path = None
-            for p, tree_id in self.parent.tree_items.items():
-                if tree_id == item_id:
-                    path = p
-                    break
-
-            if path:
-                # 保存当前的open状态
-                was_open = self.parent.tree.item(item_id, "open")
-
-                # 删除dummy节点
-                for child in list(self.parent.tree.get_children(item_id)):
-                    tags = self.parent.tree.item(child, "tags")
-                    if tags and "dummy" in tags:
-                        self.parent.tree.delete(child)
-
-                # 计算当前节点的级别
-                level = 0
-                temp_id = item_id
-                while temp_id != "":
-                    parent = self.parent.tree.parent(temp_id)
-                    if parent != "":
-                        level += 1
-                    temp_id = parent
-
-                # 直接使用_populate_tree而不是_populate_tree_with_state
-                # 因为我们要加载实际的文件系统内容
-                self._populate_tree(Path(path), item_id, level)
-
-                # 恢复open状态
-                self.parent.tree.item(item_id, open=was_open)
-
-                print(f"节点 '{item_text}' 的子内容已加载")
-                return True
-
-        return False
-
-    def _populate_tree(self, directory_path, parent_id, level):
-        """递归填充目录树视图"""
-    
-        max_depth = self.parent.max_depth.get()
-        if max_depth > 0 and level >= max_depth:
-            return
+        隐藏文件、文件/目录和名称过滤器等显示选项不在这里应用，
+        而是作为模型的过滤条件，修改时无需重新读取磁盘。
+        使用Git索引时按Git文件列表读取，不再判断 .gitignore 规则。
 
-        try:
-            entries = list(directory_path.iterdir())
-        except PermissionError:
-            error_id = self.parent.tree.insert(
-                parent_id,
-                "end",
-                text=self.parent.texts["error_permission_denied"],
-                values=("", "", ""),
+        Args:
+            directory_path (Path): 目录路径
+            use_gitignore (bool): 是否应用 .gitignore 规则，为None时读取当前选项
+                （在后台线程中调用时必须给出）
+            scan_state (tuple): (Git文件列表, WalkGuard, 项目根目录)，为None时使用
+                当前模型的扫描状态（在后台线程中调用时应给出）
+
+        Returns:
+            tuple: (子目录列表, 文件列表)，元素为 (路径, 是否隐藏)，均按名称排序
+        """
+        if scan_state is None:
+            scan_state = (
+                self._git_listing,
+                self._guard,
+                self.parent.tree_model.root_path,
             )
-            self.parent.tree.item(error_id, tags=("gray",))
-            return
-        except Exception as e:
-            error_id = self.parent.tree.insert(
-                parent_id,
-                "end",
-                text=self.parent.texts["error_msg"].format(str(e)),
-                values=("", "", ""),
+        listing, guard, root_dir = scan_state
+        if listing is not None:
+            return self._scan_listed_directory(directory_path, listing)
+
+        entries = list(directory_path.iterdir())
+
+        # 应用.gitignore过滤（整个目录一批判断）
+        if use_gitignore is None:
+            use_gitignore = self.parent.use_gitignore.get()
+        if use_gitignore:
+            ignored = gitignored_names(
+                str(directory_path), [e.name for e in entries], root_dir
             )
-            self.parent.tree.item(error_id, tags=("gray",))
-            return
+            if ignored:
+                entries = [e for e in entries if e.name not in ignored]
 
-        if not self.parent.show_hidden.get():
-            entries = [
-                e
-                for e in entries
-                if not e.name.startswith(".")
-                and not (
-                    os.name == "nt"
-                    and e.is_file()
-                    and bool(e.stat().st_file_attributes & 2)
-                )
-            ]
+        # 分离目录和文件
+        dirs = []
+        files = []
+
+        for entry in sorted(entries, key=lambda e: e.name.lower()):
+            is_dir = entry.is_dir()
+            if (
+                is_dir
+                and not guard.follows_all
+                and not guard.follows(str(entry), entry.is_symlink())
+            ):
+                # 按符号链接策略不进入的目录链接不列出
+                continue
+            hidden = entry.name.startswith(".") or (
+                os.name == "nt"
+                and not is_dir
+                and bool(entry.stat().st_file_attributes & 2)
+            )
+            if is_dir:
+                dirs.append((entry, hidden))
+            else:
+                files.append((entry, hidden))
+
+        return dirs, files
+
+    def _build_entry_filter(self):
+        """
+        根据当前显示选项创建条目过滤条件
+
+        Returns:
+            callable: 接收节点并返回是否显示的函数，所有条目都显示时返回None
+        """
+        show_hidden = self.parent.show_hidden.get()
+        show_files = self.parent.show_files.get()
+        show_folders = self.parent.show_folders.get()
 
-        # 应用.gitignore过滤
-        if self.parent.use_gitignore.get():
-            # 查找项目根目录
-            project_root = normalize_path(self.parent.dir_path.get().strip())
-        
-            # 筛选条目
-            filtered_entries = []
-            for e in entries:
-                if not is_ignored_by_gitignore(str(e), project_root):
-                    filtered_entries.append(e)
-            entries = filtered_entries
-
-        # 应用文件过滤器
+        pattern = None
         filter_pattern = self.parent.file_filter.get().strip()
         if filter_pattern:
             try:
                 pattern = re.compile(filter_pattern)
-                entries = [e for e in entries if pattern.search(e.name)]
             except re.error:
                 pass
 
-        # 分离目录和文件
-        dirs = []
-        files = []
+        if show_hidden and show_files and show_folders and pattern is None:
+            return None
 
-        for entry in sorted(entries, key=lambda e: e.name.lower()):
-            if entry.is_dir():
-                if self.parent.show_folders.get():
-                    dirs.append(entry)
-            elif self.parent.show_files.get():
-                files.append(entry)
+        def entry_filter(node):
+            if node.hidden and not show_hidden:
+                return False
+            if not (show_folders if node.is_dir else show_files):
+                return False
+            return pattern is None or pattern.search(node.name) is not None
 
-        # 处理目录
-        for d in dirs:
-            item_id = self.parent.tree.insert(
-                parent_id, 
-                "end", 
-                text=d.name, 
-                values=(CHECK_MARK, "", ""),  # 目录不显示行数和大小
-                open=False
+        return entry_filter
+
+    def _apply_view_options(self):
+        """将当前显示选项设置为模型的过滤条件"""
+        model = self.parent.tree_model
+        model.entry_filter = self._build_entry_filter()
+        model.max_depth = max(0, self.parent.max_depth.get())
+
+    def scan_options_changed(self):
+        """判断影响磁盘扫描结果的选项（.gitignore、Git索引）是否与生成模型时不同"""
+        return self._scanned_options != self._scan_options()
+
+    def apply_view_filter(self):
+        """
+        按当前显示选项重新过滤目录树，不重新读取已扫描的目录
+
+        只有因最大深度增大而新露出的、从未读取过的展开目录才会读取磁盘。
+        """
+        model = self.parent.tree_model
+        if model.root is None:
+            return
+        self._apply_view_options()
+
+        stack = [(model.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if not node.expanded:
+                continue
+            if not node.loaded:
+                self._load_node(node)
+            stack.extend(
+                (c, depth + 1)
+                for c in model.visible_children(node, depth)
+                if c.is_dir
             )
-            self.parent.tree_items[str(d)] = item_id
-            self.parent.checked_items.add(item_id)
 
-            # 检查目录是否有内容
-            has_contents = False
-            try:
-                next(d.iterdir(), None)
-                has_contents = True
-            except (PermissionError, OSError, StopIteration):
-                pass
+        self._rebuild_view()
+        print("已按显示选项重新过滤目录树")
 
-            # 如果有内容，添加一个dummy节点用于延迟加载
-            if has_contents:
-                self.parent.tree.insert(item_id, "end", text="", tags=("dummy",))
+    def _load_node(self, node, for_display=True):
+        """
+        从磁盘读取目录的子节点并合并到模型中
 
-        # 处理文件
-        for f in files:
-            # 获取文件统计信息（行数和大小）
-            lines, _, size_str = get_file_stats(str(f))
-        
-            # 插入文件节点，包含行数和大小信息
-            item_id = self.parent.tree.insert(
-                parent_id, 
-                "end", 
-                text=f.name,  # 只显示文件名
-                values=(CHECK_MARK, str(lines) if lines > 0 else "", size_str)  # 在单独的列中显示行数和大小
+        已存在的同名子节点会被保留（包括其勾选、展开状态和子树），
+        新出现的节点按项目状态决定勾选状态，并继承父节点的未勾选状态。
+        已展开的子目录会一并刷新；未展开的子目录标记为未加载，下次展开时重新读取。
+
+        Args:
+            node (TreeNode): 目录节点
+            for_display (bool): 是否为显示而加载。为False时（收集选中的文件）
+                不受最大深度限制，也不读取文件的行数，行数在显示时再获取
+        """
+        job = self._job
+        if job is not None:
+            # 在修改节点之前检查取消，已取消时节点保持原状
+            self._job_dirs += 1
+            job.progress(
+                self.parent.texts.get("progress_dirs_loaded", "已加载 {0} 个目录"),
+                self._job_dirs,
             )
-            self.parent.tree_items[str(f)] = item_id
-            self.parent.checked_items.add(item_id)
 
-    def _populate_tree_with_state(
-        self,
-        directory_path,
-        parent_id,
-        level,
-        old_tree_items,
-        old_checked_items,
-        old_open_items,
-    ):
-        """带状态保留的目录树填充函数"""
-    
-        max_depth = self.parent.max_depth.get()
-        if max_depth > 0 and level >= max_depth:
+        model = self.parent.tree_model
+        old_children = {c.name: c for c in node.children if c.kind != KIND_ERROR}
+        children = []
+        was_loaded = node.loaded
+        node.loaded = True
+
+        if for_display and 0 < model.max_depth <= node.depth():
+            # 超出最大深度的目录不显示子节点，保持原状，增大深度后再读取
+            node.loaded = was_loaded
             return
 
+        directory_path = Path(model.path(node))
+        prefetched = self._prefetched.pop(str(directory_path), None)
+        if prefetched is not None:
+            stat_result = prefetched[0]
+        else:
+            stat_result = self._stat_directory(directory_path)
+
+        reason = self._guard_reason(node, stat_result)
+        if reason is not None:
+            # 符号链接循环或位于其他文件系统的目录不读取，避免遍历不结束
+            node.scan_stamp = node.dir_id = None
+            key = "error_symlink_loop" if reason == REASON_LOOP else "error_other_filesystem"
+            children.append(model.create_node(node, self.parent.texts[key], KIND_ERROR))
+            model.set_children(node, children)
+            return
+
+        stamp = None
+        if stat_result is not None:
+            stamp = (stat_result.st_mtime_ns, self._scan_generation)
+            node.dir_id = (stat_result.st_dev, stat_result.st_ino)
+        if stamp is not None and node.scan_stamp == stamp:
+            # 目录的修改时间未变（没有增删条目），沿用已读取的子节点
+            self._reuse_children(node, for_display)
+            return
+
+        rescanned = node.scan_stamp is not None
+        node.scan_stamp = None
         try:
-            entries = list(directory_path.iterdir())
+            if prefetched is not None and prefetched[1] is not None:
+                dirs, files = prefetched[1:]
+            else:
+                dirs, files = self._scan_directory(directory_path)
         except PermissionError:
-            error_id = self.parent.tree.insert(
-                parent_id,
-                "end",
-                text=self.parent.texts["error_permission_denied"],
-                values=("", "", ""),
+            children.append(
+                model.create_node(
+                    node, self.parent.texts["error_permission_denied"], KIND_ERROR
+                )
             )
-            self.parent.tree.item(error_id, tags=("gray",))
+            model.set_children(node, children)
             return
         except Exception as e:
-            error_id = self.parent.tree.insert(
-                parent_id,
-                "end",
-                text=self.parent.texts["error_msg"].format(str(e)),
-                values=("", "", ""),
+            children.append(
+                model.create_node(
+                    node, self.parent.texts["error_msg"].format(str(e)), KIND_ERROR
+                )
             )
-            self.parent.tree.item(error_id, tags=("gray",))
+            model.set_children(node, children)
             return
 
-        if not self.parent.show_hidden.get():
-            entries = [
-                e
-                for e in entries
-                if not e.name.startswith(".")
-                and not (
-                    os.name == "nt"
-                    and e.is_file()
-                    and bool(e.stat().st_file_attributes & 2)
+        prefix = model.relative_path(node) if node.parent is not None else ""
+        parent_checked = model.is_checked(node)
+
+        if rescanned and self._gitignore_added_or_removed(old_children, files):
+            # 新的规则作用于整个子树，子目录的修改时间不会因此改变
+            for child in old_children.values():
+                for descendant in child.iter_subtree():
+                    descendant.scan_stamp = None
+
+        # 处理目录
+        for d, hidden in dirs:
+            child = old_children.get(d.name)
+            if child is None or not child.is_dir:
+                rel_path = os.path.join(prefix, d.name) if prefix else d.name
+                checked = parent_checked and self._is_saved_checked(rel_path)
+                child = model.create_node(
+                    node, d.name, KIND_DIR, checked, hidden=hidden
                 )
-            ]
+                # 默认排除的大型目录显示为收起的占位节点，展开时才读取
+                child.pruned = self._guard.prunes(d.name)
+            elif child.expanded:
+                self._load_node(child, for_display)
+            else:
+                child.loaded = False
+            children.append(child)
 
-        # 应用.gitignore过滤
-        if self.parent.use_gitignore.get():
-            # 查找项目根目录
-            project_root = normalize_path(self.parent.dir_path.get().strip())
-        
-            # 筛选条目
-            filtered_entries = []
-            for e in entries:
-                if not is_ignored_by_gitignore(str(e), project_root):
-                    filtered_entries.append(e)
-            entries = filtered_entries
-
-        # 应用文件过滤器
-        filter_pattern = self.parent.file_filter.get().strip()
-        if filter_pattern:
-            try:
-                pattern = re.compile(filter_pattern)
-                entries = [e for e in entries if pattern.search(e.name)]
-            except re.error:
-                pass
+        # 处理文件
+        entry_filter = model.entry_filter
+        for f, hidden in files:
+            rel_path = os.path.join(prefix, f.name) if prefix else f.name
+            child = old_children.get(f.name)
+            if child is None or not child.is_file:
+                checked = parent_checked and self._is_saved_checked(rel_path)
+                child = model.create_node(
+                    node, f.name, KIND_FILE, checked, hidden=hidden
+                )
+            child.hidden = hidden
+            # 获取文件统计信息（行数和大小），-1表示尚未获取。
+            # 被过滤掉的文件在显示时再获取
+            if for_display and (entry_filter is None or entry_filter(child)):
+                child.lines, child.size, _ = self._get_cached_file_stats(
+                    f, rel_path
+                )
+            else:
+                child.lines = child.size = -1
+            children.append(child)
 
-        # 分离目录和文件
-        dirs = []
-        files = []
+        model.set_children(node, children)
+        node.scan_stamp = stamp
+        self._sync_path_index(node, dirs, files)
 
-        for entry in sorted(entries, key=lambda e: e.name.lower()):
-            if entry.is_dir():
-                if self.parent.show_folders.get():
-                    dirs.append(entry)
-            elif self.parent.show_files.get():
-                files.append(entry)
+    def _stat_directory(self, directory_path):
+        """返回目录的 os.stat 结果，无法获取时返回None"""
+        try:
+            return os.stat(directory_path)
+        except OSError:
+            return None
+
+    def _ancestor_ids(self, node):
+        """返回节点各级上级目录的 (st_dev, st_ino)"""
+        ids = set()
+        current = node.parent
+        while current is not None:
+            if current.dir_id is not None:
+                ids.add(current.dir_id)
+            current = current.parent
+        return ids
+
+    def _guard_reason(self, node, stat_result):
+        """返回不能读取目录的原因（符号链接循环或位于其他文件系统），可以读取时返回None"""
+        if stat_result is None or self._guard is None:
+            return None
+        return self._guard.check(stat_result, self._ancestor_ids(node))
+
+    def _prefetch_subtree(self, node):
+        """
+        用多个线程并行读取目录及其所有子目录，结果供之后 _load_node 使用
 
-        # 处理目录
-        for d in dirs:
-            path_str = str(d)
-
-            # 查找旧状态
-            old_id = None
-            checked = True  # 默认值为 True
-            is_open = False
-
-            # 通过规范化路径查找旧项目ID
-            for old_path, old_item_id in old_tree_items.items():
-                # 只使用绝对路径比较，避免基于名称的错误匹配
-                if os.path.abspath(old_path) == os.path.abspath(path_str):
-                    old_id = old_item_id
-                    checked = old_id in old_checked_items
-                    is_open = old_id in old_open_items
-                    break
-                # 如果没有找到精确匹配，再尝试使用名称+父路径来识别
-                elif os.path.basename(old_path) == d.name and os.path.basename(
-                    os.path.dirname(old_path)
-                ) == os.path.basename(os.path.dirname(path_str)):
-                    old_id = old_item_id
-                    checked = old_id in old_checked_items
-                    is_open = old_id in old_open_items
-                    break
-
-            # 调试输出
-            print(
-                f"目录: {d.name}, 找到旧ID: {old_id is not None}, 勾选状态: {checked}"
-            )
+        只进入当前显示过滤条件下可见且不是默认排除的子目录，与 iter_files_under
+        遍历的范围相同（用户已展开的默认排除目录此时已经加载，无需预读）。
+        读取失败、符号链接循环和位于其他文件系统的目录不保存结果，
+        由 _load_node 重新检查并显示原因。
+        """
+        self._prefetched.update(
+            self._read_subtree(self._subtree_plan(node), self._job)
+        )
+
+    def _subtree_plan(self, node):
+        """在Tk线程中取出并行读取子树所需的选项，供 _read_subtree 使用"""
+        model = self.parent.tree_model
+        base = Path(model.path(node))
+        return dict(
+            base=base,
+            guard=WalkGuard(str(base), model.root_path, self._ancestor_ids(node)),
+            entry_filter=model.entry_filter,
+            use_gitignore=self.parent.use_gitignore.get(),
+            scan_state=(self._git_listing, self._guard, model.root_path),
+        )
+
+    def _read_subtree(self, plan, job):
+        """
+        按 _subtree_plan 给出的选项并行读取子树（可以在后台线程中调用，不修改模型）
 
-            # 插入目录节点
-            item_id = self.parent.tree.insert(
-                parent_id,
-                "end",
-                text=d.name,
-                values=(CHECK_MARK if checked else "", "", ""),  # 目录不显示行数和大小
-                open=is_open,
-            )
+        Returns:
+            dict: 目录路径 -> (os.stat 结果, 子目录列表, 文件列表)
+        """
+        base = plan["base"]
+        guard = plan["guard"]
+        entry_filter = plan["entry_filter"]
+
+        def list_directory(rel_dir):
+            directory_path = base / rel_dir if rel_dir else base
+            try:
+                stat_result, reason = guard.enter(rel_dir)
+                if reason is not None:
+                    return None, []
+                dirs, files = self._scan_directory(
+                    directory_path, plan["use_gitignore"], plan["scan_state"]
+                )
+            except Exception:
+                return None, []
+            subdirs = [
+                d.name
+                for d, hidden in dirs
+                if not guard.prunes(d.name)
+                and (
+                    entry_filter is None
+                    or entry_filter(TreeNode(d.name, kind=KIND_DIR, hidden=hidden))
+                )
+            ]
+            return (stat_result, dirs, files), subdirs
 
-            self.parent.tree_items[path_str] = item_id
+        prefetched = {}
+        for rel_dir, scanned in parallel_walk(list_directory, job):
+            if scanned is not None:
+                directory_path = base / rel_dir if rel_dir else base
+                prefetched[str(directory_path)] = scanned
+        return prefetched
 
-            if checked:
-                self.parent.checked_items.add(item_id)
-            else:
-                self.parent.tree.item(item_id, tags=("gray",))
+    def prefetch_unread(self, nodes, job, on_done, checked_only=True):
+        """
+        在后台线程中并行读取节点下从未读取过的目录，完成后在Tk线程中调用 on_done()
+
+        on_done 中再用 iter_files_under 收集文件时，这些目录直接从预读结果并入模型，
+        无需在Tk线程中读取磁盘。没有需要读取的目录时立即调用 on_done。
 
-            # 检查目录是否有内容
-            has_contents = False
+        Args:
+            nodes (list): 起始节点
+            job (Job): 任务，取消时不调用 on_done
+            on_done (callable): 在Tk线程中调用的函数（无参数）
+            checked_only (bool): 是否跳过未勾选的节点及其子树
+        """
+        plans = [
+            self._subtree_plan(node)
+            for node in self._unread_directories(nodes, checked_only)
+        ]
+        if not plans:
+            on_done()
+            return
+
+        def work(job):
+            prefetched = {}
+            for plan in plans:
+                prefetched.update(self._read_subtree(plan, job))
+                job.check()
+            return prefetched
+
+        def finish(prefetched):
+            self._prefetched.update(prefetched)
             try:
-                next(d.iterdir(), None)
-                has_contents = True
-            except (PermissionError, OSError, StopIteration):
-                pass
+                on_done()
+            finally:
+                self._prefetched.clear()
+
+        self.parent.jobs.run_in_background(job, work, finish)
+
+    def _unread_directories(self, nodes, checked_only):
+        """返回 iter_files_under 遍历这些节点时需要并行预读的目录节点"""
+        model = self.parent.tree_model
+        starts = set(nodes)
+        found = {}
+        stack = list(nodes)
+        while stack:
+            current = stack.pop()
+            if not current.is_dir or (checked_only and not model.is_checked(current)):
+                continue
+            if current.pruned and not current.expanded and current not in starts:
+                continue
+            if not current.loaded and self._needs_prefetch(current):
+                found[id(current)] = current
+                continue
+            stack.extend(model.filtered_children(current))
+        return list(found.values())
+
+    def _gitignore_added_or_removed(self, old_children, files):
+        """目录重新读取时，其中的 .gitignore 文件是否新建或删除"""
+        if self._git_listing is not None or not self.parent.use_gitignore.get():
+            return False
+        had_gitignore = ".gitignore" in old_children
+        return had_gitignore != any(f.name == ".gitignore" for f, _ in files)
+
+    def _reuse_children(self, node, for_display):
+        """
+        目录未变化时沿用已读取的子节点，不重新读取目录，也不重新获取文件信息
 
-            # 处理子内容
-            if has_contents:
-                if is_open:
-                    # 如果节点已展开，递归加载子内容
-                    self._populate_tree_with_state(
-                        d,
-                        item_id,
-                        level + 1,
-                        old_tree_items,
-                        old_checked_items,
-                        old_open_items,
-                    )
+        已展开的子目录各自检查修改时间，未展开的子目录标记为未加载，
+        展开时再检查。只获取此前未获取过统计信息且需要显示的文件。
+        """
+        model = self.parent.tree_model
+        entry_filter = model.entry_filter
+        for child in node.children:
+            if child.is_dir:
+                if child.expanded:
+                    self._load_node(child, for_display)
                 else:
-                    # 如果节点关闭，添加dummy节点用于延迟加载
-                    self.parent.tree.insert(item_id, "end", text="", tags=("dummy",))
+                    child.loaded = False
+            elif (
+                child.is_file
+                and for_display
+                and child.lines < 0
+                and (entry_filter is None or entry_filter(child))
+            ):
+                child.lines, child.size, _ = self._get_cached_file_stats(
+                    Path(model.path(child)), model.relative_path(child)
+                )
 
-        # 处理文件
-        for f in files:
-            path_str = str(f)
-
-            # 查找旧状态
-            old_id = None
-            checked = True  # 默认值为 True
-
-            # 通过规范化路径查找旧项目ID
-            for old_path, old_item_id in old_tree_items.items():
-                # 只使用绝对路径比较，避免基于名称的错误匹配
-                if os.path.abspath(old_path) == os.path.abspath(path_str):
-                    old_id = old_item_id
-                    checked = old_id in old_checked_items
-                    break
-                # 如果没有找到精确匹配，再尝试使用名称+父路径来识别
-                elif os.path.basename(old_path) == f.name and os.path.basename(
-                    os.path.dirname(old_path)
-                ) == os.path.basename(os.path.dirname(path_str)):
-                    old_id = old_item_id
-                    checked = old_id in old_checked_items
-                    break
-
-            # 调试输出
-            print(
-                f"文件: {f.name}, 找到旧ID: {old_id is not None}, 勾选状态: {checked}"
-            )
-        
-            # 获取文件统计信息（行数和大小）
-            lines, _, size_str = get_file_stats(str(f))
-        
-            # 插入文件节点，包含行数和大小信息
-            item_id = self.parent.tree.insert(
-                parent_id, 
-                "end", 
-                text=f.name,  # 只显示文件名
-                values=(CHECK_MARK if checked else "", str(lines) if lines > 0 else "", size_str)  # 在单独的列中显示行数和大小
+    def _start_path_index(self):
+        """项目或扫描选项变化时，在后台线程中重新建立全项目的文件索引"""
+        model = self.parent.tree_model
+        index = self.parent.path_index
+        options = self._scan_options()
+        if index.root_dir == model.root_path and self._indexed_options == options:
+            return
+
+        job = self.parent.jobs.start(
+            "index", self.parent.texts.get("job_index", "建立文件索引")
+        )
+        index.reset(model.root_path, job)
+        self._indexed_options = options
+        threading.Thread(
+            target=build_path_index,
+            args=(index, model.root_path, options[0], job, self._git_listing),
+            daemon=True,
+        ).start()
+        self.parent.root.after(PATH_INDEX_POLL_MS, self._poll_path_index, job)
+
+    def _poll_path_index(self, job):
+        """在Tk线程中等待后台索引建立完成"""
+        if job.cancelled:
+            return
+        if self.parent.path_index.building:
+            self.parent.root.after(PATH_INDEX_POLL_MS, self._poll_path_index, job)
+            return
+        self.parent.jobs.finish(job)
+        print(
+            f"文件索引已建立: {len(self.parent.path_index)} 个文件，耗时 {job.elapsed():.2f}s"
+        )
+
+    def start_content_index(self):
+        """
+        在后台线程中建立或刷新当前项目的内容索引
+
+        已有索引时只重新读取修改过的文件；正在建立时不重复启动。
+
+        Returns:
+            bool: 是否启动了新的任务
+        """
+        model = self.parent.tree_model
+        index = self.parent.content_index
+        if model.root is None:
+            return False
+        if index.building and index.root_dir == model.root_path:
+            return False
+
+        job = self.parent.jobs.start(
+            "content_index", self.parent.texts.get("job_content_index", "建立内容索引")
+        )
+        index.begin_build(model.root_path, job)
+        try:
+            cache_file = str(self.parent.settings.get_content_index_file(model.root_path))
+        except Exception as e:
+            print(f"获取内容索引文件路径失败: {str(e)}")
+            cache_file = None
+        threading.Thread(
+            target=build_content_index,
+            args=(
+                index,
+                model.root_path,
+                self.parent.use_gitignore.get(),
+                job,
+                cache_file,
+                self._git_listing,
+            ),
+            daemon=True,
+        ).start()
+        self.parent.root.after(PATH_INDEX_POLL_MS, self._poll_content_index, job)
+        return True
+
+    def _poll_content_index(self, job):
+        """在Tk线程中等待后台内容索引建立完成"""
+        if job.cancelled:
+            return
+        if self.parent.content_index.building:
+            self.parent.root.after(PATH_INDEX_POLL_MS, self._poll_content_index, job)
+            return
+        self.parent.jobs.finish(job)
+        print(
+            f"内容索引已刷新: {len(self.parent.content_index)} 个文件，耗时 {job.elapsed():.2f}s"
+        )
+
+    def _sync_path_index(self, node, dirs, files):
+        """用刚读取的目录内容增量更新文件索引（索引不包含隐藏的文件和目录）"""
+        model = self.parent.tree_model
+        index = self.parent.path_index
+        if index.root_dir != model.root_path:
+            return
+        parts = model.relative_parts(node)
+        if any(part.startswith(".") for part in parts):
+            return
+        index.sync_directory(
+            "/".join(parts),
+            [f.name for f, hidden in files if not hidden],
+            [d.name for d, hidden in dirs if not hidden],
+        )
+
+    def _has_contents(self, node):
+        """判断目录是否有内容，用于决定是否显示展开图标"""
+        if node.loaded:
+            return bool(self.parent.tree_model.visible_children(node))
+        try:
+            with os.scandir(self.parent.tree_model.path(node)) as it:
+                return next(it, None) is not None
+        except OSError:
+            return False
+
+    def _row_values(self, node):
+        """返回节点在视图中的列值：勾选标记、行数、大小"""
+        mark = CHECK_MARK if self.parent.tree_model.is_checked(node) else ""
+        if node.kind != KIND_FILE:
+            if node.pruned and not node.expanded:
+                # 默认排除的目录未展开时，复制、导出和全部展开都不进入
+                return (mark, self.parent.texts.get("pruned_dir_hint", "已跳过"), "")
+            return (mark, "", "")  # 目录不显示行数和大小
+        if node.lines < 0:
+            model = self.parent.tree_model
+            node.lines, node.size, _ = self._get_cached_file_stats(
+                Path(model.path(node)), model.relative_path(node)
             )
+        return (
+            mark,
+            str(node.lines) if node.lines > 0 else "",
+            format_file_size(node.size),
+        )
+
+    def _insert_row(self, node, parent_item):
+        """为节点创建视图中的行"""
+        is_open = node.is_dir and node.expanded and node.loaded
+        node.expanded = node.expanded and is_open
+        item_id = self.parent.tree.insert(
+            parent_item,
+            "end",
+            text=node.name,
+            values=self._row_values(node),
+            open=is_open,
+            tags=self._row_tags(node),
+        )
+        self.parent.tree_model.bind(node, item_id)
+        return item_id
+
+    def _materialize_children(self, node):
+        """为节点的子节点创建视图中的行，已展开的子目录递归创建"""
+        tree = self.parent.tree
+        for child in self.parent.tree_model.visible_children(node):
+            item_id = self._insert_row(child, node.item_id)
+            if not child.is_dir:
+                continue
+            if child.expanded:
+                self._materialize_children(child)
+            elif self._has_contents(child):
+                # 添加一个dummy节点用于延迟加载
+                tree.insert(item_id, "end", text="", tags=("dummy",))
+
+    def _clear_child_rows(self, node):
+        """删除节点在视图中的所有子行"""
+        children = self.parent.tree.get_children(node.item_id)
+        if children:
+            self.parent.tree.delete(*children)
+        self.parent.tree_model.unbind_subtree(node)
+
+    def _rebuild_view(self):
+        """清空视图并按模型重新创建所有可见的行"""
+        model = self.parent.tree_model
+        tree = self.parent.tree
+        children = tree.get_children()
+        if children:
+            tree.delete(*children)
+        if model.root is None:
+            return
+        model.unbind_subtree(model.root, include_self=True)
+        self._insert_row(model.root, "")
+        self._materialize_children(model.root)
+        self._rebuild_visible_rows()
+
+    def _row_tags(self, node):
+        """返回节点在视图中的标签，未勾选的节点显示为灰色"""
+        if self.parent.tree_model.is_checked(node):
+            return ()
+        return ("gray",)
+
+    def _paint(self, node):
+        """按节点的勾选状态更新视图中的行"""
+        self.parent.tree.item(
+            node.item_id,
+            values=self._row_values(node),
+            tags=self._row_tags(node),
+        )
+
+    def _children_shown(self, node):
+        """判断目录的子节点是否已经显示在视图中"""
+        if not node.loaded:
+            return False
+        children = self.parent.tree_model.visible_children(node)
+        return not children or children[0].item_id is not None
+
+    def _ensure_children_loaded(self, node):
+        """确保节点的子节点已经加载并显示"""
+        if self._children_shown(node):
+            return False
+        print(f"正在加载节点 '{node.name}' 的子内容...")
+        self._load_children_content(node)
+        print(f"节点 '{node.name}' 的子内容已加载")
+        return True
+
+    def _relative_key(self, path):
+        """返回路径相对于当前项目根目录的字符串，用作项目状态中的键"""
+        if self._project_root is None:
+            return None
+        try:
+            return str(Path(path).relative_to(self._project_root))
+        except ValueError:
+            return None
 
-            self.parent.tree_items[path_str] = item_id
+    def _is_saved_checked(self, rel_path):
+        """
+        根据项目状态判断新加载的节点是否应为勾选状态
 
-            if checked:
-                self.parent.checked_items.add(item_id)
-            else:
-                self.parent.tree.item(item_id, tags=("gray",))
+        项目状态只保存最上层的取消勾选节点，子孙节点由调用方根据父节点的状态判断。
+        """
+        if self._project_state is None or not self._project_state.unchecked_paths:
+            return True
+        return rel_path not in self._project_state.unchecked_paths
+
+    def _get_cached_file_stats(self, file_path, rel_path=None):
+        """
+        获取文件统计信息，文件修改时间和大小未变时直接使用项目状态中的缓存
+
+        Args:
+            file_path (Path): 文件路径
+            rel_path (str): 相对于项目根目录的路径，为None时自动计算
+
+        Returns:
+            tuple: (行数, 文件大小(字节), 文件大小的格式化字符串)
+        """
+        key = rel_path if rel_path is not None else self._relative_key(file_path)
+        if self._project_state is None or key is None:
+            return get_file_stats(str(file_path))
+
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return get_file_stats(str(file_path))
+
+        cached = self._project_state.scan_meta.get(key)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2], stat.st_size, format_file_size(stat.st_size)
+
+        lines, size_bytes, size_str = get_file_stats(str(file_path))
+        self._project_state.scan_meta[key] = [stat.st_mtime, stat.st_size, lines]
+        self._project_state.dirty = True
+        return lines, size_bytes, size_str
 
     def on_tree_open(self, event):
         """处理树节点展开事件，加载子节点内容"""
         try:
             # 获取当前被展开的项
-            if event:
-                item_id = self.parent.tree.focus()
-            else:
-                item_id = self.parent.tree.focus()
-
+            item_id = self.parent.tree.focus()
             if not item_id:
                 return
 
-            item_text = self.parent.tree.item(item_id, "text")
-            print(f"处理树节点展开事件: {item_text}")
-
-            # 获取对应的路径
-            path = None
-            for p, tree_id in self.parent.tree_items.items():
-                if tree_id == item_id:
-                    path = p
-                    break
-
-            if not path:
-                print(f"无法找到节点 {item_text} 的路径")
+            node = self.parent.tree_model.node(item_id)
+            if node is None or not node.is_dir:
+                print(f"无法找到节点 {item_id} 对应的目录")
                 return
 
+            # <<TreeviewOpen>>在控件更新open属性之前触发，需要直接更新模型
+            node.expanded = True
+            print(f"处理树节点展开事件: {node.name}")
+
             # 强制加载子内容
-            self._load_children_content(item_id, path)
+            self._load_children_content(node)
 
             # 节点展开后立即保存展开状态
             print("节点展开，更新展开状态")
@@ -858,41 +1268,33 @@ class TreeOperations:
 
             traceback.print_exc()
 
-    def _load_children_content(self, item_id, path_str):
-        """强制加载节点的子内容"""
-        # 检查是否有dummy节点
-        children = self.parent.tree.get_children(item_id)
-
-        for child in children:
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
-                self.parent.tree.delete(child)
-
-        # 即使没有dummy节点，也强制重新加载内容
-        path_obj = Path(path_str)
-        if path_obj.exists() and path_obj.is_dir():
-            # 计算当前节点的级别
-            level = 0
-            temp_id = item_id
-            while temp_id != "":
-                parent = self.parent.tree.parent(temp_id)
-                if parent != "":
-                    level += 1
-                temp_id = parent
-
-            # 删除所有现有子节点
-            for child in list(self.parent.tree.get_children(item_id)):
-                self.parent.tree.delete(child)
-
-            # 重新加载内容
-            print(f"正在重新加载 {path_obj} 的内容")
-            self._populate_tree(path_obj, item_id, level)
-            print(
-                f"内容已重新加载，子节点数: {len(self.parent.tree.get_children(item_id))}"
-            )
+    def _load_children_content(self, node):
+        """强制从磁盘重新加载节点的子内容并更新视图"""
+        path_obj = Path(self.parent.tree_model.path(node))
+        if not path_obj.is_dir():
+            return
+
+        # 删除所有现有子行，模型中的子节点按名称合并保留状态
+        self._clear_child_rows(node)
+
+        # 重新加载内容
+        print(f"正在重新加载 {path_obj} 的内容")
+        self._load_node(node)
+        self._materialize_children(node)
+        self._update_visible_rows(node)
+        if node.pruned:
+            self._paint(node)
+        print(f"内容已重新加载，子节点数: {len(node.children)}")
 
     def on_tree_close(self, event):
         """处理树节点关闭的事件"""
+        node = self.parent.tree_model.node(self.parent.tree.focus())
+        if node is not None:
+            node.expanded = False
+            self._update_visible_rows(node)
+            if node.pruned:
+                self._paint(node)
+
         # 节点关闭后立即保存展开状态
         print("节点关闭，更新展开状态")
         self.parent._save_expanded_state()
@@ -906,39 +1308,27 @@ class TreeOperations:
 
         # 获取当前鼠标下的项目
         item = self.parent.tree.identify_row(event.y)
-        if not item or item == self._last_item:
+        if not item or self._drag_anchor is None:
             return
 
-        # 检测是否是方向变化（反向拖动）
-        if (
-            self._previous_item
-            and self._last_item in self._item_positions
-            and item in self._item_positions
-        ):
-            # 通过比较前两个处理的项目的位置索引来确定方向
-            prev_pos = self._item_positions[self._previous_item]
-            last_pos = self._item_positions[self._last_item]
-            curr_pos = self._item_positions[item]
-
-            # 检测方向变化
-            if (last_pos > prev_pos and curr_pos < last_pos) or (
-                last_pos < prev_pos and curr_pos > last_pos
-            ):
-                # 如果是反向拖动，重新处理最后一个项目（也切换它的状态）
-                if self._last_item in self.parent.tree.selection():
-                    self.parent.tree.selection_remove(self._last_item)
-                else:
-                    self.parent.tree.selection_add(self._last_item)
-
-        # 切换当前项目的状态
-        if item in self.parent.tree.selection():
-            self.parent.tree.selection_remove(item)
-        else:
-            self.parent.tree.selection_add(item)
+        current = self._visible_pos.get(item)
+        if current is None or current == self._drag_last:
+            return
 
-        # 更新项目记录
-        self._previous_item = self._last_item
-        self._last_item = item
+        # 起点到鼠标所在行之间的行处于切换状态。比较新旧两个区间，
+        # 只切换发生变化的行，鼠标移动较快跳过的行也会被处理，反向拖动时自动恢复
+        anchor, last = self._drag_anchor, self._drag_last
+        old_low, old_high = min(anchor, last), max(anchor, last)
+        new_low, new_high = min(anchor, current), max(anchor, current)
+        rows = self._visible_rows
+        changed = (
+            rows[min(old_low, new_low) : max(old_low, new_low)]
+            + rows[min(old_high, new_high) + 1 : max(old_high, new_high) + 1]
+        )
+        if changed:
+            self.parent.tree.selection_toggle(*changed)
+
+        self._drag_last = current
 
     def on_tree_button_up(self, event):
         """处理鼠标释放事件，完成拖动操作"""
@@ -952,216 +1342,469 @@ class TreeOperations:
         # 如果在拖动，结束拖动状态
         if self._is_dragging:
             self._is_dragging = False
-
-            # 清理拖动状态相关变量
-            if hasattr(self, "_last_item"):
-                delattr(self, "_last_item")
-            if hasattr(self, "_previous_item"):
-                delattr(self, "_previous_item")
-            if hasattr(self, "_item_positions"):
-                delattr(self, "_item_positions")
+            self._drag_anchor = None
+            self._drag_last = None
 
         # 阻止事件继续传播，防止默认行为
         return "break"
 
-    def _check_all_children(self, parent):
-        """递归选中所有子项"""
-        for child in self.parent.tree.get_children(parent):
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
+    def _set_subtree_checked(self, node, checked):
+        """设置节点及其所有子节点的勾选状态，只重绘已创建的行"""
+        self.parent.tree_model.set_subtree_checked(node, checked)
+        self._record_checked(node, subtree=True)
+
+        # 没有对应行的节点，其子孙节点也不会有行，无需继续遍历
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.item_id is None:
                 continue
+            if current.kind != KIND_ERROR:
+                self._paint(current)
+            stack.extend(current.children)
+
+    def _set_node_checked(self, node, checked):
+        """设置单个节点的勾选状态并重绘对应的行"""
+        self.parent.tree_model.set_checked(node, checked)
+        self._record_checked(node, subtree=False)
+        if node.item_id is not None:
+            self._paint(node)
+
+    def _record_checked(self, node, subtree):
+        """
+        增量更新项目状态中取消勾选的路径
 
-            self.parent.tree.item(child, values=(CHECK_MARK,))
-            self.parent.checked_items.add(child)
-            self.parent.tree.item(child, tags=())
-            self._check_all_children(child)
+        只保存最上层的取消勾选节点（父节点勾选或为根目录），新加载的节点在父节点
+        未勾选时总是未勾选，因此子孙节点无需保存。节点状态改变只影响它自身及其
+        子节点是否属于最上层；整个子树改变时子孙节点与它状态相同，都不属于最上层。
 
-    def _uncheck_all_children(self, parent):
-        """递归取消选中所有子项"""
-        for child in self.parent.tree.get_children(parent):
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
-                continue
+        Args:
+            node (TreeNode): 勾选状态刚刚改变的节点
+            subtree (bool): 是否改变了整个子树的勾选状态
+        """
+        state = self._project_state
+        if state is None:
+            return
+        unchecked = state.unchecked_paths
+        model = self.parent.tree_model
 
-            self.parent.tree.item(child, values=("",))
-            self.parent.checked_items.discard(child)
-            self.parent.tree.item(child, tags=("gray",))
-            self._uncheck_all_children(child)
+        if node.parent is None:
+            # 根目录本身不保存，由其子节点表示
+            if subtree:
+                unchecked.clear()
+        else:
+            rel_path = model.relative_path(node)
+            if subtree and unchecked:
+                prefix = rel_path + os.sep
+                unchecked.difference_update(
+                    [p for p in unchecked if p.startswith(prefix)]
+                )
+            self._update_unchecked_entry(node, rel_path)
+            if subtree:
+                state.dirty = True
+                return
 
-    def _ensure_parents_checked(self, item):
-        """确保所有父项都被选中"""
-        parent = self.parent.tree.parent(item)
-        if parent:
-            if parent not in self.parent.checked_items:
-                self.parent.tree.item(parent, values=("✓",))
-                self.parent.checked_items.add(parent)
-                self.parent.tree.item(parent, tags=())
-            self._ensure_parents_checked(parent)
-
-    def _update_parent_check_state(self, parent):
-        """更新父项的选中状态，基于子项的状态"""
-        if parent:
-            children = self.parent.tree.get_children(parent)
-            any_checked = False
+        for child in node.children:
+            self._update_unchecked_entry(child)
+        state.dirty = True
 
-            for child in children:
-                tags = self.parent.tree.item(child, "tags")
-                if tags and "dummy" in tags:
-                    continue
+    def _update_unchecked_entry(self, node, rel_path=None):
+        """根据节点及其父节点的勾选状态，更新该节点是否属于最上层的取消勾选节点"""
+        if node.kind == KIND_ERROR:
+            return
+        model = self.parent.tree_model
+        if rel_path is None:
+            rel_path = model.relative_path(node)
+        parent = node.parent
+        if not model.is_checked(node) and (
+            parent.parent is None or model.is_checked(parent)
+        ):
+            self._project_state.unchecked_paths.add(rel_path)
+        else:
+            self._project_state.unchecked_paths.discard(rel_path)
 
-                if child in self.parent.checked_items:
-                    any_checked = True
-                    break
+    def _ensure_parents_checked(self, node):
+        """确保所有父项都被选中"""
+        model = self.parent.tree_model
+        parent = node.parent
+        while parent is not None:
+            if not model.is_checked(parent):
+                self._set_node_checked(parent, True)
+            parent = parent.parent
+
+    def _update_parent_check_state(self, node):
+        """更新父项的选中状态，基于子项的状态"""
+        model = self.parent.tree_model
+        while node is not None:
+            if any(model.is_checked(c) for c in model.filtered_children(node)):
+                if not model.is_checked(node):
+                    self._set_node_checked(node, True)
+                return
 
-            if any_checked:
-                if parent not in self.parent.checked_items:
-                    self.parent.tree.item(parent, values=("✓",))
-                    self.parent.checked_items.add(parent)
-                    self.parent.tree.item(parent, tags=())
-            else:
-                self.parent.tree.item(parent, values=("",))
-                self.parent.checked_items.discard(parent)
-                self.parent.tree.item(parent, tags=("gray",))
-                self._update_parent_check_state(self.parent.tree.parent(parent))
+            self._set_node_checked(node, False)
+            node = node.parent
 
     def expand_all(self):
-        """递归展开选中的目录及其所有子目录"""
-        selected_items = self.parent.tree.selection()
-        if not selected_items:
-            return
+        """
+        展开选中的目录及其所有子目录
 
+        按广度优先的顺序在模型中逐个加载目录，每个分片执行不超过
+        EXPAND_ALL_SLICE_MS 毫秒后让出事件循环，界面在展开期间保持响应。
+        加载的节点数达到 EXPAND_ALL_MAX_NODES 后停止，剩余的目录保持收起。
+        全部加载完成后一次性创建选中目录下的行。
+        """
+        selected_items = self.parent.tree.selection()
+        roots = []
         for item in selected_items:
-            self._expand_item_recursively(item)
+            node = self.parent.tree_model.node(item)
+            if node is not None and node.is_dir:
+                roots.append(node)
+        if not roots:
+            return
 
-        self.parent.status_var.set("已完全展开选中的目录")
+        job = self.parent.jobs.start(
+            "expand", self.parent.texts.get("job_expand", "全部展开")
+        )
+        state = {
+            "model_root": self.parent.tree_model.root,
+            "roots": roots,
+            "queue": deque(roots),
+            "dirs": 0,
+            "nodes": 0,
+        }
+        self.parent.root.after_idle(self._expand_all_step, job, state)
+
+    def _expand_all_step(self, job, state):
+        """执行全部展开的一个分片"""
+        if job.cancelled:
+            return
+        if self.parent.tree_model.root is not state["model_root"]:
+            # 目录树已重新生成，放弃本次展开
+            self.parent.jobs.finish(job)
+            return
 
-    def _expand_item_recursively(self, item):
-        """递归展开单个项目及其所有子项"""
-        self.parent.tree.item(item, open=True)
+        model = self.parent.tree_model
+        queue = state["queue"]
+        deadline = time.perf_counter() + EXPAND_ALL_SLICE_MS / 1000
+        while queue and state["nodes"] < EXPAND_ALL_MAX_NODES:
+            current = queue.popleft()
+            current.expanded = True
+            if not current.loaded:
+                self._load_node(current)
+            state["dirs"] += 1
+            children = model.visible_children(current)
+            state["nodes"] += len(children)
+            # 默认排除的目录保持收起，需要时再手动展开
+            queue.extend(c for c in children if c.is_dir and not c.pruned)
+            if time.perf_counter() >= deadline:
+                break
 
-        children = self.parent.tree.get_children(item)
-        if not children:
+        if queue and state["nodes"] < EXPAND_ALL_MAX_NODES:
+            job.progress(
+                self.parent.texts.get(
+                    "progress_expand", "已加载 {0} 个目录，{1} 个节点"
+                ),
+                state["dirs"],
+                state["nodes"],
+            )
+            self.parent.root.after(1, self._expand_all_step, job, state)
             return
 
-        has_dummy = False
-        for child in children:
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
-                has_dummy = True
-                self.parent.tree.delete(child)
-
-        if has_dummy:
-            parent_path = None
-            for path, tree_id in self.parent.tree_items.items():
-                if tree_id == item:
-                    parent_path = path
-                    break
-
-            if parent_path:
-                level = 0
-                temp_id = item
-                while temp_id != "":
-                    parent = self.parent.tree.parent(temp_id)
-                    if parent != "":
-                        level += 1
-                    temp_id = parent
-
-                is_parent_checked = item in self.parent.checked_items
-
-                old_tree_items = self.parent.tree_items.copy()
-                old_checked_items = self.parent.checked_items.copy()
-                old_open_items = {
-                    item_id
-                    for item_id in self.parent.tree_items.values()
-                    if self.parent.tree.item(item_id, "open")
-                }
-                self._populate_tree_with_state(
-                    Path(parent_path),
-                    item,
-                    level,
-                    old_tree_items,
-                    old_checked_items,
-                    old_open_items,
-                )
+        self._finish_expand_all(job, state)
+
+    def _finish_expand_all(self, job, state):
+        """全部展开结束后更新视图"""
+        truncated = bool(state["queue"])
+        for node in state["queue"]:
+            # 超出节点上限后未加载的目录保持收起，之后可以手动展开
+            if not node.loaded:
+                node.expanded = False
+
+        for node in state["roots"]:
+            if node.item_id is not None:
+                self._clear_child_rows(node)
+                self._materialize_children(node)
+                self._set_open(node, True)
+        self.parent._save_expanded_state()
+
+        if truncated:
+            print(f"全部展开达到节点上限 {EXPAND_ALL_MAX_NODES}，剩余目录保持收起")
+            job.done(
+                self.parent.texts.get(
+                    "status_expand_truncated", "已展开 {0} 个目录（达到 {1} 个节点的上限）"
+                ).format(state["dirs"], EXPAND_ALL_MAX_NODES)
+            )
+        else:
+            job.done(
+                self.parent.texts.get("status_expand_all_done", "已完全展开选中的目录")
+            )
+
+    def _find_path(self, rel_path, expand):
+        """
+        按相对路径（"/" 分隔）逐级查找节点，必要时从磁盘加载目录
+
+        Args:
+            rel_path (str): 相对路径
+            expand (bool): 是否展开沿途的目录
+
+        Returns:
+            tuple: (节点, 沿途第一个新展开且已有行的目录)，找不到节点时节点为None
+        """
+        model = self.parent.tree_model
+        node = model.root
+        first_opened = None
+        for part in rel_path.split("/"):
+            if node is None or not node.is_dir:
+                return None, first_opened
+            if expand and not (node.expanded and node.loaded):
+                if first_opened is None and node.item_id is not None:
+                    first_opened = node
+                node.expanded = True
+            if not node.loaded:
+                self._load_node(node, for_display=expand)
+            node = node.child(part)
+        return node, first_opened
+
+    def _show_path(self, rel_path):
+        """
+        展开到指定的节点并为其创建行
+
+        Returns:
+            tuple: (节点, 是否新展开了目录)，找不到节点或节点被隐藏时节点为None
+        """
+        node, first_opened = self._find_path(rel_path, expand=True)
+        if first_opened is not None:
+            self._clear_child_rows(first_opened)
+            self._materialize_children(first_opened)
+            self._set_open(first_opened, True)
+        if node is None or node.item_id is None:
+            # 文件已不存在，或被当前的显示选项隐藏
+            node = None
+        return node, first_opened is not None
+
+    def reveal_path(self, rel_path):
+        """
+        在目录树中展开到指定文件并选中它
+
+        Args:
+            rel_path (str): 相对于项目根目录的路径（"/" 分隔）
+
+        Returns:
+            bool: 是否成功显示该文件
+        """
+        if self.parent.tree_model.root is None:
+            return False
+        node, opened = self._show_path(rel_path)
+        if opened:
+            self.parent._save_expanded_state()
+        if node is None:
+            return False
+        tree = self.parent.tree
+        tree.selection_set(node.item_id)
+        tree.focus(node.item_id)
+        tree.see(node.item_id)
+        return True
+
+    def select_paths(self, rel_paths):
+        """
+        展开到指定的文件，勾选并将它们加入当前选择
 
-                if not is_parent_checked:
-                    self._uncheck_all_children(item)
+        Args:
+            rel_paths (list): 相对于项目根目录的路径（"/" 分隔）
 
-        for child in self.parent.tree.get_children(item):
-            tags = self.parent.tree.item(child, "tags")
-            if tags and "dummy" in tags:
+        Returns:
+            int: 加入选择的文件数
+        """
+        if self.parent.tree_model.root is None:
+            return 0
+        items = []
+        any_opened = False
+        for rel_path in rel_paths:
+            node, opened = self._show_path(rel_path)
+            any_opened = any_opened or opened
+            if node is None:
+                continue
+            self._set_subtree_checked(node, True)
+            self._ensure_parents_checked(node)
+            items.append(node.item_id)
+        if any_opened:
+            self.parent._save_expanded_state()
+        if items:
+            self.parent.tree.selection_add(*items)
+            self.parent.tree.see(items[0])
+        return len(items)
+
+    def selected_python_files(self):
+        """返回选中的 .py 文件（包括选中目录下的）的相对路径（"/" 分隔）"""
+        model = self.parent.tree_model
+        paths = []
+        for item in self.parent.tree.selection():
+            node = model.node(item)
+            if node is None or not model.is_checked(node):
                 continue
+            nodes = [node] if node.is_file else self.iter_files_under(node)
+            paths.extend(
+                "/".join(model.relative_parts(file_node))
+                for file_node in nodes
+                if file_node.name.endswith(".py")
+            )
+        return paths
+
+    def add_dependencies(self, depth):
+        """
+        将选中的 .py 文件（传递）导入的项目内模块加入选择
 
-            self._expand_item_recursively(child)
+        先在后台增量刷新导入关系（只解析修改过的文件），完成后在Tk线程中展开依赖。
+
+        Args:
+            depth (int): 最多展开的导入层数，0表示不限制
+        """
+        texts = self.parent.texts
+        model = self.parent.tree_model
+        paths = self.selected_python_files()
+        if not paths:
+            self.parent.status_var.set(
+                texts.get("status_no_python_files", "没有选中 .py 文件")
+            )
+            return
+
+        graph = self.parent.import_graph
+        job = self.parent.jobs.start(
+            "deps", texts.get("job_dependencies", "分析导入关系")
+        )
+        self.parent.jobs.show_status(
+            texts.get("progress_dependencies", "{0}: 正在分析导入关系...").format(
+                job.label
+            )
+        )
+        graph.begin_build(model.root_path, job)
+        try:
+            cache_file = str(self.parent.settings.get_import_graph_file(model.root_path))
+        except Exception as e:
+            print(f"获取导入关系缓存文件路径失败: {str(e)}")
+            cache_file = None
+        threading.Thread(
+            target=build_import_graph,
+            args=(
+                graph,
+                model.root_path,
+                self.parent.use_gitignore.get(),
+                job,
+                cache_file,
+                self._git_listing,
+            ),
+            daemon=True,
+        ).start()
+        self.parent.root.after(
+            IMPORT_GRAPH_POLL_MS, self._poll_dependencies, job, paths, depth
+        )
+
+    def _poll_dependencies(self, job, paths, depth):
+        """在Tk线程中等待导入关系刷新完成，然后选择依赖文件"""
+        if job.cancelled:
+            return
+        graph = self.parent.import_graph
+        if graph.building:
+            self.parent.root.after(
+                IMPORT_GRAPH_POLL_MS, self._poll_dependencies, job, paths, depth
+            )
+            return
+        if graph.root_dir != self.parent.tree_model.root_path:
+            self.parent.jobs.finish(job)
+            return
+        added = graph.dependencies(paths, depth)
+        count = self.select_paths(added)
+        job.done(
+            self.parent.texts.get(
+                "status_dependencies_added", "已添加 {0} 个依赖文件"
+            ).format(count)
+        )
+
+    def check_paths(self, rel_paths):
+        """
+        勾选指定的文件（包括其所有父目录），无需展开目录
+
+        Args:
+            rel_paths (list): 相对于项目根目录的路径（"/" 分隔）
+
+        Returns:
+            int: 成功勾选的文件数
+        """
+        if self.parent.tree_model.root is None:
+            return 0
+        count = 0
+        for rel_path in rel_paths:
+            node, _ = self._find_path(rel_path, expand=False)
+            if node is None:
+                continue
+            self._set_subtree_checked(node, True)
+            self._ensure_parents_checked(node)
+            count += 1
+        return count
 
     def get_selected_files(self):
         """获取选中的文件路径列表"""
-        selected_items = self.parent.tree.selection()
+        model = self.parent.tree_model
         files = []
-        # 创建节点ID到路径的反向映射
-        id_to_path = {v: k for k, v in self.parent.tree_items.items()}
-        
-        for item in selected_items:
-            if item in id_to_path:
-                path = id_to_path[item]
-                # 只添加文件，跳过目录
-                if os.path.isfile(path):
-                    files.append(path)
+        for item in self.parent.tree.selection():
+            node = model.node(item)
+            # 只添加文件，跳过目录
+            if node is not None and node.is_file:
+                files.append(model.path(node))
         return files
 
-    def get_all_files_under_node(self, item_id):
-        """递归获取指定节点下的所有文件路径（包括未展开的目录）"""
-        files = []
-        # 获取节点对应的路径
-        path = None
-        for p, tree_id in self.parent.tree_items.items():
-            if tree_id == item_id:
-                path = p
-                break
-        
-        if not path:
-            return files
-        
-        # 如果是文件，直接返回
-        if os.path.isfile(path):
-            files.append(path)
-            return files
-        
-        # 如果是目录，递归收集所有文件
+    def iter_files_under(self, node, checked_only=True):
+        """
+        遍历节点下所有符合目录树过滤规则的文件节点（包括未展开的目录）
+
+        模型中已加载的目录直接使用扫描时得到的结果，并应用当前的显示过滤条件
+        （隐藏文件、过滤器等，不受最大深度限制），只有未加载的目录才读取磁盘，
+        读取结果并入模型供以后使用。遇到从未读取过的目录时，先用多个线程
+        并行读取其整个子树，再按顺序并入模型（已由 prefetch_unread 在后台预读的
+        目录直接使用预读结果）。默认排除的大型目录只在用户展开过或作为起始节点时才进入。
+
+        Args:
+            node (TreeNode): 起始节点
+            checked_only (bool): 是否跳过未勾选的节点及其子树
+
+        Yields:
+            TreeNode: 文件节点，按目录树中的顺序
+        """
+        model = self.parent.tree_model
+        stack = [node]
+        prefetched_here = False
         try:
-            for root, _, filenames in os.walk(path):
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    # 应用与目录树相同的过滤规则
-                    if self.should_include_file(file_path):
-                        files.append(file_path)
-        except Exception as e:
-            print(f"扫描目录 {path} 时出错: {str(e)}")
-        
-        return files
+            while stack:
+                current = stack.pop()
+                if checked_only and not model.is_checked(current):
+                    continue
+                if current.is_file:
+                    yield current
+                elif current.is_dir:
+                    if current.pruned and not current.expanded and current is not node:
+                        continue
+                    if not current.loaded:
+                        if self._needs_prefetch(current):
+                            self._prefetch_subtree(current)
+                            prefetched_here = True
+                        self._load_node(current, for_display=False)
+                    stack.extend(reversed(model.filtered_children(current)))
+        finally:
+            # 未用到的预读结果（被跳过的子树）可能过时，不再保留。
+            # prefetch_unread 预读的结果由它在收集完所有节点后清除
+            if prefetched_here:
+                self._prefetched.clear()
+
+    def _needs_prefetch(self, node):
+        """目录从未读取过（或扫描规则已变化）且尚未预读时需要并行预读其子树"""
+        if str(Path(self.parent.tree_model.path(node))) in self._prefetched:
+            return False
+        return node.scan_stamp is None or node.scan_stamp[1] != self._scan_generation
 
-    def should_include_file(self, file_path):
-        """检查文件是否符合显示规则（与目录树相同的过滤条件）"""
-        # 应用.gitignore过滤
-        if self.parent.use_gitignore.get():
-            project_root = normalize_path(self.parent.dir_path.get().strip())
-            if is_ignored_by_gitignore(file_path, project_root):
-                return False
-        
-        # 应用文件过滤器
-        filter_pattern = self.parent.file_filter.get().strip()
-        if filter_pattern:
-            try:
-                pattern = re.compile(filter_pattern)
-                if not pattern.search(os.path.basename(file_path)):
-                    return False
-            except re.error:
-                pass
-        
-        # 检查隐藏文件设置
-        if not self.parent.show_hidden.get():
-            if os.path.basename(file_path).startswith('.') or \
-               (os.name == 'nt' and has_hidden_attribute(file_path)):
-                return False
-        
-        return True
\ No newline at end of file
+    def get_all_files_under_node(self, item_id):
+        """递归获取指定节点下的所有文件路径（包括未展开的目录）"""
+        model = self.parent.tree_model
+        node = model.node(item_id)
+        if node is None:
+            return []
+        return [model.path(f) for f in self.iter_files_under(node, checked_only=False)]
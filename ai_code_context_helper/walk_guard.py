@@ -0,0 +1,166 @@
+"""
+目录遍历保护模块
+
+指向上级目录的符号链接（或 Windows 目录联接、循环的绑定挂载）会使递归遍历
+永远不结束，指向挂载的大型卷的链接会使遍历范围失控。遍历时记录每个进入的目录的
+(st_dev, st_ino)，目录与其任一上级目录相同时视为循环不再进入；可以只在项目根目录
+所在的文件系统中遍历，并按策略决定是否跟随目录符号链接。名称在默认排除集合中的
+大型目录（如 node_modules）在判断 .gitignore 规则之前按名称直接排除。
+
+只防止循环：只与上级目录比较而不是与所有已访问的目录比较，多个链接指向同一目录
+（或链接指向已遍历的目录）时各自遍历，不去重，因此并行遍历的结果不受线程调度影响，
+目录树预读和展开的结果也一致。
+
+Classes:
+    WalkGuard: 单次遍历的循环和跨文件系统检查
+
+Functions:
+    set_walk_options(follow_symlinks, same_filesystem, prune_directories):
+        设置所有遍历使用的符号链接策略、文件系统限制和默认排除的目录
+"""
+
+import os
+import threading
+
+from ai_code_context_helper.config import (
+    PRUNE_DIRECTORIES,
+    SYMLINK_FOLLOW_ALWAYS,
+    SYMLINK_FOLLOW_INSIDE_PROJECT,
+    SYMLINK_FOLLOW_NEVER,
+)
+
+REASON_LOOP = "loop"  # 目录与某个上级目录相同
+REASON_OTHER_FILESYSTEM = "other_filesystem"  # 目录位于其他文件系统
+
+_follow_symlinks = SYMLINK_FOLLOW_ALWAYS
+_same_filesystem = False
+_prune_names = frozenset(PRUNE_DIRECTORIES)
+
+
+def set_walk_options(follow_symlinks, same_filesystem, prune_directories=PRUNE_DIRECTORIES):
+    """
+    设置所有遍历使用的符号链接策略、文件系统限制和默认排除的目录
+
+    Args:
+        follow_symlinks (str): "always" 总是跟随目录符号链接，"inside_project"
+            只跟随指向项目内的链接，"never" 不跟随
+        same_filesystem (bool): 是否只遍历项目根目录所在的文件系统
+        prune_directories (iterable): 默认排除的目录名，为空时不排除
+    """
+    global _follow_symlinks, _same_filesystem, _prune_names
+    if follow_symlinks not in (
+        SYMLINK_FOLLOW_ALWAYS,
+        SYMLINK_FOLLOW_INSIDE_PROJECT,
+        SYMLINK_FOLLOW_NEVER,
+    ):
+        print(f"未知的符号链接策略 {follow_symlinks}，总是跟随")
+        follow_symlinks = SYMLINK_FOLLOW_ALWAYS
+    _follow_symlinks = follow_symlinks
+    _same_filesystem = bool(same_filesystem)
+    _prune_names = frozenset(prune_directories or ())
+
+
+class WalkGuard:
+    """
+    单次遍历的循环和跨文件系统检查
+
+    创建时读取当前的全局设置。可以在多个线程中同时使用。
+
+    Attributes:
+        root_dir (str): 遍历的起点
+        project_root (str): 项目根目录
+    """
+
+    def __init__(self, root_dir, project_root=None, ancestor_ids=()):
+        """
+        Args:
+            root_dir (str): 遍历的起点
+            project_root (str): 项目根目录，用于判断链接是否指向项目内和所在的文件系统，
+                为None时与起点相同
+            ancestor_ids (iterable): 起点的各级上级目录的 (st_dev, st_ino)
+        """
+        self.root_dir = root_dir
+        self.project_root = project_root or root_dir
+        self.follow_symlinks = _follow_symlinks
+        self.same_filesystem = _same_filesystem
+        self.prune_names = _prune_names
+        self._root_real = None  # 按需求出的项目根目录真实路径
+        try:
+            self._root_dev = os.stat(self.project_root).st_dev
+        except OSError:
+            self._root_dev = None
+        self._outer_ids = set(ancestor_ids)
+        self._ids = {}  # 已进入目录的相对路径（"/" 分隔）-> (st_dev, st_ino)
+        self._lock = threading.Lock()
+
+    @property
+    def follows_all(self):
+        """是否总是跟随目录符号链接（调用方可以省去判断条目是否为链接）"""
+        return self.follow_symlinks == SYMLINK_FOLLOW_ALWAYS
+
+    def prunes(self, name):
+        """目录名是否在默认排除集合中（只按名称判断，调用方确认条目是目录）"""
+        return name in self.prune_names
+
+    def follows(self, path, is_symlink):
+        """
+        按符号链接策略判断是否进入子目录
+
+        Args:
+            path (str): 子目录路径
+            is_symlink (bool): 子目录是否为符号链接（由调用方从目录条目取得）
+        """
+        if not is_symlink or self.follow_symlinks == SYMLINK_FOLLOW_ALWAYS:
+            return True
+        if self.follow_symlinks == SYMLINK_FOLLOW_NEVER:
+            return False
+        if self._root_real is None:
+            self._root_real = os.path.realpath(self.project_root)
+        target = os.path.realpath(path)
+        return target == self._root_real or target.startswith(
+            self._root_real.rstrip(os.sep) + os.sep
+        )
+
+    def check(self, stat_result, ancestor_ids):
+        """
+        判断能否进入目录
+
+        Args:
+            stat_result (os.stat_result): 目录的 os.stat 结果
+            ancestor_ids (iterable): 各级上级目录的 (st_dev, st_ino)
+
+        Returns:
+            str: 不能进入的原因（REASON_LOOP 或 REASON_OTHER_FILESYSTEM），可以进入时返回None
+        """
+        if (
+            self.same_filesystem
+            and self._root_dev is not None
+            and stat_result.st_dev != self._root_dev
+        ):
+            return REASON_OTHER_FILESYSTEM
+        if (stat_result.st_dev, stat_result.st_ino) in ancestor_ids:
+            return REASON_LOOP
+        return None
+
+    def enter(self, rel_dir):
+        """
+        读取目录的 (st_dev, st_ino) 并与上级目录比较，可以进入时记录下来
+
+        上级目录必须先于子目录进入。无法读取目录信息时抛出 OSError。
+
+        Args:
+            rel_dir (str): 目录相对于遍历起点的路径（"/" 分隔，起点为空字符串）
+
+        Returns:
+            tuple: (目录的 os.stat 结果, 不能进入的原因，可以进入时为None)
+        """
+        directory = os.path.join(self.root_dir, rel_dir) if rel_dir else self.root_dir
+        stat_result = os.stat(directory)
+        parts = rel_dir.split("/") if rel_dir else []
+        with self._lock:
+            ancestors = {self._ids.get("/".join(parts[:i])) for i in range(len(parts))}
+        reason = self.check(stat_result, ancestors | self._outer_ids)
+        if reason is None:
+            with self._lock:
+                self._ids[rel_dir] = (stat_result.st_dev, stat_result.st_ino)
+        return stat_result, reason